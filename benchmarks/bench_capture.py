@@ -0,0 +1,104 @@
+"""
+Compares the selenium-wire proxy and the CDP capture backend on live pages.
+
+For each backend a scraper with its own browser loads the same product pages
+and waits for their product-detail response, like scrape_product_by_id does.
+Reported are pages per minute and the RSS of the whole process tree (Python,
+chromedriver and Chromium), sampled after every page. Needs Chromium,
+chromedriver, network access and a MongoDB for the scraper's bookkeeping; the
+benchmark database is dropped afterwards. Run from the repository root:
+
+    python -m benchmarks.bench_capture [--pages 20] [--sleep 2.0]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from src.migros_scraper import MigrosScraper
+from src.services.mongo_service import MongoService
+from src.utils.memory import process_tree_rss_bytes
+from src.utils.yeeter import Yeeter
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "data")
+
+
+def product_ids() -> list[str]:
+    """The migrosIds of the product payloads in tests/data."""
+    ids = []
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(DATA_DIR, name)) as file:
+                ids.append(json.load(file)["migrosId"])
+    return ids
+
+
+def run_backend(backend: str, ids: list[str], args, mongo_service) -> dict:
+    baseline = process_tree_rss_bytes()
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=args.sleep,
+        disable_check_for_product_cards=True,
+        capture_backend=backend,
+    )
+    peak = process_tree_rss_bytes()
+    captured = 0
+    try:
+        start = time.perf_counter()
+        for index in range(args.pages):
+            url = MigrosScraper.BASE_URL + "product/" + ids[index % len(ids)]
+            scraper.make_request_and_validate(url)
+            if scraper._get_specific_response("product-detail"):
+                captured += 1
+            peak = max(peak, process_tree_rss_bytes())
+        elapsed = time.perf_counter() - start
+    finally:
+        scraper.close()
+    return {
+        "pages_per_minute": args.pages / elapsed * 60,
+        "captured": captured,
+        "peak_rss_mib": peak / 2**20,
+        "baseline_rss_mib": baseline / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    )
+    parser.add_argument("--db", default="capture_benchmark")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument(
+        "--sleep", type=float, default=2.0, help="average seconds between pages"
+    )
+    parser.add_argument(
+        "--backends", nargs="+", default=list(MigrosScraper.CAPTURE_BACKENDS)
+    )
+    args = parser.parse_args()
+
+    mongo_service = MongoService(args.mongo_uri, args.db, Yeeter())
+    ids = product_ids()
+    results = {}
+    try:
+        for backend in args.backends:
+            results[backend] = run_backend(backend, ids, args, mongo_service)
+    finally:
+        mongo_service.client.drop_database(args.db)
+        mongo_service.close()
+
+    print(f"{args.pages} product pages, {args.sleep} s average sleep")
+    print(
+        f"{'backend':<8}{'pages/min':>11}{'captured':>10}{'peak RSS MiB':>14}{'start RSS MiB':>15}"
+    )
+    for backend, result in results.items():
+        print(
+            f"{backend:<8}{result['pages_per_minute']:>11.1f}{result['captured']:>10}"
+            f"{result['peak_rss_mib']:>14.0f}{result['baseline_rss_mib']:>15.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of response decoding over the payloads in tests/data.
+
+Compares the previous path (decompress, decode to str, json.loads) with
+src.utils.decoding for every Content-Encoding the payload can be compressed
+with here. Run from the repository root:
+
+    python -m benchmarks.bench_decoding [--repeat 200]
+"""
+
+import argparse
+import gzip
+import importlib
+import json
+import os
+import timeit
+import zlib
+
+import brotli
+
+from src.utils import decoding
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "data")
+# tests/data modules that define a variable of the same name.
+DATA_MODULES = (
+    "base_categories",
+    "higher_level_categories",
+    "koriander",
+    "oliveoil",
+    "penne",
+)
+
+
+def load_payloads() -> dict[str, bytes]:
+    """Returns the raw JSON of every fixture in tests/data."""
+    payloads = {}
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(DATA_DIR, name), "rb") as file:
+                payloads[name] = file.read()
+    for name in DATA_MODULES:
+        module = importlib.import_module(f"tests.data.{name}")
+        payloads[name] = json.dumps(getattr(module, name)).encode()
+    return payloads
+
+
+def encoders() -> dict:
+    available = {
+        "identity": lambda body: body,
+        "gzip": gzip.compress,
+        "deflate": zlib.compress,
+        "br": brotli.compress,
+    }
+    if decoding.zstandard is not None:
+        available["zstd"] = decoding.zstandard.ZstdCompressor().compress
+    return available
+
+
+def previous_decode(body: bytes, encoding: str):
+    """The decoding path before src.utils.decoding existed."""
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "br":
+        body = brotli.decompress(body)
+    elif encoding != "identity":
+        return None  # not supported
+    return json.loads(body.decode("utf-8"))
+
+
+def bench(function, repeat: int) -> float:
+    """Best per-call time in microseconds."""
+    timings = timeit.repeat(function, number=repeat, repeat=5)
+    return min(timings) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = load_payloads()
+    total = sum(len(body) for body in payloads.values())
+    print(
+        f"{len(payloads)} payloads, {total / 1024:.1f} KiB, JSON backend: {decoding.JSON_BACKEND}"
+    )
+    print(f"{'encoding':<10}{'previous µs':>14}{'decoding µs':>14}{'speedup':>10}")
+    for encoding, encode in encoders().items():
+        bodies = [encode(body) for body in payloads.values()]
+        new = bench(
+            lambda: [decoding.decode_json(body, encoding) for body in bodies],
+            args.repeat,
+        )
+        if previous_decode(bodies[0], encoding) is None:
+            print(f"{encoding:<10}{'unsupported':>14}{new:>14.1f}{'-':>10}")
+            continue
+        old = bench(
+            lambda: [previous_decode(body, encoding) for body in bodies], args.repeat
+        )
+        print(f"{encoding:<10}{old:>14.1f}{new:>14.1f}{old / new:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
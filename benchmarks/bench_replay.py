@@ -0,0 +1,105 @@
+"""
+End-to-end throughput of the scrape pipeline against a replayed site.
+
+MigrosScraper runs with a ReplayDriver instead of a browser: the main page,
+the category tree and every product found through product cards are served
+from tests/data (or from a response archive), while category traversal,
+discovery, decoding and the MongoDB writes run for real. The benchmark
+database is dropped before the run. Run from the repository root:
+
+    python -m benchmarks.bench_replay [--synthetic-products 2000] [--profile out.prof]
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import time
+
+from src.migros_scraper import MigrosScraper
+from src.services.crawl_frontier import CrawlFrontier
+from src.services.mongo_service import MongoService
+from src.services.response_archive import ResponseArchive
+from src.utils.replay_driver import ReplayCorpus, ReplayDriver
+from src.utils.yeeter import Yeeter
+from tests.data.base_categories import base_categories
+from tests.data.higher_level_categories import higher_level_categories
+from tests.data.koriander import koriander
+from tests.data.oliveoil import oliveoil
+from tests.data.penne import penne
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "data")
+
+
+def fixture_corpus(**kwargs) -> ReplayCorpus:
+    """Builds the seed corpus from the payloads in tests/data."""
+    products = [oliveoil, koriander, penne]
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(DATA_DIR, name)) as file:
+                products.append(json.load(file))
+    return ReplayCorpus(base_categories, higher_level_categories, products, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    )
+    parser.add_argument("--db", default="replay_benchmark")
+    parser.add_argument("--archive", help="replay this ResponseArchive directory")
+    parser.add_argument("--synthetic-products", type=int, default=2000)
+    parser.add_argument("--cards-per-page", type=int, default=20)
+    parser.add_argument("--encoding", choices=("gzip", "identity"), default="gzip")
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    args = parser.parse_args()
+
+    options = {
+        "synthetic_products": args.synthetic_products,
+        "cards_per_page": args.cards_per_page,
+    }
+    if args.archive:
+        archive = ResponseArchive(args.archive)
+        corpus = ReplayCorpus.from_archive(archive, **options)
+        archive.close()
+    else:
+        corpus = fixture_corpus(**options)
+
+    yeeter = Yeeter()
+    MongoService(args.mongo_uri, args.db, yeeter).client.drop_database(args.db)
+    mongo_service = MongoService(args.mongo_uri, args.db, yeeter)
+    driver = ReplayDriver(corpus, content_encoding=args.encoding)
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=yeeter,
+        average_request_sleep_time=0,
+        frontier=CrawlFrontier(mongo_service),
+        driver=driver,
+    )
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    scraper.get_and_store_base_categories()
+    scraper.seed_frontier_with_base_categories()
+    scraper.run_frontier()
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    elapsed = time.perf_counter() - start
+    scraper.close()
+
+    pipeline = elapsed - driver.serve_seconds
+    products = len(mongo_service.db.products.distinct("migrosId"))
+    print(f"corpus: {len(corpus.product_ids)} products, encoding: {args.encoding}")
+    print(f"page loads:        {driver.page_loads}")
+    print(f"products stored:   {products}")
+    print(f"elapsed:           {elapsed:.2f} s ({driver.serve_seconds:.2f} s replay)")
+    print(f"pipeline:          {driver.page_loads / pipeline:.1f} pages/s")
+    mongo_service.client.drop_database(args.db)
+    mongo_service.close()
+
+
+if __name__ == "__main__":
+    main()
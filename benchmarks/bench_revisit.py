@@ -0,0 +1,111 @@
+"""
+Simulates how many price changes the fixed and the adaptive revisit schedule detect.
+
+Products get a price-change rate from a mix of stable, seasonal and volatile
+products, and their prices change as Poisson processes. Every simulated day
+the scraper may refresh `--budget` products, chosen either like the fixed
+schedule (not scraped for `--days` days, oldest first) or like
+RevisitScheduler (due by RevisitPolicy, most expected changes first, with the
+rates estimated from the changes detected so far). "adaptive" refreshes only
+the due products, "adaptive-fill" spends the whole budget like
+`due_products(fill=True)`. A refresh detects a change if the price changed at
+least once since the previous refresh, which is what 'unit_price_history'
+records. Needs no browser or database. Run from the repository root:
+
+    python -m benchmarks.bench_revisit [--products 5000] [--budget 500] [--sim-days 120]
+"""
+
+import argparse
+
+import numpy as np
+
+from src.services.revisit_scheduler import RevisitPolicy
+
+# (share of products, price changes per day)
+PRODUCT_MIX = ((0.70, 1 / 180), (0.25, 1 / 14), (0.05, 1 / 2))
+
+
+def true_rates(products: int, rng: np.random.Generator) -> np.ndarray:
+    shares, rates = zip(*PRODUCT_MIX)
+    return rng.choice(rates, size=products, p=shares)
+
+
+def simulate(schedule: str, rates: np.ndarray, args, rng: np.random.Generator):
+    """
+    Runs one schedule.
+
+    Returns:
+        tuple[int, int]: Detected changes and refreshes during the measured days.
+    """
+    policy = RevisitPolicy()
+    products = len(rates)
+    # All products were first seen and scraped during a warm-up before day 0.
+    first_seen = -rng.uniform(args.warmup_days, 2 * args.warmup_days, products)
+    last_scraped = -rng.uniform(0, args.days, products)
+    detected = np.zeros(products)
+    measured_changes = measured_visits = 0
+    for day in range(-args.warmup_days, args.sim_days):
+        age = day - last_scraped
+        if schedule == "fixed":
+            candidates = np.flatnonzero(age >= args.days)
+            order = np.argsort(-age[candidates], kind="stable")
+        else:
+            observed = np.maximum(last_scraped - first_seen, 0)
+            estimated = (detected + policy.prior_changes) / (
+                observed + policy.prior_days
+            )
+            interval = np.clip(
+                -np.log(1 - policy.target_probability) / estimated,
+                policy.min_interval_days,
+                policy.max_interval_days,
+            )
+            due = age >= interval
+            candidates = (
+                np.arange(products)
+                if schedule == "adaptive-fill"
+                else np.flatnonzero(due)
+            )
+            # Due products first, then by expected changes since the last refresh.
+            order = np.lexsort((-(estimated * age)[candidates], ~due[candidates]))
+        visited = candidates[order[: args.budget]]
+        changed = rng.random(len(visited)) < 1 - np.exp(-rates[visited] * age[visited])
+        detected[visited] += changed
+        last_scraped[visited] = day
+        if day >= 0:
+            measured_changes += int(changed.sum())
+            measured_visits += len(visited)
+    return measured_changes, measured_visits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument(
+        "--budget", type=int, default=500, help="product refreshes per day"
+    )
+    parser.add_argument(
+        "--days", type=int, default=3, help="staleness of the fixed schedule"
+    )
+    parser.add_argument("--sim-days", type=int, default=120)
+    parser.add_argument("--warmup-days", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rates = true_rates(args.products, np.random.default_rng(args.seed))
+    expected = rates.sum() * args.sim_days
+    print(
+        f"{args.products} products, {args.budget} refreshes per day, {args.sim_days} days, "
+        f"{expected:.0f} true price changes expected"
+    )
+    print(f"{'schedule':<14}{'refreshes':>11}{'detected':>10}{'per refresh':>13}")
+    for schedule in ("fixed", "adaptive", "adaptive-fill"):
+        changes, visits = simulate(
+            schedule, rates, args, np.random.default_rng(args.seed + 1)
+        )
+        print(
+            f"{schedule:<14}{visits:>11}{changes:>10}{changes / max(visits, 1):>13.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
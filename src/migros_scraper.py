@@ -1,25 +1,55 @@
-import gzip
+import functools
 import json
 import os
 import pdb
-import random
 import time
-from datetime import datetime, timezone
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
 
-import brotli
 from dotenv import load_dotenv
 from pymongo.errors import PyMongoError
+from requests.exceptions import RequestException
+from selenium import webdriver as selenium_webdriver
 from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from seleniumwire import webdriver
 
+from src.models.product_detail import ProductDetail, ProductDetailError
+from src.refresh_engine import AsyncRefreshEngine
+from src.services.crawl_frontier import CrawlFrontier
+from src.services.job_queue import JobQueue
+from src.services.migros_api import MigrosApiClient, MigrosApiError
 from src.services.mongo_service import MongoService
+from src.services.response_archive import ResponseArchive
+from src.services.revisit_scheduler import RevisitPolicy, RevisitScheduler
+from src.utils import decoding
+from src.utils.blocking_profile import BLOCKING_PROFILES, BlockingProfile
+from src.utils.capture_policy import CAPTURE_POLICIES, CapturePolicy
+from src.utils.cdp_capture import CdpCapture
+from src.utils.decoding import DecodingError
+from src.utils.known_id_filter import KnownIdFilter
+from src.utils.memory import process_tree_rss_bytes, rss_bytes
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.response_mailbox import CapturedResponse, ResponseMailbox
+from src.utils.sharding import Shard
+from src.utils.shared_id_set import SharedIdSet
 from src.utils.yeeter import Yeeter
 
 
 class MigrosScraper:
     BASE_URL = "https://www.migros.ch/en/"
+    FETCH_MODES = ("browser", "api")
+    # "proxy" captures through selenium-wire, "cdp" through DevTools Network events.
+    CAPTURE_BACKENDS = ("proxy", "cdp")
+    RATE_LIMITER_NAME = "migros"
+    CAPTURED_FRAGMENTS = (
+        "product-detail",
+        "product-cards",
+        "storemap",
+        "products/category",
+    )
 
     def __init__(
         self,
@@ -29,17 +59,108 @@ class MigrosScraper:
         binary_location: str = "/usr/bin/chromium",
         average_request_sleep_time: float = 4.0,
         disable_check_for_product_cards: bool = False,
+        fetch_mode: str = "browser",
+        api_client: MigrosApiClient = None,
+        debugging_port: int = 9222,
+        proxy_port: int = None,
+        known_ids: SharedIdSet = None,
+        rate_limiter: AdaptiveRateLimiter = None,
+        blocking_profile: str | BlockingProfile = "off",
+        frontier: CrawlFrontier = None,
+        max_discovery_depth: int = 5,
+        discovery_budget: int = None,
+        max_discovery_queue: int = 10000,
+        max_category_depth: int = None,
+        category_max_age_days: int = 7,
+        archive: ResponseArchive = None,
+        driver=None,
+        profile_dir: str = None,
+        capture_backend: str = "proxy",
+        capture_policy: str | CapturePolicy = "bounded",
+        known_id_filter: bool = False,
+        shard: Shard | tuple[int, int] = None,
+        rescrape_after_hours: float = 24,
     ):
+        self.started_at = time.monotonic()
+        self.startup_seconds = None
+        self.first_request_seconds = None
+        if fetch_mode not in self.FETCH_MODES:
+            raise ValueError(
+                f"Unknown fetch mode {fetch_mode!r}, expected one of {self.FETCH_MODES}"
+            )
+        if capture_backend not in self.CAPTURE_BACKENDS:
+            raise ValueError(
+                f"Unknown capture backend {capture_backend!r}, expected one of {self.CAPTURE_BACKENDS}"
+            )
+        self.capture_backend = capture_backend
+        self.cdp_capture = None
+        if isinstance(capture_policy, str):
+            capture_policy = CAPTURE_POLICIES[capture_policy]
+        self.capture_policy = capture_policy
+        self._last_memory_report = time.monotonic()
+        self.peak_rss_bytes = 0
         self.mongo_service = mongo_service
         self.yeeter = yeeter
         self.base_categories = []
         self.known_ids = set()
         self.todays_scraped_product_ids = set()
+        self.price_checked_ids = set()
+        self.frontier = frontier
+        # Only products of this shard are discovered, see src.utils.sharding.
+        self.shard = Shard.of(shard)
+        # scrape_product_by_id skips products scraped more recently than this.
+        self.rescrape_after_hours = rescrape_after_hours
+        # Products found on product cards wait here instead of being scraped recursively.
+        self.discovery_queue = deque()
+        self.max_discovery_depth = max_discovery_depth
+        self.discovery_budget = discovery_budget
+        self.max_discovery_queue = max_discovery_queue
+        self.discovered_count = 0
+        self._discovery_depth = 0
+        self._draining_discovery_queue = False
+        self.max_category_depth = max_category_depth
+        self.category_max_age_days = category_max_age_days
         self.average_request_sleep_time = average_request_sleep_time
         self.disable_check_for_product_cards = disable_check_for_product_cards
+        self.fetch_mode = fetch_mode
+        self.api_client = api_client
+        self.archive = archive
+        self.response_mailbox = ResponseMailbox(
+            self.CAPTURED_FRAGMENTS,
+            listener=self._archive_response if archive is not None else None,
+            max_body_bytes=capture_policy.max_body_bytes,
+        )
+        if isinstance(blocking_profile, str):
+            blocking_profile = BLOCKING_PROFILES[blocking_profile]
+        self.blocking_profile = blocking_profile
+        self.profile_dir = os.path.abspath(profile_dir) if profile_dir else None
+        self.rate_limiter = rate_limiter or self._load_rate_limiter()
+        if fetch_mode == "api" and api_client is None:
+            self.api_client = MigrosApiClient(
+                yeeter, validator_store=mongo_service, archive=archive
+            )
         try:
-            self.driver = self._initialize_driver(driver_path, binary_location)
-            self.known_ids = set(mongo_service.get_all_known_migros_ids())
+            # A driver passed in (e.g. a ReplayDriver) replaces the browser.
+            self.driver = driver or self._initialize_driver(
+                driver_path, binary_location, debugging_port, proxy_port
+            )
+            self.startup_seconds = time.monotonic() - self.started_at
+            self.blocking_profile.apply(self.driver)
+            if capture_backend == "cdp":
+                self.cdp_capture = CdpCapture(self.driver, self.response_mailbox)
+                self.cdp_capture.install(capture_policy.cdp_network_params())
+            else:
+                self.driver.response_interceptor = self.response_mailbox.interceptor
+            if known_ids is not None:
+                # Shared with other worker processes, already loaded by the pool.
+                self.known_ids = known_ids
+            elif known_id_filter:
+                # Shared with other processes and runs through MongoDB.
+                self.known_ids = KnownIdFilter(
+                    mongo_service.load_known_id_filter(), mongo_service
+                )
+            else:
+                self.known_ids = mongo_service.load_known_id_set()
             self.todays_scraped_product_ids = set(
                 mongo_service.retrieve_id_scraped_at_last_24_hours()
             )
@@ -52,14 +173,23 @@ class MigrosScraper:
             yeeter.error(f"Error fetching stuff from MongoDB: {str(e)}")
 
     def _initialize_driver(
-        self, driver_path: str, binary_location: str
+        self,
+        driver_path: str,
+        binary_location: str,
+        debugging_port: int = 9222,
+        proxy_port: int = None,
     ) -> webdriver.Chrome:
         """
         Initializes the Selenium WebDriver with the specified options.
 
+        With the "cdp" capture backend a plain Selenium driver without the
+        selenium-wire proxy is started, with the performance log enabled.
+
         Args:
             driver_path (str): Path to the ChromeDriver executable.
             binary_location (str): Path to the Chromium binary.
+            debugging_port (int): Remote debugging port, must be unique per browser.
+            proxy_port (int, optional): Port of the selenium-wire proxy. A free port is picked if None.
 
         Returns:
             webdriver.Chrome: Configured Selenium WebDriver instance.
@@ -72,21 +202,172 @@ class MigrosScraper:
             options.add_argument("--no-sandbox")
             options.add_argument("--disable-dev-shm-usage")
             options.add_argument("--disable-gpu")
-            options.add_argument("--remote-debugging-port=9222")
-            return webdriver.Chrome(service=service, options=options)
+            options.add_argument(f"--remote-debugging-port={debugging_port}")
+            if self.blocking_profile.disable_images:
+                options.add_argument("--blink-settings=imagesEnabled=false")
+            warm = False
+            if self.profile_dir:
+                # Cookies, consent state and the HTTP cache survive between runs.
+                warm = self._prepare_profile_dir(self.profile_dir)
+                options.add_argument(f"--user-data-dir={self.profile_dir}")
+            start = time.monotonic()
+            if self.capture_backend == "cdp":
+                options.set_capability("goog:loggingPrefs", CdpCapture.LOGGING_PREFS)
+                driver = selenium_webdriver.Chrome(service=service, options=options)
+            else:
+                seleniumwire_options = self.capture_policy.seleniumwire_options()
+                if proxy_port is not None:
+                    seleniumwire_options["port"] = proxy_port
+                driver = webdriver.Chrome(
+                    service=service,
+                    options=options,
+                    seleniumwire_options=seleniumwire_options,
+                )
+            profile = "no" if not self.profile_dir else "warm" if warm else "cold"
+            self.yeet(
+                f"Browser started in {time.monotonic() - start:.2f} seconds ({profile} profile)."
+            )
+            return driver
         except Exception as e:
             if os.getenv("DEBUG_MODE") == "true":
                 pdb.set_trace()  # Enter interactive debugger
             raise WebDriverException(f"Failed to initialize WebDriver: {str(e)}")
 
+    @staticmethod
+    def _prepare_profile_dir(profile_dir: str) -> bool:
+        """
+        Creates the browser profile directory or readies a restored one.
+
+        Chromium refuses a profile whose Singleton* lock files point to another
+        host or a dead process, which is the case for a profile restored from the
+        CI cache, so those are removed.
+
+        Args:
+            profile_dir (str): The Chromium user data directory.
+
+        Returns:
+            bool: True if the profile was used before (a warm start).
+        """
+        os.makedirs(profile_dir, exist_ok=True)
+        for name in ("SingletonLock", "SingletonSocket", "SingletonCookie"):
+            path = os.path.join(profile_dir, name)
+            if os.path.lexists(path):
+                os.remove(path)
+        return os.path.isdir(os.path.join(profile_dir, "Default"))
+
+    def _record_first_request(self) -> None:
+        """Logs how long after start the first request was answered, once per run."""
+        if self.first_request_seconds is None:
+            self.first_request_seconds = time.monotonic() - self.started_at
+            self.yeet(
+                f"First request answered {self.first_request_seconds:.2f} seconds after start "
+                f"(browser startup {self.startup_seconds or 0:.2f} seconds)."
+            )
+
+    def _purge_captures(self) -> None:
+        """Drops all captured requests and responses of the last page."""
+        if self.cdp_capture:
+            self.cdp_capture.clear()
+        else:
+            del self.driver.requests
+        self.response_mailbox.reset()
+
+    def report_memory(self) -> int:
+        """
+        Logs the RSS of the scraper's process tree (Python, proxy, chromedriver, Chromium).
+
+        Returns:
+            int: The RSS of the process tree in bytes.
+        """
+        self._last_memory_report = time.monotonic()
+        tree_rss = process_tree_rss_bytes()
+        self.peak_rss_bytes = max(self.peak_rss_bytes, tree_rss)
+        self.yeet(
+            f"Memory: process tree RSS {tree_rss / 2**20:.0f} MiB "
+            f"(peak {self.peak_rss_bytes / 2**20:.0f} MiB), "
+            f"scraper RSS {rss_bytes() / 2**20:.0f} MiB, "
+            f"{self.response_mailbox.oversized_count} oversized responses dropped."
+        )
+        return tree_rss
+
+    def _maybe_report_memory(self) -> None:
+        interval = self.capture_policy.report_interval
+        if interval and time.monotonic() - self._last_memory_report >= interval:
+            self.report_memory()
+
+    def _load_rate_limiter(self) -> AdaptiveRateLimiter:
+        """
+        Creates the rate limiter, continuing from the rate the last run ended with.
+
+        Without a saved state the limiter starts at one request per
+        `average_request_sleep_time` seconds. A sleep time of 0 disables pacing.
+        A shard gets 1 / count of the rate, so K shards together send as many
+        requests as one unsharded scraper, and keeps its own saved state.
+
+        Returns:
+            AdaptiveRateLimiter: The limiter used for all requests of this scraper.
+        """
+        if self.average_request_sleep_time <= 0:
+            return AdaptiveRateLimiter.unlimited()
+        share = self.shard.count if self.shard else 1
+        rate_limiter = AdaptiveRateLimiter(
+            rate=1 / (self.average_request_sleep_time * share), max_rate=1.0 / share
+        )
+        try:
+            state = self.mongo_service.get_rate_limiter_state(self.rate_limiter_name)
+            if state:
+                rate_limiter.restore(state)
+                self.yeet(f"Restored request rate {rate_limiter.rate:.3f}/s.")
+        except PyMongoError as e:
+            self.error(f"Could not load rate limiter state: {str(e)}")
+        return rate_limiter
+
+    @property
+    def rate_limiter_name(self) -> str:
+        """The name the rate limiter state is saved under, one per shard."""
+        if not self.shard:
+            return self.RATE_LIMITER_NAME
+        return (
+            f"{self.RATE_LIMITER_NAME}_shard_{self.shard.index}_of_{self.shard.count}"
+        )
+
+    def _save_rate_limiter_state(self) -> None:
+        """Persists the current request rate so the next run starts from it."""
+        if self.rate_limiter.is_unlimited:
+            return
+        try:
+            self.mongo_service.save_rate_limiter_state(
+                self.rate_limiter_name, self.rate_limiter.state()
+            )
+        except Exception as e:
+            self.error(f"Could not save rate limiter state: {str(e)}")
+
+    def _save_known_id_filter(self) -> None:
+        """Merges the ids discovered in this run into the shared filter snapshot."""
+        if not isinstance(self.known_ids, KnownIdFilter):
+            return
+        self.yeet(
+            f"Known id filter: {self.known_ids.false_positives} false positives "
+            f"in {self.known_ids.confirmations} confirmations."
+        )
+        try:
+            self.mongo_service.save_known_id_filter(self.known_ids.bloom)
+        except Exception as e:
+            self.error(f"Could not save the known id filter: {str(e)}")
+
     def load_main_page(self) -> None:
         """Load the main page of the Migros website."""
         self.make_request_and_validate(self.BASE_URL)
 
     def close(self) -> None:
-        """Close the WebDriver session."""
+        """Close the WebDriver session and the API session, if any."""
+        self.report_memory()
+        self._save_rate_limiter_state()
+        self._save_known_id_filter()
         if self.driver:
             self.driver.quit()
+        if self.api_client:
+            self.api_client.close()
 
     def yeet(self, message: str):
         """print an info message."""
@@ -115,43 +396,58 @@ class MigrosScraper:
 
     def _decompress_response(self, response: bytes, encoding: str) -> bytes:
         """
-        Decompresses a given response if it is encoded in gzip or brotli format.
+        Decompresses a given response according to its Content-Encoding (gzip, deflate, br or zstd).
 
         Args:
             response (bytes): The compressed response body.
-            encoding (str): The encoding type (e.g., "gzip" or "br").
+            encoding (str): The Content-Encoding header (e.g., "gzip" or "br").
 
         Returns:
-            bytes: The decompressed response body. If no encoding is recognized, returns the original response.
-
-        Raises:
-            gzip.BadGzipFile: If the gzip decompression fails.
-            brotli.error: If the brotli decompression fails.
+            bytes: The decompressed response body, or b"" if decompression failed.
         """
         try:
-            if encoding == "gzip":
-                return gzip.decompress(response)
-            elif encoding == "br":
-                return brotli.decompress(response)
-            return response
-        except (gzip.BadGzipFile, brotli.error) as e:
+            return decoding.decompress(response, encoding)
+        except DecodingError as e:
             self.error(f"Decompression failed: {str(e)}")
             return b""
 
-    def _log_scraper_state(self, url: str, request=None) -> None:
+    def _archive_response(self, fragment: str, captured: CapturedResponse) -> None:
+        """
+        Appends a captured API response to the response archive.
+
+        Called by the response mailbox on a proxy thread for every response that
+        matched one of the CAPTURED_FRAGMENTS. The body is stored decompressed
+        (the archive compresses it again), keyed by fragment and migrosIds parameter.
+
+        Args:
+            fragment (str): The watched URL fragment the response matched.
+            captured (CapturedResponse): The captured response.
+        """
+        if not captured.body or captured.status_code >= 400:
+            return
+        migros_id = parse_qs(urlparse(captured.url).query).get("migrosIds", [""])[0]
+        try:
+            body = decoding.decompress(
+                captured.body, captured.headers.get("Content-Encoding", "")
+            )
+            self.archive.append(fragment, migros_id, body)
+        except (DecodingError, OSError) as e:
+            self.error(f"Could not archive response of {captured.url}: {str(e)}")
+
+    def _log_scraper_state(self, url: str, response: CapturedResponse = None) -> None:
         """
-        Logs the current state of the scraper, including the URL being processed and request details.
+        Logs the current state of the scraper, including the URL being processed and response details.
 
         Args:
             url (str): The URL being processed at the time of logging.
-            request (seleniumwire.request.Request, optional): The Selenium Wire request object associated with the URL.
+            response (CapturedResponse, optional): The captured response associated with the URL.
 
         Returns:
             None
         """
         self.yeeter.log_scraper_state(
             url=url,
-            request=request,
+            response=response,
             scraped_product_ids=self.todays_scraped_product_ids,
             base_categories=self.base_categories,
         )
@@ -160,63 +456,58 @@ class MigrosScraper:
         self, url_contains: str, max_wait_time: int = 10
     ) -> dict:
         """
-        Captures a network request that matches the specified URL fragment and retrieves its response.
+        Waits for a captured response whose URL contains the specified fragment and decodes it.
+
+        Responses are pushed into the response mailbox by the selenium-wire response
+        interceptor, so this returns as soon as the response has arrived instead of
+        polling `driver.requests`.
 
         Args:
-            url_contains (str): A substring to identify the target URL in the network requests.
+            url_contains (str): One of the watched URL fragments, see CAPTURED_FRAGMENTS.
             max_wait_time (int): Maximum time to wait for the response in seconds (default is 10).
 
         Returns:
-            dict: The decoded JSON response as a dictionary. Returns an empty dictionary if no response is found
-            or if an error occurs during JSON decoding.
-
-        Raises:
-            json.JSONDecodeError: If the response body is not valid JSON.
+            dict: The decoded JSON response as a dictionary. Returns an empty dictionary if no response is found,
+            if its body was over the capture policy's max_body_bytes or if an error occurs during JSON decoding.
         """
-        start_time = time.time()
+        deadline = time.monotonic() + max_wait_time
+        index = 0
 
         while True:
-            for request in self.driver.requests:
-                if url_contains in request.url:
-                    try:
-                        if request.response is None:
-                            self.alarm(f"No response for request: {request.url}")
-                            continue
-
-                        response_body = request.response.body
-                        if response_body is None:
-                            self.alarm(
-                                f"Empty response body for request: {request.url}"
-                            )
-                            continue
-
-                        encoding = request.response.headers.get("Content-Encoding", "")
-                        response_body = self._decompress_response(
-                            response_body, encoding
-                        )
-
-                        return json.loads(response_body.decode("utf-8"))
-
-                    except json.JSONDecodeError:
-                        self.error("Error decoding JSON response.")
-                        self.error(response_body)
-                        return {}
-                    except AttributeError as e:
-                        self.error(f"Attribute error: {str(e)}")
-                        if os.getenv("DEBUG_MODE") == "true":
-                            pdb.set_trace()  # Enter interactive debugger
-                        continue
-                    except Exception as e:
-                        self.error(f"Unexpected error: {str(e)}")
-                        if os.getenv("DEBUG_MODE") == "true":
-                            pdb.set_trace()  # Enter interactive debugger
-                        continue
-
-            if time.time() - start_time > max_wait_time:
+            captured = self.response_mailbox.wait_for(
+                url_contains, deadline - time.monotonic(), index
+            )
+            if captured is None:
                 self.yeet(f"Timeout: {url_contains} request not found.")
                 return {}
+            index += 1
+
+            if captured.truncated:
+                # Waiting longer would not bring the body back.
+                self.error(
+                    f"Response body of {captured.url} exceeded "
+                    f"{self.capture_policy.max_body_bytes} bytes and was dropped, "
+                    f"raise max_body_bytes of the capture policy to keep it."
+                )
+                return {}
+
+            response_body = captured.body
+            try:
+                if not response_body:
+                    self.alarm(f"Empty response body for request: {captured.url}")
+                    continue
+
+                return captured.json(self._decompress_response)
 
-            time.sleep(1)
+            except json.JSONDecodeError:
+                self.error("Error decoding JSON response.")
+                self.error(response_body)
+                return {}
+            except Exception as e:
+                self.error(f"Unexpected error: {str(e)}")
+                if os.getenv("DEBUG_MODE") == "true":
+                    pdb.set_trace()  # Enter interactive debugger
+                continue
 
     def get_and_store_base_categories(self) -> None:
         """
@@ -225,7 +516,7 @@ class MigrosScraper:
         This method retrieves the categories via a network request, stores any new categories in MongoDB.
 
         Steps:
-            1. Loads the main page.
+            1. Loads the main page, or calls the storemap endpoint in the API fetch mode.
             2. Retrieves the base categories from the "storemap" response.
             3. Stores new categories in MongoDB.
             4. Scrapes products associated with each base category.
@@ -238,8 +529,13 @@ class MigrosScraper:
         """
         try:
             self.yeet("Fetching and storing base categories")
-            self.load_main_page()
-            categories_response = self._get_specific_response("storemap")
+            if self.fetch_mode == "api":
+                categories_response = self._fetch_via_api(
+                    "the storemap", {}, self.api_client.get_storemap
+                )
+            else:
+                self.load_main_page()
+                categories_response = self._get_specific_response("storemap")
             self.base_categories = categories_response.get("categories", [])
             for category in self.base_categories:
                 self.mongo_service.insert_category(category)
@@ -249,6 +545,7 @@ class MigrosScraper:
             if untracked_categories:
                 self.mongo_service.insert_new_base_categories(untracked_categories)
             self.check_for_product_cards()
+            self._purge_captures()
         except PyMongoError as e:
             self.error(f"MongoDB operation failed: {str(e)}")
         except Exception as e:
@@ -258,39 +555,209 @@ class MigrosScraper:
 
     def scrape_categories_from_base(self) -> None:
         """
-        Scrapes the products and subcategories for a given category URL.
+        Walks the category tree below all base categories.
 
-        This method performs the following actions:
-            1. Sends a request to load the category URL.
-            2. Captures and processes the products within the category.
-            3. Retrieves subcategory data and returns their slugs for further scraping.
+        Subtrees scraped within the last `category_max_age_days` days are expanded
+        from their checkpoints in category_tracker without loading their pages.
+        """
+        try:
+            self.walk_category_tree(self.base_category_nodes())
+        except Exception as e:
+            self.error(f"Error while scraping categories: {str(e)}")
+            if os.getenv("DEBUG_MODE") == "true":
+                pdb.set_trace()  # Enter interactive debugger
+
+    def base_category_nodes(self) -> list[dict]:
+        """Returns the base categories as {"id", "slug", "url"} tree nodes."""
+        return [
+            {
+                "id": category["id"],
+                "slug": category["slug"],
+                "url": self.BASE_URL + "category/" + category["slug"],
+            }
+            for category in self.base_categories
+        ]
+
+    def walk_category_tree(self, roots: list[dict]) -> int:
+        """
+        Breadth-first traversal of the category tree down to `max_category_depth`.
 
         Args:
-            category_url (str): The full URL of the category page to scrape.
-            slug (str): The unique identifier or slug for the category being processed.
+            roots (list[dict]): Category nodes with "id", "slug" and "url".
 
         Returns:
-            list[str]: A list of slugs for the subcategories within the category.
+            int: The number of category nodes visited.
+        """
+        queue = deque((root, 0) for root in roots)
+        visited = set()
+        while queue:
+            node, depth = queue.popleft()
+            if node["id"] in visited:
+                continue
+            visited.add(node["id"])
+            children = self.expand_category(node["url"], node["slug"], node["id"])
+            if self.max_category_depth is None or depth < self.max_category_depth:
+                queue.extend((child, depth + 1) for child in children)
+        self.yeet(f"Visited {len(visited)} categories.")
+        return len(visited)
+
+    def _is_checkpoint_fresh(self, checkpoint: dict) -> bool:
+        # Entries written by mark_category_as_scraped have no children to expand.
+        if not checkpoint or "children" not in checkpoint:
+            return False
+        if not checkpoint.get("last_scraped"):
+            return False
+        oldest_fresh_day = (
+            datetime.now(timezone.utc).date()
+            - timedelta(days=self.category_max_age_days)
+        ).isoformat()
+        return checkpoint["last_scraped"] > oldest_fresh_day
+
+    @staticmethod
+    def _direct_children(categories: list[dict], category_id: int = None) -> list:
+        """
+        Picks the direct subcategories from a products/category response.
 
-        Raises:
-            Exception: If the category data or product information cannot be fetched.
+        The response lists the category itself and all its descendants. Following
+        those would revisit the node under a longer URL forever, so only the next
+        level below the node is kept.
         """
-        try:
-            for category in self.base_categories:
-                category_url = self.BASE_URL + "category/" + category["slug"]
-                second_level_slugs = self.scrape_category_via_url(
-                    category_url, category["slug"]
-                )
-                self.mongo_service.mark_category_as_scraped(
-                    category["id"], self.current_day_in_iso()
+        own = next((c for c in categories if c["id"] == category_id), None)
+        if own is not None and own.get("level") is not None:
+            return [c for c in categories if c.get("level") == own["level"] + 1]
+        return [c for c in categories if c["id"] != category_id]
+
+    def expand_category(
+        self,
+        category_url: str,
+        slug: str,
+        category_id: int = None,
+        raise_errors: bool = False,
+    ) -> list[dict]:
+        """
+        Returns the direct subcategories of a category node.
+
+        The page is only loaded if the node's checkpoint is stale. After a load the
+        node is checkpointed with its children, so later runs can expand it without
+        a request.
+
+        Args:
+            category_url (str): Full URL of the category page.
+            slug (str): Slug of the category.
+            category_id (int, optional): ID of the category, needed for checkpoints.
+            raise_errors (bool): Re-raise errors of the page load, see scrape_category_node.
+
+        Returns:
+            list[dict]: The subcategories as {"id", "slug", "url"} dicts.
+        """
+        children = None
+        if category_id is not None:
+            checkpoint = self.mongo_service.get_category_checkpoint(
+                category_id, self.shard
+            )
+            if self._is_checkpoint_fresh(checkpoint):
+                self.yeet(f"Category {slug} is fresh, expanding from checkpoint.")
+                children = checkpoint["children"]
+        if children is None:
+            categories = self.scrape_category_node(category_url, slug, raise_errors)
+            if categories is None:
+                return []
+            children = [
+                {"id": category["id"], "slug": category["slug"]}
+                for category in self._direct_children(categories, category_id)
+            ]
+            if category_id is not None:
+                self.mongo_service.save_category_checkpoint(
+                    category_id,
+                    category_url,
+                    children,
+                    self.current_day_in_iso(),
+                    self.shard,
                 )
-                for slug in second_level_slugs:
-                    url = self.BASE_URL + "category/" + category["slug"] + "/" + slug
-                    self.scrape_category_via_url(url, slug)
+        return [
+            dict(child, url=category_url + "/" + child["slug"])
+            for child in children
+            if child["id"] != category_id
+        ]
+
+    def seed_frontier_with_base_categories(self) -> None:
+        """Adds every base category to the crawl frontier."""
+        for category in self.base_categories:
+            self.frontier.push(
+                CrawlFrontier.CATEGORY,
+                self.BASE_URL + "category/" + category["slug"],
+                payload={"slug": category["slug"], "id": category["id"], "depth": 0},
+            )
+
+    def run_frontier(self, max_items: int = None) -> int:
+        """
+        Works through the crawl frontier until it is empty.
+
+        Items are popped one at a time, so if the run is killed the remaining items
+        (and the one in progress) are still in MongoDB for the next run.
+
+        Args:
+            max_items (int, optional): Stop after this many items.
+
+        Returns:
+            int: The number of items processed.
+        """
+        processed = 0
+        while max_items is None or processed < max_items:
+            if not self.run_frontier_item():
+                break
+            processed += 1
+        self.yeet(f"Processed {processed} crawl frontier items.")
+        return processed
+
+    def run_frontier_item(self) -> bool:
+        """
+        Pops and processes one crawl frontier item.
+
+        Returns:
+            bool: False if nothing was pending.
+        """
+        item = self.frontier.pop()
+        if item is None:
+            return False
+        try:
+            self._process_frontier_item(item)
+            self.frontier.complete(item)
+        except SystemExit as e:
+            # Give the item back, so the run or worker that continues picks it up.
+            self.frontier.fail(item, str(e))
+            raise
         except Exception as e:
-            self.error(f"Error while scraping categories: {str(e)}")
-            if os.getenv("DEBUG_MODE") == "true":
-                pdb.set_trace()  # Enter interactive debugger
+            self.frontier.fail(item, str(e))
+        return True
+
+    def _process_frontier_item(self, item: dict) -> None:
+        """Scrapes one frontier item and pushes the subcategories it finds."""
+        payload = item["payload"]
+        if item["kind"] == CrawlFrontier.PRODUCT:
+            self._discovery_depth = payload.get("depth", 0)
+            try:
+                self.scrape_product_by_id(item["key"], raise_errors=True)
+            finally:
+                self._discovery_depth = 0
+            return
+
+        # Errors fail the item, so the frontier retries it.
+        children = self.expand_category(
+            item["key"], payload["slug"], payload.get("id"), raise_errors=True
+        )
+        depth = payload["depth"]
+        if self.max_category_depth is None or depth < self.max_category_depth:
+            for child in children:
+                self.frontier.push(
+                    CrawlFrontier.CATEGORY,
+                    child["url"],
+                    payload={
+                        "slug": child["slug"],
+                        "id": child["id"],
+                        "depth": depth + 1,
+                    },
+                )
 
     def scrape_category_via_url(self, category_url: str, slug: str) -> list[str]:
         """
@@ -303,88 +770,363 @@ class MigrosScraper:
         Returns:
             list[str]: List of subcategory slugs found within the category.
         """
+        categories = self.scrape_category_node(category_url, slug) or []
+        return [category["slug"] for category in categories]
+
+    def scrape_category_node(
+        self, category_url: str, slug: str, raise_errors: bool = False
+    ) -> list[dict] | None:
+        """
+        Loads a category page, scrapes its product cards and stores its subcategories.
+
+        In the API fetch mode, the products/category endpoint is called instead
+        and no product cards are checked.
+
+        Args:
+            category_url (str): Full URL of the category page to scrape.
+            slug (str): Unique slug identifier for the category.
+            raise_errors (bool): Re-raise errors after logging them instead of returning None.
+
+        Returns:
+            list[dict] | None: The subcategories from the "products/category" response,
+            or None if the page could not be scraped.
+        """
         self.yeet(f"Scraping category URL: {category_url}")
         try:
-            self.make_request_and_validate(category_url)
+            if self.fetch_mode == "api":
+                category_data = self._fetch_via_api(
+                    f"category {slug}", {}, self.api_client.get_category, slug
+                )
+            else:
+                self.make_request_and_validate(category_url)
+                # Read before checking product cards, scraping discoveries loads other pages.
+                category_data = self._get_specific_response("products/category")
+            categories = category_data.get("categories", []) if category_data else []
+            for category in categories:
+                self.mongo_service.insert_category(category)
 
             self.check_for_product_cards()
+            self._purge_captures()
 
-            category_data = self._get_specific_response("products/category")
-            if category_data:
-                for category in category_data.get("categories", []):
-                    self.mongo_service.insert_category(category)
-                return [
-                    category["slug"] for category in category_data.get("categories", [])
-                ]
-            else:
+            if not category_data:
                 self.error(f"No subcategories found for category URL: {category_url}")
-                return []
+            return categories
         except PyMongoError as e:
             self.error(f"MongoDB error while scraping category {slug}: {str(e)}")
             if os.getenv("DEBUG_MODE") == "true":
                 pdb.set_trace()  # Enter interactive debugger
-            return []
+            if raise_errors:
+                raise
+            return None
         except Exception as e:
             self.error(f"Error while scraping category {slug}: {str(e)}")
             if os.getenv("DEBUG_MODE") == "true":
                 pdb.set_trace()  # Enter interactive debugger
-            return []
+            if raise_errors:
+                raise
+            return None
 
-    def scrape_product_by_id(self, migros_id: str) -> None:
+    def scrape_product_by_id(self, migros_id: str, raise_errors: bool = False) -> None:
         """
         Scrapes product details for a given migros_id.
 
+        The product is only marked as scraped once it was fetched and stored, so
+        a failed product is not skipped when it is retried.
+
         Args:
             migros_id (str): The unique identifier for the product.
+            raise_errors (bool): Re-raise errors after logging them, so a caller
+                like JobQueue.process can retry the product.
 
         Raises:
-            Exception: If scraping fails due to network or parsing issues.
+            Exception: If scraping fails due to network or parsing issues and
+            raise_errors is set.
         """
         try:
             self.yeet(f"Scraping product by id: {migros_id}")
-            if self.mongo_service.is_product_scraped_last_24_hours(migros_id):
-                self.yeet(f"Product {migros_id} already scraped today. Skipping.")
+            if self.mongo_service.is_product_scraped_within_hours(
+                migros_id, self.rescrape_after_hours
+            ):
+                self.yeet(
+                    f"Product {migros_id} scraped in the last {self.rescrape_after_hours:g} hours. Skipping."
+                )
                 self.todays_scraped_product_ids.add(migros_id)
                 return
-            self.mongo_service.save_scraped_product_id(migros_id)
-            product_url = self.BASE_URL + "product/" + migros_id
-            self.make_request_and_validate(product_url)
-            product_data = self._get_specific_response("product-detail")
+            if self.fetch_mode == "api":
+                product_data = self._fetch_product_detail_via_api(migros_id)
+                if product_data is None:
+                    self.yeet(f"Product {migros_id} unchanged since the last fetch.")
+            else:
+                product_url = self.BASE_URL + "product/" + migros_id
+                self.make_request_and_validate(product_url)
+                product_data = self._get_specific_response("product-detail")
             if product_data:
-                self.mongo_service.insert_product(product_data[0])
+                product = self._decode_product_detail(product_data[0])
+                if product is not None:
+                    self.mongo_service.insert_product(product)
+                    if self.fetch_mode == "api":
+                        # The next fetch may only answer "unchanged" once the product is stored.
+                        self.api_client.commit_product_detail(migros_id)
+            self.mongo_service.save_scraped_product_id(migros_id)
             self.check_for_product_cards()
+            self._purge_captures()
         except PyMongoError as e:
             self.error(f"MongoDB error while scraping product {migros_id}: {str(e)}")
+            if raise_errors:
+                raise
         except Exception as e:
             self.error(f"Error scraping product {migros_id}: {str(e)}")
             if os.getenv("DEBUG_MODE") == "true":
                 pdb.set_trace()  # Enter interactive debugger
+            if raise_errors:
+                raise
+
+    def _decode_product_detail(self, product_json: dict) -> ProductDetail | None:
+        """
+        Decodes one product of a product-detail response, keeping the payload to store.
+
+        Returns:
+            ProductDetail | None: The product, or None if it has no valid migrosId.
+        """
+        try:
+            return ProductDetail.from_json(product_json, keep_raw=True)
+        except ProductDetailError as e:
+            self.error(f"Invalid product-detail response: {str(e)}")
+            return None
+
+    def _bootstrap_api_session(self) -> None:
+        """
+        Loads the main page in the browser and hands its cookies and guest token
+        to the API client. Falls back to the guest token endpoint if the page did
+        not expose a token.
+        """
+        self.yeet("Bootstrapping API session from the browser.")
+        self.load_main_page()
+        self.api_client.bootstrap_from_driver(self.driver)
+        if not self.api_client.has_token:
+            self.api_client.refresh_guest_token()
+
+    def _fetch_product_detail_via_api(self, migros_id: str) -> list | None:
+        """
+        Fetches the product-detail response directly from the API, without loading the product page.
+
+        Args:
+            migros_id (str): The unique identifier for the product.
+
+        Returns:
+            list | None: The product-detail response, an empty list if the product could
+            not be fetched, or None if it did not change since the last fetch.
+
+        Raises:
+            SystemExit: If the API keeps answering with an error status.
+        """
+        return self._fetch_via_api(
+            f"product {migros_id}", [], self.api_client.get_product_detail, migros_id
+        )
+
+    def _fetch_via_api(self, what: str, default, fetch, *args):
+        """
+        Calls a MigrosApiClient method, paced by the rate limiter.
+
+        A rejected session is bootstrapped again from the browser once, a 429
+        slows the rate limiter down, and other error statuses stop the scraper
+        like they do for page loads.
+
+        Args:
+            what (str): What is fetched, for log messages.
+            default: Returned if the resource does not exist or could not be fetched.
+            fetch (Callable): The MigrosApiClient method to call.
+            *args: Arguments of `fetch`.
+
+        Returns:
+            The response of `fetch`, or `default`.
+
+        Raises:
+            SystemExit: If the API keeps answering with an error status.
+        """
+        if not self.api_client.has_token:
+            self._bootstrap_api_session()
+
+        for attempt in range(3):
+            self.rate_limiter.acquire()
+            start = time.monotonic()
+            try:
+                data = fetch(*args)
+                self.mongo_service.increment_request_count(self.current_day_in_iso())
+                self.rate_limiter.record_success(time.monotonic() - start)
+                self._record_first_request()
+                return data
+            except MigrosApiError as e:
+                self.mongo_service.increment_request_count(self.current_day_in_iso())
+                if e.status_code in (401, 403) and attempt == 0:
+                    self.alarm(f"API rejected our session ({e.status_code}).")
+                    self._bootstrap_api_session()
+                elif e.status_code == 429:
+                    retry_after = e.retry_after or 60
+                    self.error(
+                        f"Encountered HTTP 429, retrying after {retry_after} seconds."
+                    )
+                    self.rate_limiter.record_throttle(retry_after)
+                    self._save_rate_limiter_state()
+                elif e.status_code == 404:
+                    self.error(f"{what.capitalize()} not found via API.")
+                    return default
+                else:
+                    self.error(f"Error: {str(e)}. Stopping scraper.")
+                    self._log_scraper_state(e.url)
+                    self.close()
+                    raise SystemExit(f"Scraper stopped due to error on URL: {e.url}")
+            except (RequestException, ValueError) as e:
+                self.error(f"API request for {what} failed: {str(e)}")
+                return default
+
+        self.error(f"Giving up on {what} after repeated API errors.")
+        return default
+
+    def _claim_new_id(self, migros_id: str) -> bool:
+        """
+        Marks a migrosId as known.
+
+        Args:
+            migros_id (str): The id found on a product card.
+
+        Returns:
+            bool: True if the id was unknown and this scraper should fetch it.
+        """
+        if isinstance(self.known_ids, (SharedIdSet, KnownIdFilter)):
+            return self.known_ids.claim(migros_id)
+        if migros_id in self.known_ids:
+            return False
+        self.known_ids.add(migros_id)
+        return True
+
+    def _known_card_ids(self, product_cards: list) -> set:
+        """
+        Returns the migrosIds on product cards that are already known.
+
+        Args:
+            product_cards (list): The product-cards response of the current page.
+
+        Returns:
+            set: The known ids.
+        """
+        ids = [card["migrosId"] for card in product_cards if card.get("migrosId")]
+        if isinstance(self.known_ids, (KnownIdFilter, SharedIdSet)):
+            # One MongoDB query, or one call to the pool's manager, for the whole page.
+            return self.known_ids.known(ids)
+        return {migros_id for migros_id in ids if migros_id in self.known_ids}
+
+    def _refresh_prices_from_product_cards(
+        self, product_cards: list, known_ids: set
+    ) -> None:
+        """
+        Uses the offers on product cards to refresh prices of known products,
+        so they do not need a product page load of their own.
+
+        Args:
+            product_cards (list): The product-cards response of the current page.
+            known_ids (set): The known ids among the cards, see _known_card_ids.
+        """
+        known_cards = [
+            card
+            for card in product_cards
+            if card.get("migrosId") in known_ids
+            and card["migrosId"] not in self.price_checked_ids
+            and card["migrosId"] not in self.todays_scraped_product_ids
+        ]
+        if not known_cards:
+            return
+        try:
+            self.mongo_service.refresh_prices_from_product_cards(known_cards)
+            self.price_checked_ids.update(card["migrosId"] for card in known_cards)
+        except PyMongoError as e:
+            self.error(f"MongoDB error while refreshing card prices: {str(e)}")
+
+    def _may_discover(self) -> bool:
+        """
+        Checks the discovery limits for a product found on the current page.
+
+        Returns:
+            bool: False if the depth, the run budget or the queue size is exhausted.
+        """
+        if self._discovery_depth >= self.max_discovery_depth:
+            return False
+        if (
+            self.discovery_budget is not None
+            and self.discovered_count >= self.discovery_budget
+        ):
+            return False
+        if not self.frontier and len(self.discovery_queue) >= self.max_discovery_queue:
+            return False
+        return True
+
+    def _drain_discovery_queue(self) -> None:
+        """
+        Scrapes queued discoveries breadth-first. Products found while draining are
+        appended to the same queue, so the call stack stays flat however long the
+        chain of recommendations gets.
+        """
+        self._draining_discovery_queue = True
+        try:
+            while self.discovery_queue:
+                migros_id, depth = self.discovery_queue.popleft()
+                self._discovery_depth = depth
+                self.scrape_product_by_id(migros_id)
+        finally:
+            self._discovery_depth = 0
+            self._draining_discovery_queue = False
 
     def check_for_product_cards(self) -> None:
-        if self.disable_check_for_product_cards:
+        if self.disable_check_for_product_cards or self.fetch_mode == "api":
+            # Without a page load there are no product-cards responses to inspect.
             return
         try:
             self.yeet("Checking for product cards.")
             product_cards = self._get_specific_response("product-cards", 5)
             self.yeet(f"Found {len(product_cards)} product cards.")
+            if self.shard:
+                # Other shards discover and refresh the rest of the cards.
+                product_cards = [
+                    card
+                    for card in product_cards
+                    if card.get("migrosId") and self.shard.owns(card["migrosId"])
+                ]
             if not product_cards:
                 return
+            known_ids = self._known_card_ids(product_cards)
+            self._refresh_prices_from_product_cards(product_cards, known_ids)
+            depth = self._discovery_depth + 1
             for product in product_cards:
                 new_id = product.get("migrosId")
+                if not new_id or new_id in known_ids or not self._may_discover():
+                    continue
 
-                if new_id and new_id not in self.known_ids:
+                if self._claim_new_id(new_id):
                     self.yeet(f"new product card ID: {new_id}")
-                    self.scrape_product_by_id(new_id)
-                    self.known_ids.add(new_id)
+                    self.discovered_count += 1
+                    if self.frontier:
+                        self.frontier.push(
+                            CrawlFrontier.PRODUCT,
+                            new_id,
+                            priority=1,
+                            payload={"depth": depth},
+                        )
+                    else:
+                        self.discovery_queue.append((new_id, depth))
         except Exception as e:
             self.error(f"Error while checking for product cards: {str(e)}")
             if os.getenv("DEBUG_MODE") == "true":
                 pdb.set_trace()  # Enter interactive debugger
+        if not self._draining_discovery_queue:
+            self._drain_discovery_queue()
 
     def make_request_and_validate(self, url: str) -> None:
         """
         Sends a GET request to the specified URL, validates the response, and handles errors gracefully.
 
+        The request is paced by the adaptive rate limiter. A 429 answer slows the
+        limiter down and blocks it for the Retry-After time before the page is loaded again.
+
         Args:
             url (str): The target URL to send the request to.
 
@@ -393,41 +1135,51 @@ class MigrosScraper:
             SystemExit: If the response status code indicates an error (e.g., 429 or 4xx/5xx codes).
         """
         try:
-            del self.driver.requests
-            delay = random.uniform(0.0, (self.average_request_sleep_time * 2))
-            self.yeet(f"Sleeping for {delay:.2f} seconds before the next request.")
-            self.yeet(f"Making request to {url}")
-            self.driver.get(url)
-            time.sleep(delay)
-            self.mongo_service.increment_request_count(self.current_day_in_iso())
-
-            for request in self.driver.requests:
-                if url not in request.url:
-                    continue
-                if request.response is None:
-                    self.error(f"No response for request: {request.url}")
-                    continue
-                if request.response.status_code == 429:
-                    self.error(f"Encountered HTTP 429 Too Many Requests.")
-                    retry_after = int(request.response.headers.get("Retry-After", 60))
-                    if retry_after > 3600:
+            while True:
+                self._purge_captures()
+                self.response_mailbox.reset(url)
+                waited = self.rate_limiter.acquire()
+                self.yeet(f"Waited {waited:.2f} seconds before the next request.")
+                self.yeet(f"Making request to {url}")
+                start = time.monotonic()
+                self.driver.get(url)
+                latency = time.monotonic() - start
+                self.mongo_service.increment_request_count(self.current_day_in_iso())
+
+                throttled = False
+                for response in self.response_mailbox.page_responses():
+                    if response.status_code == 429:
+                        self.error(f"Encountered HTTP 429 Too Many Requests.")
+                        retry_after = int(response.headers.get("Retry-After", 60))
+                        if retry_after > 3600:
+                            self.error(
+                                f"Retry-After value is too high ({retry_after} seconds). Stopping scraper."
+                            )
+                            self._log_scraper_state(url, response)
+                            self.close()
+                            raise SystemExit(
+                                f"Scraper stopped due to Retry-After on URL: {url}"
+                            )
+                        self.error(f"Retrying after {retry_after} seconds.")
+                        self.rate_limiter.record_throttle(retry_after)
+                        self._save_rate_limiter_state()
+                        throttled = True
+                        break
+
+                    elif response.status_code >= 400:
                         self.error(
-                            f"Retry-After value is too high ({retry_after} seconds). Stopping scraper."
+                            f"Error: {url} returned HTTP status {response.status_code}. Stopping scraper."
                         )
-                        self._log_scraper_state(url, request)
-                    self.error(f"Retrying after {retry_after} seconds.")
-                    time.sleep(retry_after)
-                    self.make_request_and_validate(url)
+                        self._log_scraper_state(url, response)
+                        self.close()
+                        raise SystemExit(f"Scraper stopped due to error on URL: {url}")
+
+                if not throttled:
+                    self.rate_limiter.record_success(latency)
+                    self._record_first_request()
+                    self._maybe_report_memory()
                     return
 
-                elif request.response.status_code >= 400:
-                    self.error(
-                        f"Error: {url} returned HTTP status {request.response.status_code}. Stopping scraper."
-                    )
-                    self._log_scraper_state(url, request)
-                    self.close()
-                    raise SystemExit(f"Scraper stopped due to error on URL: {url}")
-
         except WebDriverException as e:
             self.error(f"WebDriverException on {url}: {str(e)}")
             self._log_scraper_state(url)
@@ -446,14 +1198,51 @@ class MigrosScraper:
 
 
 if __name__ == "__main__":
+    from src.worker_pool import ScraperWorkerPool, WorkerConfig
+
     load_dotenv()
 
     MONGO_URI = os.getenv("MONGO_URI")
     MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
     RUNNING_IN_GITHUB_ACTIONS = os.getenv("GITHUB_ACTIONS") == "true"
+    FETCH_MODE = os.getenv("FETCH_MODE", "browser")
+    SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "1"))
+    # "lean" blocks non-essential requests, opt-in, see docs/README.md.
+    BLOCKING_PROFILE = os.getenv("BLOCKING_PROFILE", "off")
+    CAPTURE_POLICY = os.getenv("CAPTURE_POLICY", "bounded")
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")
+    BROWSER_PROFILE_DIR = os.getenv("BROWSER_PROFILE_DIR")
+    CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "proxy")
+    KNOWN_ID_FILTER = os.getenv("KNOWN_ID_FILTER") == "true"
+    # Lets several nodes split the refresh through a queue in MongoDB.
+    USE_JOB_QUEUE = os.getenv("JOB_QUEUE") == "true"
+    # "adaptive" refreshes by price-change rate, "fixed" after a fixed number of days.
+    REVISIT_SCHEDULE = os.getenv("REVISIT_SCHEDULE", "adaptive")
+    REVISIT_POLICY = RevisitPolicy()
+    # Adaptive products can be due again after the minimum interval, not only after a day.
+    RESCRAPE_AFTER_HOURS = (
+        24 if REVISIT_SCHEDULE == "fixed" else REVISIT_POLICY.min_interval_days * 24
+    )
+    # K instances with SHARD_INDEX 0..K-1 and SHARD_COUNT K split the products.
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+    SHARD = (
+        Shard(int(os.getenv("SHARD_INDEX", "0")), SHARD_COUNT)
+        if SHARD_COUNT > 1
+        else None
+    )
 
     yeeter = Yeeter()
     mongo_service = MongoService(MONGO_URI, MONGO_DB_NAME, yeeter)
+    frontier = CrawlFrontier(
+        mongo_service,
+        collection=(
+            f"crawl_frontier_shard_{SHARD.index}_of_{SHARD.count}"
+            if SHARD
+            else "crawl_frontier"
+        ),
+    )
+    # Keeps every captured API response so history can be re-parsed offline.
+    archive = ResponseArchive(ARCHIVE_DIR, yeeter) if ARCHIVE_DIR else None
     average_request_sleep_time = 2.0
     if not RUNNING_IN_GITHUB_ACTIONS:
         average_request_sleep_time = 3.0
@@ -462,33 +1251,125 @@ if __name__ == "__main__":
         mongo_service=mongo_service,
         yeeter=yeeter,
         average_request_sleep_time=average_request_sleep_time,
+        fetch_mode=FETCH_MODE,
+        blocking_profile=BLOCKING_PROFILE,
+        frontier=frontier,
+        archive=archive,
+        profile_dir=(
+            os.path.join(BROWSER_PROFILE_DIR, "main") if BROWSER_PROFILE_DIR else None
+        ),
+        capture_backend=CAPTURE_BACKEND,
+        capture_policy=CAPTURE_POLICY,
+        known_id_filter=KNOWN_ID_FILTER,
+        shard=SHARD,
+        rescrape_after_hours=RESCRAPE_AFTER_HOURS,
     )
     try:
         yeeter.yeet("Running in GitHub Actions:")
         yeeter.yeet(RUNNING_IN_GITHUB_ACTIONS)
+        yeeter.yeet(f"Fetch mode: {FETCH_MODE}")
+        if SHARD:
+            yeeter.yeet(f"Shard: {SHARD}")
         days = 5 if RUNNING_IN_GITHUB_ACTIONS else 3
         limit = 400 if RUNNING_IN_GITHUB_ACTIONS else 10001
         yeeter.yeet(f"{days} days, {limit} products")
 
+        if frontier.resume():
+            # A previous run was interrupted, finish its crawl first.
+            scraper.run_frontier()
+
+        pool = None
+        if SCRAPER_WORKERS > 1:
+            # With the filter, workers load its snapshot instead of getting every id.
+            # Otherwise the KnownIdSet goes to the manager as its compact int64 array.
+            pool_known_ids = None if KNOWN_ID_FILTER else scraper.known_ids
+            pool = ScraperWorkerPool(
+                WorkerConfig(
+                    mongo_uri=MONGO_URI,
+                    mongo_db_name=MONGO_DB_NAME,
+                    frontier_collection=frontier.collection.name,
+                    scraper_options={
+                        "average_request_sleep_time": average_request_sleep_time,
+                        "blocking_profile": BLOCKING_PROFILE,
+                        "profile_dir": BROWSER_PROFILE_DIR,
+                        "capture_backend": CAPTURE_BACKEND,
+                        "capture_policy": CAPTURE_POLICY,
+                        "known_id_filter": KNOWN_ID_FILTER,
+                        "shard": SHARD,
+                        "rescrape_after_hours": RESCRAPE_AFTER_HOURS,
+                    },
+                ),
+                yeeter,
+                workers=SCRAPER_WORKERS,
+            )
+
         if not RUNNING_IN_GITHUB_ACTIONS:
+            frontier.clear()
             scraper.get_and_store_base_categories()
-            scraper.scrape_categories_from_base()
+            scraper.seed_frontier_with_base_categories()
+            if pool:
+                # The workers crawl the frontier together.
+                pool.run(
+                    known_ids=pool_known_ids,
+                    rate_limiter_state=scraper.rate_limiter.state(),
+                )
+            else:
+                scraper.run_frontier()
 
         edible_ids = mongo_service.db.products.distinct(
             "migrosId", {"productInformation.nutrientsInformation": {"$exists": True}}
         )
         yeeter.yeet(f"Found {len(edible_ids)} edible products.")
 
-        yeeter.yeet(f"Fetching products not scraped in {days}+ days.")
-        ids_to_scrape = mongo_service.get_products_not_scraped_in_days(
-            days=days, limit=limit
-        )
+        if REVISIT_SCHEDULE == "fixed":
+            yeeter.yeet(f"Fetching products not scraped in {days}+ days.")
+            ids_to_scrape = mongo_service.get_products_not_scraped_in_days(
+                days=days, limit=limit, shard=SHARD
+            )
+        else:
+            # Products are due according to how often their price changed.
+            scheduler = RevisitScheduler(mongo_service, REVISIT_POLICY)
+            scheduler.update(shard=SHARD)
+            ids_to_scrape = scheduler.due_products(limit=limit, shard=SHARD)
         yeeter.yeet(f"Scraping {len(ids_to_scrape)} products.")
         yeeter.yeet(ids_to_scrape)
 
-        for migros_id in ids_to_scrape:
-            scraper.scrape_product_by_id(migros_id)
+        if FETCH_MODE == "api":
+            engine = AsyncRefreshEngine(
+                mongo_service=mongo_service,
+                yeeter=yeeter,
+                api_client=scraper.api_client,
+                concurrency=int(os.getenv("REFRESH_CONCURRENCY", "4")),
+                rescrape_after_hours=RESCRAPE_AFTER_HOURS,
+                # Paced and saved together with the scraper's own requests.
+                rate_limiter=scraper.rate_limiter,
+            )
+            engine.refresh(ids_to_scrape)
+        elif pool:
+            # Products found on product cards are crawled by the workers too.
+            pool.run(
+                known_ids=pool_known_ids,
+                product_ids=ids_to_scrape,
+                rate_limiter_state=scraper.rate_limiter.state(),
+            )
+        elif USE_JOB_QUEUE:
+            # Every node enqueues the stale ids, open jobs are not duplicated.
+            job_queue = JobQueue(mongo_service, "refresh")
+            job_queue.enqueue_many(ids_to_scrape)
+            # Failed products are retried by the queue and dead-lettered in the end.
+            job_queue.process(
+                functools.partial(scraper.scrape_product_by_id, raise_errors=True)
+            )
+            yeeter.yeet(f"Refresh queue: {job_queue.counts()}")
+            scraper.run_frontier()
+        else:
+            for migros_id in ids_to_scrape:
+                scraper.scrape_product_by_id(migros_id)
+            # New products found on product cards during the refresh.
+            scraper.run_frontier()
 
         yeeter.yeet("Finished scraping products. Closing scraper.")
     finally:
         scraper.close()
+        if archive:
+            archive.close()
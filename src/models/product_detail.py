@@ -0,0 +1,174 @@
+from dataclasses import dataclass, field
+
+
+class ProductDetailError(ValueError):
+    """Raised when a product-detail payload does not have the expected shape."""
+
+
+def _expect(value, types, path: str, required: bool = False):
+    """
+    Returns value if it has one of the given types.
+
+    An optional field that is missing or has another type is read as None, so
+    one odd field does not cost the whole product. A required field raises.
+    """
+    if value is None or isinstance(value, bool) or not isinstance(value, types):
+        if not required:
+            return None
+        if value is None:
+            raise ProductDetailError(f"Missing required field '{path}'")
+        raise ProductDetailError(
+            f"Field '{path}' has type {type(value).__name__}, expected {types}"
+        )
+    return value
+
+
+def _dict(parent: dict, key: str, path: str) -> dict:
+    return _expect(parent.get(key), dict, path) or {}
+
+
+@dataclass(slots=True, frozen=True)
+class PriceDetail:
+    value: float = None
+    unit_price: float = None
+
+    @classmethod
+    def from_json(cls, price_json: dict, path: str) -> "PriceDetail":
+        unit_price_json = _dict(price_json, "unitPrice", path + ".unitPrice")
+        return cls(
+            value=_expect(price_json.get("value"), (int, float), path + ".value"),
+            unit_price=_expect(
+                unit_price_json.get("value"), (int, float), path + ".unitPrice.value"
+            ),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class OfferDetail:
+    price: PriceDetail
+    promotion_price: PriceDetail = None
+    quantity: str = None
+    quantity_price: str = None  # e.g. "0.85/100g"
+
+    @classmethod
+    def from_json(cls, offer_json: dict) -> "OfferDetail":
+        promotion_json = _expect(
+            offer_json.get("promotionPrice"), dict, "offer.promotionPrice"
+        )
+        return cls(
+            price=PriceDetail.from_json(
+                _dict(offer_json, "price", "offer.price"), "offer.price"
+            ),
+            promotion_price=(
+                PriceDetail.from_json(promotion_json, "offer.promotionPrice")
+                if promotion_json
+                else None
+            ),
+            quantity=_expect(offer_json.get("quantity"), str, "offer.quantity"),
+            quantity_price=_expect(
+                offer_json.get("quantityPrice"), str, "offer.quantityPrice"
+            ),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class NutrientsTable:
+    headers: tuple[str, ...]
+    rows: tuple[tuple[str, tuple[str, ...]], ...]  # (label, values) pairs
+
+    @classmethod
+    def from_json(cls, table_json: dict) -> "NutrientsTable":
+        path = "productInformation.nutrientsInformation.nutrientsTable"
+        headers = _expect(table_json.get("headers"), list, path + ".headers") or []
+        rows = []
+        for row in _expect(table_json.get("rows"), list, path + ".rows") or []:
+            if not isinstance(row, dict):
+                continue
+            values = _expect(row.get("values"), list, path + ".rows[].values") or []
+            rows.append((row.get("label") or "", tuple(values)))
+        return cls(headers=tuple(headers), rows=tuple(rows))
+
+
+@dataclass(slots=True, frozen=True)
+class ProductDetail:
+    """
+    The fields of a product-detail product that the scraper and the SQL sync use.
+
+    Decoding checks the types of those fields once, so the models can use
+    plain attribute access instead of chains of `.get()`. Only migrosId is
+    required, optional fields with an unexpected type are read as None. The
+    original payload can be kept in `raw`, which is what the scraper stores.
+    """
+
+    migros_id: str
+    name: str = None
+    brand: str = None
+    title: str = None
+    description: str = None
+    ingredients: str = None
+    gtins: tuple[str, ...] = ()
+    date_added: str = None
+    offer: OfferDetail = None
+    nutrients_table: NutrientsTable = None
+    raw: dict = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_json(cls, product_json: dict, keep_raw: bool = False) -> "ProductDetail":
+        """
+        Decodes one product of a product-detail response.
+
+        Args:
+            product_json (dict): The product dictionary, as scraped or as stored in MongoDB.
+            keep_raw (bool): Keep a reference to the payload in `raw`.
+
+        Returns:
+            ProductDetail: The decoded product.
+
+        Raises:
+            ProductDetailError: If migrosId is missing or not a string.
+        """
+        _expect(product_json, dict, "product", required=True)
+        information = _dict(product_json, "productInformation", "productInformation")
+        main_information = _dict(
+            information, "mainInformation", "productInformation.mainInformation"
+        )
+        nutrients_information = _dict(
+            information,
+            "nutrientsInformation",
+            "productInformation.nutrientsInformation",
+        )
+        table_json = _expect(
+            nutrients_information.get("nutrientsTable"),
+            dict,
+            "productInformation.nutrientsInformation.nutrientsTable",
+        )
+        offer_json = _expect(product_json.get("offer"), dict, "offer")
+        gtins = _expect(product_json.get("gtins"), (list, str), "gtins") or ()
+        if isinstance(gtins, str):
+            gtins = tuple(gtins.split(","))
+
+        return cls(
+            migros_id=_expect(
+                product_json.get("migrosId"), str, "migrosId", required=True
+            ),
+            name=_expect(product_json.get("name"), str, "name"),
+            brand=_expect(
+                product_json.get("brand") or product_json.get("brandLine"),
+                str,
+                "brand",
+            ),
+            title=_expect(product_json.get("title"), str, "title"),
+            description=_expect(product_json.get("description"), str, "description"),
+            ingredients=_expect(
+                main_information.get("ingredients"),
+                str,
+                "productInformation.mainInformation.ingredients",
+            ),
+            gtins=tuple(gtins),
+            date_added=_expect(product_json.get("dateAdded"), str, "dateAdded"),
+            offer=OfferDetail.from_json(offer_json) if offer_json else None,
+            nutrients_table=(
+                NutrientsTable.from_json(table_json) if table_json else None
+            ),
+            raw=product_json if keep_raw else None,
+        )
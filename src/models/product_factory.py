@@ -4,6 +4,7 @@ from datetime import datetime
 
 from src.models.nutrition import Nutrition
 from src.models.offer import Offer
+from src.models.product_detail import NutrientsTable, OfferDetail, ProductDetail
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -35,22 +36,23 @@ class ProductFactory:
 
     @staticmethod
     def create_product_from_json(product_json):
-        from src.models.product import Product
+        return ProductFactory.create_product_from_detail(
+            ProductDetail.from_json(product_json)
+        )
 
-        nutrient_id = None
-        offer_id = None
-        nutrition = None
-        offer = None
+    @staticmethod
+    def create_product_from_detail(detail: ProductDetail):
+        from src.models.product import Product
 
         # Extract nutrients
-        nutrition = extract_nutrients(product_json)
+        nutrition = extract_nutrients(detail.nutrients_table)
 
         # Extract offer
-        offer = extract_offer(product_json)
+        offer = extract_offer(detail.offer)
 
         # Extract product
         try:
-            scraped_at_str = product_json.get("dateAdded")
+            scraped_at_str = detail.date_added
             if scraped_at_str:
                 try:
                     scraped_at = datetime.fromisoformat(scraped_at_str)
@@ -62,21 +64,16 @@ class ProductFactory:
             else:
                 scraped_at = datetime.now()
 
-            gtins = product_json.get("gtins", [])
-            gtins_str = ",".join(gtins) if isinstance(gtins, list) else gtins
-
             product = Product(
-                migros_id=product_json.get("migrosId"),
-                name=product_json.get("name"),
-                brand=product_json.get("brand") or product_json.get("brandLine"),
-                title=product_json.get("title"),
-                description=product_json.get("description", None),
-                ingredients=product_json.get("productInformation", {})
-                .get("mainInformation", {})
-                .get("ingredients", None),
+                migros_id=detail.migros_id,
+                name=detail.name,
+                brand=detail.brand,
+                title=detail.title,
+                description=detail.description,
+                ingredients=detail.ingredients,
                 nutrition=nutrition,
                 offer=offer,
-                gtins=gtins_str,
+                gtins=",".join(detail.gtins),
                 scraped_at=scraped_at,
             )
         except Exception as e:
@@ -85,17 +82,12 @@ class ProductFactory:
         return product
 
 
-def extract_nutrients(product_json):
+def extract_nutrients(nutrients_table: NutrientsTable):
     try:
-        nutrients_table = (
-            product_json.get("productInformation", {})
-            .get("nutrientsInformation", {})
-            .get("nutrientsTable", None)
-        )
         if not nutrients_table:
             return None
 
-        headers = nutrients_table.get("headers", [])
+        headers = nutrients_table.headers
         if not headers:
             return None
 
@@ -141,7 +133,6 @@ def extract_nutrients(product_json):
             return None
             # raise ValueError("Missing per 100g/ml header.")
 
-        rows = nutrients_table.get("rows", [])
         nutrient_data = {
             "unit": unit,
             "quantity": quantity,
@@ -156,9 +147,8 @@ def extract_nutrients(product_json):
             "salt": None,
         }
 
-        for row in rows:
-            label = row.get("label", "").lower()
-            values = row.get("values", [])
+        for label, values in nutrients_table.rows:
+            label = label.lower()
             if len(values) > unit_index:
                 value = values[unit_index]
                 if "energy" in label:
@@ -200,20 +190,23 @@ def extract_nutrients(product_json):
         return None
 
 
-def extract_offer(product_json):
-    offer_json = product_json.get("offer", {})
+def extract_offer(offer_detail: OfferDetail):
     try:
-        if offer_json:
-            offer_json = product_json.get("offer", {})
-            price = offer_json.get("price", {}).get("value")
-            quantity_str = offer_json.get("quantity")
-            promotion_price = offer_json.get("promotionPrice", {}).get("value")
-
-            normal_unit_price, promotion_unit_price = calculate_unit_prices(offer_json)
+        if offer_detail:
+            promotion = offer_detail.promotion_price
+            promotion_price = promotion.value if promotion else None
+
+            normal_unit_price, promotion_unit_price = _unit_prices(
+                offer_detail.price.value,
+                offer_detail.price.unit_price,
+                promotion_price,
+                promotion.unit_price if promotion else None,
+                offer_detail.quantity_price,
+            )
 
             offer = Offer(
-                price=price,
-                quantity=quantity_str,
+                price=offer_detail.price.value,
+                quantity=offer_detail.quantity,
                 unit_price=normal_unit_price,
                 promotion_price=promotion_price,
                 promotion_unit_price=promotion_unit_price,
@@ -260,28 +253,35 @@ def calculate_unit_prices(offer_json):
     if not offer_json:
         return None, None
 
-    price = offer_json.get("price", {}).get("value")
-    promotion_price = offer_json.get("promotionPrice", {}).get("value")
-    unit_info = offer_json.get("price", {}).get("unitPrice")
-    promotion_unit_info = offer_json.get("promotionPrice", {}).get("unitPrice")
-    quantity_price_str = offer_json.get("quantityPrice")  # e.g. "0.85/100g"
-
+    unit_info = offer_json.get("price", {}).get("unitPrice") or {}
+    promotion_unit_info = offer_json.get("promotionPrice", {}).get("unitPrice") or {}
+    return _unit_prices(
+        offer_json.get("price", {}).get("value"),
+        unit_info.get("value"),
+        offer_json.get("promotionPrice", {}).get("value"),
+        promotion_unit_info.get("value"),
+        offer_json.get("quantityPrice"),  # e.g. "0.85/100g"
+    )
+
+
+def _unit_prices(
+    price, unit_price, promotion_price, promotion_unit_price, quantity_price_str
+):
+    """calculate_unit_prices on already extracted offer fields."""
     normal_unit_price = None
-    promotion_unit_price = None
 
     # Check if there is a promotion
     has_promotion = promotion_price is not None
 
     # If there's a promotion, try promotionPrice.unitPrice first
-    if has_promotion and promotion_unit_info:
-        promotion_unit_price = promotion_unit_info.get("value")
-        if unit_info:
-            return unit_info.get("value"), promotion_unit_price
+    if has_promotion and promotion_unit_price is not None:
+        if unit_price is not None:
+            return unit_price, promotion_unit_price
         normal_unit_price = promotion_unit_price / promotion_price * price
         return normal_unit_price, promotion_unit_price
 
-    if unit_info:
-        return unit_info.get("value"), None
+    if unit_price is not None:
+        return unit_price, None
 
     q_val, q_qty, q_unit = parse_quantity_price(quantity_price_str)
     # if it is kg or l then convert to 100 g or ml
@@ -300,4 +300,4 @@ def calculate_unit_prices(offer_json):
 
     normal_unit_price = q_val / q_qty * 100
 
-    return normal_unit_price, promotion_unit_price
+    return normal_unit_price, None
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from requests.exceptions import RequestException
+
+from src.models.product_detail import ProductDetail
+from src.services.migros_api import MigrosApiClient, MigrosApiError
+from src.services.mongo_service import MongoService
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.yeeter import Yeeter
+
+
+@dataclass
+class RefreshResult:
+    migros_id: str
+    status: str  # "refreshed", "unchanged", "skipped" or "failed"
+    latency: float
+    attempts: int = 0
+    error: str = None
+
+
+class AsyncRefreshEngine:
+    """
+    Refreshes a list of migrosIds through the direct API with bounded concurrency.
+
+    `concurrency` worker tasks take the ids from a queue, so only that many
+    products are in flight at a time, however long the list is. Requests are
+    paced by an AdaptiveRateLimiter, usually the one of the scraper, so a 429
+    slows down the browser and the API requests alike and the rate the run
+    ends with is saved with the scraper's. The API client, MongoService and the
+    limiter block, so each of their calls runs in a thread (asyncio.to_thread);
+    the event loop only schedules the workers.
+    """
+
+    def __init__(
+        self,
+        mongo_service: MongoService,
+        yeeter: Yeeter,
+        api_client: MigrosApiClient = None,
+        concurrency: int = 4,
+        requests_per_second: float = 1.0,
+        max_attempts: int = 3,
+        rescrape_after_hours: float = 24,
+        rate_limiter: AdaptiveRateLimiter = None,
+    ):
+        self.mongo_service = mongo_service
+        self.yeeter = yeeter
+        self.api_client = api_client or MigrosApiClient(
+            yeeter, pool_size=concurrency, validator_store=mongo_service
+        )
+        self.concurrency = concurrency
+        if rate_limiter is None:
+            # Without a limiter to share, requests_per_second is the starting and highest rate.
+            rate_limiter = (
+                AdaptiveRateLimiter(
+                    rate=requests_per_second, max_rate=requests_per_second
+                )
+                if requests_per_second > 0
+                else AdaptiveRateLimiter.unlimited()
+            )
+        self.rate_limiter = rate_limiter
+        self.max_attempts = max_attempts
+        self.rescrape_after_hours = rescrape_after_hours
+
+    def refresh(self, migros_ids: list[str]) -> list[RefreshResult]:
+        """Blocking entry point, runs the engine on a new event loop."""
+        return asyncio.run(self.run(migros_ids))
+
+    async def run(self, migros_ids: list[str]) -> list[RefreshResult]:
+        """
+        Refreshes all given products and reports the outcome for each of them.
+
+        Args:
+            migros_ids (list[str]): The products to refresh.
+
+        Returns:
+            list[RefreshResult]: One result per id, in the order of `migros_ids`.
+        """
+        if not self.api_client.has_token:
+            await asyncio.to_thread(self.api_client.refresh_guest_token)
+
+        queue = asyncio.Queue()
+        for index, migros_id in enumerate(migros_ids):
+            queue.put_nowait((index, migros_id))
+        results = [None] * len(migros_ids)
+        started = time.monotonic()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    index, migros_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[index] = await self.refresh_one(migros_id)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        self._report(results, time.monotonic() - started)
+        return results
+
+    async def refresh_one(self, migros_id: str) -> RefreshResult:
+        """
+        Fetches one product and hands it to MongoService.
+
+        Args:
+            migros_id (str): The unique identifier for the product.
+
+        Returns:
+            RefreshResult: The outcome for this product.
+        """
+        start = time.monotonic()
+        attempts = 0
+        try:
+            if await asyncio.to_thread(
+                self.mongo_service.is_product_scraped_within_hours,
+                migros_id,
+                self.rescrape_after_hours,
+            ):
+                return RefreshResult(migros_id, "skipped", time.monotonic() - start)
+
+            while attempts < self.max_attempts:
+                attempts += 1
+                await asyncio.to_thread(self.rate_limiter.acquire)
+                request_start = time.monotonic()
+                try:
+                    product_data = await asyncio.to_thread(
+                        self.api_client.get_product_detail, migros_id
+                    )
+                    self.rate_limiter.record_success(time.monotonic() - request_start)
+                except MigrosApiError as e:
+                    if e.status_code == 429:
+                        # Slows down and blocks every worker sharing the limiter.
+                        self.rate_limiter.record_throttle(e.retry_after or 60)
+                        self.yeeter.error(
+                            f"HTTP 429 for {migros_id}, pausing all requests "
+                            f"for {e.retry_after or 60} seconds."
+                        )
+                        continue
+                    if e.status_code in (401, 403):
+                        await asyncio.to_thread(self.api_client.refresh_guest_token)
+                        continue
+                    raise
+                finally:
+                    await asyncio.to_thread(
+                        self.mongo_service.increment_request_count,
+                        self.mongo_service.current_day_in_iso(),
+                    )
+
+                if product_data is None:
+                    # 304 or the same body as last time, nothing to store.
+                    await asyncio.to_thread(
+                        self.mongo_service.save_scraped_product_id, migros_id
+                    )
+                    return RefreshResult(
+                        migros_id, "unchanged", time.monotonic() - start, attempts
+                    )
+                if product_data:
+                    # Raises ProductDetailError (a ValueError) without a valid migrosId.
+                    product = ProductDetail.from_json(product_data[0], keep_raw=True)
+                    await asyncio.to_thread(self.mongo_service.insert_product, product)
+                # Only a stored product may be answered with "unchanged" next time.
+                await asyncio.to_thread(
+                    self.api_client.commit_product_detail, migros_id
+                )
+                await asyncio.to_thread(
+                    self.mongo_service.save_scraped_product_id, migros_id
+                )
+                return RefreshResult(
+                    migros_id, "refreshed", time.monotonic() - start, attempts
+                )
+
+            return RefreshResult(
+                migros_id,
+                "failed",
+                time.monotonic() - start,
+                attempts,
+                "Too many attempts",
+            )
+        except (MigrosApiError, RequestException, ValueError) as e:
+            return RefreshResult(
+                migros_id, "failed", time.monotonic() - start, attempts, str(e)
+            )
+        except Exception as e:
+            self.yeeter.error(f"Unexpected error refreshing {migros_id}: {str(e)}")
+            return RefreshResult(
+                migros_id, "failed", time.monotonic() - start, attempts, str(e)
+            )
+
+    def _report(self, results: list[RefreshResult], elapsed: float) -> None:
+        """Logs the outcome per id and a summary of the whole run."""
+        for result in results:
+            message = (
+                f"{result.migros_id}: {result.status} in {result.latency:.2f}s "
+                f"({result.attempts} attempts)"
+            )
+            if result.status == "failed":
+                self.yeeter.error(f"{message}: {result.error}")
+            else:
+                self.yeeter.yeet(message)
+
+        counts = {
+            status: 0 for status in ("refreshed", "unchanged", "skipped", "failed")
+        }
+        for result in results:
+            counts[result.status] += 1
+        self.yeeter.yeet(
+            f"Refreshed {counts['refreshed']}, unchanged {counts['unchanged']}, "
+            f"skipped {counts['skipped']}, failed {counts['failed']} products "
+            f"in {elapsed:.1f}s."
+        )
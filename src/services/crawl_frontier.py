@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.services.mongo_service import MongoService
+
+
+class CrawlFrontier:
+    """
+    Persistent work list of the crawl, stored in the 'crawl_frontier' collection.
+
+    Every item is a pending category URL or product id with a priority, a status
+    ("pending", "in_progress", "done" or "failed") and an attempt counter. The
+    crawl loop pops the highest-priority pending item, so a run that gets killed
+    can be resumed where it stopped instead of walking the categories again.
+
+    Done items are deleted by MongoDB `done_ttl_days` after they finished (a
+    TTL index on 'finishedAt'), so a frontier that is never cleared, like the
+    one of the GitHub Actions runs, does not grow with every product ever
+    discovered.
+    """
+
+    CATEGORY = "category"
+    PRODUCT = "product"
+
+    def __init__(
+        self,
+        mongo_service: MongoService,
+        max_attempts: int = 3,
+        collection: str = "crawl_frontier",
+        done_ttl_days: float = 7,
+    ):
+        self.mongo_service = mongo_service
+        self.yeeter = mongo_service.yeeter
+        # Instances that run side by side (e.g. shards) each need their own collection.
+        self.collection = mongo_service.db[collection]
+        self.max_attempts = max_attempts
+        self.collection.create_index(
+            [("kind", ASCENDING), ("key", ASCENDING)], unique=True
+        )
+        self.collection.create_index(
+            [("status", ASCENDING), ("priority", DESCENDING), ("createdAt", ASCENDING)]
+        )
+        # Only done items have 'finishedAt'.
+        self.collection.create_index(
+            "finishedAt", expireAfterSeconds=int(done_ttl_days * 86400)
+        )
+
+    def push(
+        self, kind: str, key: str, priority: int = 0, payload: dict = None
+    ) -> bool:
+        """
+        Add an item to the frontier unless it is already there.
+
+        Args:
+            kind (str): CATEGORY or PRODUCT.
+            key (str): The category URL or the migrosId.
+            priority (int): Higher priorities are popped first.
+            payload (dict, optional): Extra data the crawl loop needs for the item.
+
+        Returns:
+            bool: True if the item was added, False if it was already known.
+        """
+        try:
+            self.collection.insert_one(
+                {
+                    "kind": kind,
+                    "key": key,
+                    "priority": priority,
+                    "payload": payload or {},
+                    "status": "pending",
+                    "attempts": 0,
+                    "createdAt": datetime.now(timezone.utc),
+                }
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def pop(self) -> dict:
+        """
+        Claim the next pending item and mark it as in progress.
+
+        Returns:
+            dict: The claimed item, or None if nothing is pending.
+        """
+        return self.collection.find_one_and_update(
+            {"status": "pending"},
+            {
+                "$set": {
+                    "status": "in_progress",
+                    "startedAt": datetime.now(timezone.utc),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", DESCENDING), ("createdAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def complete(self, item: dict) -> None:
+        """Mark an item as done."""
+        self.collection.update_one(
+            {"_id": item["_id"]},
+            {"$set": {"status": "done", "finishedAt": datetime.now(timezone.utc)}},
+        )
+
+    def fail(self, item: dict, error: str) -> None:
+        """Put an item back to pending, or mark it failed after max_attempts."""
+        status = "failed" if item["attempts"] >= self.max_attempts else "pending"
+        self.collection.update_one(
+            {"_id": item["_id"]},
+            {"$set": {"status": status, "lastError": error}},
+        )
+        self.yeeter.error(f"Frontier item {item['key']} failed ({status}): {error}")
+
+    def resume(self) -> int:
+        """
+        Prepare the frontier after a restart: items left in progress by a killed
+        run become pending again, unless they already used up their attempts.
+
+        Returns:
+            int: The number of pending items after resuming.
+        """
+        # An item that was in progress every time a run died is not retried forever.
+        self.collection.update_many(
+            {"status": "in_progress", "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": "failed", "lastError": "interrupted too often"}},
+        )
+        requeued = self.collection.update_many(
+            {"status": "in_progress"}, {"$set": {"status": "pending"}}
+        ).modified_count
+        pending = self.pending_count()
+        self.yeeter.yeet(
+            f"Crawl frontier: {pending} pending items ({requeued} resumed from an interrupted run)."
+        )
+        return pending
+
+    def pending_count(self) -> int:
+        return self.collection.count_documents({"status": "pending"})
+
+    def in_progress_count(self) -> int:
+        return self.collection.count_documents({"status": "in_progress"})
+
+    def clear(self) -> None:
+        """Drop all items, used before starting a fresh crawl."""
+        self.collection.delete_many({})
@@ -0,0 +1,333 @@
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.services.mongo_service import MongoService
+
+
+class JobQueue:
+    """
+    A job queue in the 'jobs' collection that several scraper nodes can share.
+
+    A job is a key (e.g. a migrosId) in a named queue with a status ("pending",
+    "leased" or "done"). `claim` leases the next pending job to this worker for
+    `lease_seconds` with a single find_one_and_update, so no two workers get the
+    same job. A worker that dies stops renewing its lease (see `heartbeat`) and
+    the job becomes claimable again once the lease expired. Failed jobs are
+    retried with exponential backoff, after `max_attempts` they are moved to the
+    'dead_jobs' collection.
+    """
+
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+
+    def __init__(
+        self,
+        mongo_service: MongoService,
+        name: str,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3,
+        retry_delay: float = 60.0,
+        worker_id: str = None,
+    ):
+        self.mongo_service = mongo_service
+        self.yeeter = mongo_service.yeeter
+        self.collection = mongo_service.db.jobs
+        self.dead_letters = mongo_service.db.dead_jobs
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.worker_id = (
+            worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.collection.create_index(
+            [("queue", ASCENDING), ("key", ASCENDING)], unique=True
+        )
+        self.collection.create_index(
+            [
+                ("queue", ASCENDING),
+                ("status", ASCENDING),
+                ("priority", DESCENDING),
+                ("availableAt", ASCENDING),
+            ]
+        )
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def enqueue(self, key: str, priority: int = 0, payload: dict = None) -> bool:
+        """
+        Adds a job, or makes a finished job with the same key pending again.
+
+        Pending and leased jobs are left alone, so every node can enqueue the
+        same keys without creating duplicates.
+
+        Args:
+            key (str): The job key, e.g. a migrosId.
+            priority (int): Higher priorities are claimed first.
+            payload (dict, optional): Extra data the worker needs for the job.
+
+        Returns:
+            bool: True if the job was added or reopened.
+        """
+        now = self._now()
+        reopened = self.collection.update_one(
+            {"queue": self.name, "key": key, "status": self.DONE},
+            {
+                "$set": {
+                    "status": self.PENDING,
+                    "attempts": 0,
+                    "priority": priority,
+                    "availableAt": now,
+                }
+            },
+        )
+        if reopened.modified_count:
+            return True
+        try:
+            result = self.collection.update_one(
+                {"queue": self.name, "key": key},
+                {
+                    "$setOnInsert": {
+                        "status": self.PENDING,
+                        "attempts": 0,
+                        "priority": priority,
+                        "payload": payload or {},
+                        "availableAt": now,
+                        "createdAt": now,
+                    }
+                },
+                upsert=True,
+            )
+            return result.upserted_id is not None
+        except DuplicateKeyError:
+            # Another node inserted the same job at the same time.
+            return False
+
+    def enqueue_many(self, keys, priority: int = 0) -> int:
+        """
+        Enqueues several keys, see enqueue.
+
+        Returns:
+            int: The number of jobs added or reopened.
+        """
+        added = sum(self.enqueue(key, priority) for key in keys)
+        self.yeeter.yeet(f"Queue {self.name}: enqueued {added} jobs.")
+        return added
+
+    def claim(self) -> dict:
+        """
+        Leases the next available job to this worker.
+
+        A job is available when it is pending and its retry delay has passed, or
+        when its lease expired. A job whose lease expired on its last attempt is
+        dead-lettered instead of being handed out again.
+
+        Returns:
+            dict: The claimed job, or None if no job is available.
+        """
+        while True:
+            now = self._now()
+            job = self.collection.find_one_and_update(
+                {
+                    "queue": self.name,
+                    "$or": [
+                        {"status": self.PENDING, "availableAt": {"$lte": now}},
+                        {"status": self.LEASED, "leaseExpiresAt": {"$lt": now}},
+                    ],
+                },
+                {
+                    "$set": {
+                        "status": self.LEASED,
+                        "leaseOwner": self.worker_id,
+                        "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds),
+                        "claimedAt": now,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("priority", DESCENDING), ("availableAt", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None or job["attempts"] <= self.max_attempts:
+                return job
+            self._dead_letter(job, job.get("lastError") or "lease expired too often")
+
+    def heartbeat(self, job: dict) -> bool:
+        """
+        Extends the lease of a job this worker holds.
+
+        Returns:
+            bool: False if the lease was lost, e.g. because it expired and
+            another worker claimed the job. The job should then be abandoned.
+        """
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": self.LEASED, "leaseOwner": self.worker_id},
+            {
+                "$set": {
+                    "leaseExpiresAt": self._now()
+                    + timedelta(seconds=self.lease_seconds)
+                }
+            },
+        )
+        return result.matched_count == 1
+
+    @contextmanager
+    def keep_alive(self, job: dict):
+        """
+        Renews the lease of a job in a background thread while the block runs.
+
+        The lease is renewed every third of `lease_seconds`, so a slow job does
+        not lose it while the worker is still alive.
+        """
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lease_seconds / 3):
+                if not self.heartbeat(job):
+                    self.yeeter.alarm(
+                        f"Queue {self.name}: lost the lease on job {job['key']}."
+                    )
+                    return
+
+        thread = threading.Thread(target=renew, name=f"lease-{job['key']}", daemon=True)
+        thread.start()
+        try:
+            yield job
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, job: dict) -> bool:
+        """
+        Marks a job this worker holds as done.
+
+        Returns:
+            bool: False if the lease was lost before the job finished.
+        """
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": self.LEASED, "leaseOwner": self.worker_id},
+            {
+                "$set": {"status": self.DONE, "finishedAt": self._now()},
+                "$unset": {"leaseOwner": "", "leaseExpiresAt": "", "lastError": ""},
+            },
+        )
+        return result.modified_count == 1
+
+    def fail(self, job: dict, error: str) -> None:
+        """
+        Schedules a retry of a job this worker holds, or dead-letters it after max_attempts.
+
+        The n-th retry waits retry_delay * 2**(n - 1) seconds.
+
+        Args:
+            job (dict): The claimed job.
+            error (str): What went wrong, kept in 'lastError'.
+        """
+        if job["attempts"] >= self.max_attempts:
+            self._dead_letter(job, error)
+            return
+        delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+        self.collection.update_one(
+            {"_id": job["_id"], "status": self.LEASED, "leaseOwner": self.worker_id},
+            {
+                "$set": {
+                    "status": self.PENDING,
+                    "availableAt": self._now() + timedelta(seconds=delay),
+                    "lastError": error,
+                },
+                "$unset": {"leaseOwner": "", "leaseExpiresAt": ""},
+            },
+        )
+        self.yeeter.error(
+            f"Queue {self.name}: job {job['key']} failed, retrying in {delay:.0f} seconds: {error}"
+        )
+
+    def _dead_letter(self, job: dict, error: str) -> None:
+        """Moves a job to 'dead_jobs', unless another worker changed it meanwhile."""
+        claimed = self.collection.find_one_and_delete(
+            {"_id": job["_id"], "leaseOwner": job.get("leaseOwner")}
+        )
+        if claimed is None:
+            return
+        claimed.pop("_id")
+        claimed.update(status="dead", lastError=error, diedAt=self._now())
+        self.dead_letters.insert_one(claimed)
+        self.yeeter.error(
+            f"Queue {self.name}: job {job['key']} failed {job['attempts']} times, dead-lettered: {error}"
+        )
+
+    def requeue_dead(self) -> int:
+        """
+        Moves all dead-lettered jobs of this queue back to pending.
+
+        Returns:
+            int: The number of jobs requeued.
+        """
+        requeued = 0
+        for job in self.dead_letters.find({"queue": self.name}):
+            if self.enqueue(job["key"], job.get("priority", 0), job.get("payload")):
+                requeued += 1
+            self.dead_letters.delete_one({"_id": job["_id"]})
+        return requeued
+
+    def process(self, handler, max_jobs: int = None) -> int:
+        """
+        Claims and runs jobs until the queue has none available.
+
+        The lease is kept alive while the handler runs. An exception in the
+        handler fails the job, SystemExit fails it and stops processing.
+
+        Args:
+            handler: Called with the key of each job.
+            max_jobs (int, optional): Stop after this many jobs.
+
+        Returns:
+            int: The number of jobs completed.
+        """
+        completed = 0
+        while max_jobs is None or completed < max_jobs:
+            job = self.claim()
+            if job is None:
+                break
+            try:
+                with self.keep_alive(job):
+                    handler(job["key"])
+            except SystemExit as e:
+                self.fail(job, str(e))
+                raise
+            except Exception as e:
+                self.fail(job, str(e))
+                continue
+            if self.complete(job):
+                completed += 1
+        self.yeeter.yeet(f"Queue {self.name}: {completed} jobs completed.")
+        return completed
+
+    def counts(self) -> dict:
+        """
+        Returns the number of jobs per status, with the dead-lettered ones as "dead".
+        """
+        counts = {self.PENDING: 0, self.LEASED: 0, self.DONE: 0}
+        for row in self.collection.aggregate(
+            [
+                {"$match": {"queue": self.name}},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ]
+        ):
+            counts[row["_id"]] = row["count"]
+        counts["dead"] = self.dead_letters.count_documents({"queue": self.name})
+        return counts
+
+    def clear(self) -> None:
+        """Drops all jobs and dead letters of this queue."""
+        self.collection.delete_many({"queue": self.name})
+        self.dead_letters.delete_many({"queue": self.name})
@@ -0,0 +1,332 @@
+import hashlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.utils import decoding
+from src.utils.yeeter import Yeeter
+
+
+class MigrosApiError(Exception):
+    """Raised when a direct API call returns an error status."""
+
+    def __init__(self, url: str, status_code: int, retry_after: int = None):
+        super().__init__(f"{url} returned HTTP status {status_code}")
+        self.url = url
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class MigrosApiClient:
+    """
+    Calls the JSON endpoints behind the Migros website directly, without a browser.
+
+    A single keep-alive session with a connection pool is reused for every call.
+    The guest token and cookies the endpoints expect are either fetched from the
+    guest authentication endpoint or copied over from a running browser session.
+
+    With a `validator_store` (the MongoService), product-detail is fetched with
+    If-None-Match / If-Modified-Since. A 304, or a body identical to the last one,
+    is returned as None so callers can skip decoding and storing it. The
+    validator of a new body is only saved once the caller stored the product
+    and calls `commit_product_detail`, so a product whose insert failed is
+    fetched in full again next time.
+
+    With an `archive` (a ResponseArchive), every successful JSON response body is
+    appended to the archive under the same endpoint key the browser capture
+    uses (see ARCHIVE_ENDPOINTS), so ReplayCorpus.from_archive reads both.
+    """
+
+    BASE_URL = "https://www.migros.ch"
+    PRODUCT_DETAIL_PATH = "/product-display/public/v2/product-detail"
+    PRODUCT_CARDS_PATH = "/product-display/public/v3/product-cards"
+    STOREMAP_PATH = "/onesearch-oc-seaapi/public/v5/storemap"
+    CATEGORY_PATH = "/onesearch-oc-seaapi/public/v5/products/category"
+    # Archive keys, the same URL fragments the browser capture files responses under.
+    ARCHIVE_ENDPOINTS = {
+        PRODUCT_DETAIL_PATH: "product-detail",
+        PRODUCT_CARDS_PATH: "product-cards",
+        STOREMAP_PATH: "storemap",
+        CATEGORY_PATH: "products/category",
+    }
+    GUEST_TOKEN_PATH = "/authentication/public/v1/api/guest"
+    TOKEN_HEADER = "leshopch"
+    DEFAULT_HEADERS = {
+        "Accept": "application/json, text/plain, */*",
+        "Accept-Language": "en",
+        "User-Agent": (
+            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        ),
+    }
+
+    def __init__(
+        self,
+        yeeter: Yeeter,
+        base_url: str = BASE_URL,
+        pool_size: int = 10,
+        timeout: float = 10.0,
+        max_retries: int = 2,
+        validator_store=None,
+        archive=None,
+    ):
+        self.yeeter = yeeter
+        self.validator_store = validator_store
+        # Validators of fetched bodies, by URL, until the caller commits them.
+        self.pending_validators = {}
+        self.archive = archive
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.DEFAULT_HEADERS)
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        """Close the pooled HTTP session."""
+        self.session.close()
+
+    @property
+    def has_token(self) -> bool:
+        return self.TOKEN_HEADER in self.session.headers
+
+    def set_token(self, token: str) -> None:
+        """Use the given guest token for all following requests."""
+        self.session.headers[self.TOKEN_HEADER] = token
+
+    def refresh_guest_token(self) -> bool:
+        """
+        Requests a fresh guest token from the authentication endpoint.
+
+        Returns:
+            bool: True if a token was received, False otherwise.
+        """
+        response = self.session.get(
+            self.base_url + self.GUEST_TOKEN_PATH,
+            params={"authorizationNotRequired": "true"},
+            timeout=self.timeout,
+        )
+        token = response.headers.get(self.TOKEN_HEADER)
+        if response.status_code >= 400 or not token:
+            self.yeeter.alarm(
+                f"Could not fetch guest token (HTTP {response.status_code})."
+            )
+            return False
+        self.set_token(token)
+        self.yeeter.yeet("Fetched new guest token for direct API calls.")
+        return True
+
+    def bootstrap_from_driver(self, driver) -> None:
+        """
+        Copies cookies and the guest token from a selenium-wire driver session.
+
+        Args:
+            driver (seleniumwire.webdriver.Chrome): A driver that has loaded a Migros page.
+        """
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(
+                cookie["name"], cookie["value"], domain=cookie.get("domain")
+            )
+        # Only selenium-wire drivers record requests, a CDP capture driver has none.
+        for request in getattr(driver, "requests", ()):
+            token = request.headers.get(self.TOKEN_HEADER)
+            if not token and request.response is not None:
+                token = request.response.headers.get(self.TOKEN_HEADER)
+            if token:
+                self.set_token(token)
+                break
+        self.yeeter.yeet(
+            f"Bootstrapped API session from browser (token found: {self.has_token})."
+        )
+
+    def _archive_response(self, path: str, params, body: bytes) -> None:
+        """Appends a response body to the archive, keyed by endpoint and migrosId."""
+        if self.archive is None:
+            return
+        migros_id = (params or {}).get("migrosIds", "")
+        try:
+            endpoint = self.ARCHIVE_ENDPOINTS.get(path, path.rsplit("/", 1)[-1])
+            self.archive.append(endpoint, migros_id, body)
+        except OSError as e:
+            self.yeeter.error(f"Could not archive response of {path}: {str(e)}")
+
+    def request_json(self, method: str, path: str, params=None, json_body=None):
+        """
+        Sends a request to an API endpoint and returns the decoded JSON body.
+
+        Args:
+            method (str): HTTP method, "GET" or "POST".
+            path (str): Endpoint path relative to the base URL.
+            params (dict, optional): Query parameters.
+            json_body (dict, optional): JSON payload for POST requests.
+
+        Returns:
+            dict | list: The decoded JSON response.
+
+        Raises:
+            MigrosApiError: If the endpoint answers with an HTTP error status.
+        """
+        url = self.base_url + path
+        response = self.session.request(
+            method, url, params=params, json=json_body, timeout=self.timeout
+        )
+        if response.status_code >= 400:
+            retry_after = response.headers.get("Retry-After")
+            raise MigrosApiError(
+                url,
+                response.status_code,
+                int(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        self._archive_response(path, params, response.content)
+        return decoding.loads(response.content)
+
+    def request_json_if_changed(self, path: str, params=None):
+        """
+        Sends a conditional GET and decodes the body only if it changed since the last committed call.
+
+        The validator of the new body is kept in `pending_validators` until
+        `commit_validator` saves it.
+
+        Args:
+            path (str): Endpoint path relative to the base URL.
+            params (dict, optional): Query parameters.
+
+        Returns:
+            dict | list | None: The decoded JSON response, or None if it is unchanged.
+
+        Raises:
+            MigrosApiError: If the endpoint answers with an HTTP error status.
+        """
+        url = self._url(path, params)
+        validator = self.validator_store.get_response_validator(url) or {}
+        headers = {}
+        if validator.get("etag"):
+            headers["If-None-Match"] = validator["etag"]
+        if validator.get("lastModified"):
+            headers["If-Modified-Since"] = validator["lastModified"]
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        if response.status_code >= 400:
+            retry_after = response.headers.get("Retry-After")
+            raise MigrosApiError(
+                url,
+                response.status_code,
+                int(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if body_hash == validator.get("bodyHash"):
+            return None
+        data = decoding.loads(response.content)
+        self._archive_response(path, params, response.content)
+        self.pending_validators[url] = (
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            body_hash,
+        )
+        return data
+
+    def _url(self, path: str, params=None) -> str:
+        return (
+            requests.Request("GET", self.base_url + path, params=params).prepare().url
+        )
+
+    def commit_validator(self, url: str) -> None:
+        """Saves the validator of the last body fetched from url, once it has been stored."""
+        validator = self.pending_validators.pop(url, None)
+        if validator is not None and self.validator_store is not None:
+            self.validator_store.save_response_validator(url, *validator)
+
+    def commit_product_detail(self, migros_id: str) -> None:
+        """
+        Saves the validator of the last product-detail fetched for a product.
+
+        Call it after the product was stored. Until then, the next fetch of the
+        product returns the full body again.
+
+        Args:
+            migros_id (str): The unique identifier for the product.
+        """
+        self.commit_validator(
+            self._url(self.PRODUCT_DETAIL_PATH, self._product_detail_params(migros_id))
+        )
+
+    @staticmethod
+    def _product_detail_params(migros_id: str) -> dict:
+        return {
+            "storeType": "AVAILABLE",
+            "region": "national",
+            "migrosIds": migros_id,
+        }
+
+    def get_product_detail(self, migros_id: str) -> list | None:
+        """
+        Fetches the product-detail payload for a single product.
+
+        Args:
+            migros_id (str): The unique identifier for the product.
+
+        Returns:
+            list | None: The product-detail response, a list with one product dictionary.
+            None if a validator store is set and the product did not change, see
+            commit_product_detail.
+        """
+        params = self._product_detail_params(migros_id)
+        if self.validator_store is not None:
+            return self.request_json_if_changed(self.PRODUCT_DETAIL_PATH, params)
+        return self.request_json("GET", self.PRODUCT_DETAIL_PATH, params=params)
+
+    def get_product_cards(self, migros_ids: list[str]) -> list:
+        """
+        Fetches product cards, including offers, for several products at once.
+
+        Args:
+            migros_ids (list[str]): The migrosIds to fetch cards for.
+
+        Returns:
+            list: The product-cards response.
+        """
+        return self.request_json(
+            "POST",
+            self.PRODUCT_CARDS_PATH,
+            json_body={
+                "offerFilter": {"storeType": "AVAILABLE", "region": "national"},
+                "productFilter": {"migrosIds": list(migros_ids)},
+            },
+        )
+
+    def get_storemap(self) -> dict:
+        """
+        Fetches the storemap, which the main page reads the base categories from.
+
+        Returns:
+            dict: The storemap response, with the base categories under "categories".
+        """
+        return self.request_json(
+            "GET", self.STOREMAP_PATH, params={"region": "national"}
+        )
+
+    def get_category(self, slug: str) -> dict:
+        """
+        Fetches the products/category response of a category page.
+
+        Args:
+            slug (str): The slug of the category.
+
+        Returns:
+            dict: The category and all its descendants under "categories".
+        """
+        return self.request_json(
+            "GET", self.CATEGORY_PATH, params={"slug": slug, "region": "national"}
+        )
@@ -3,14 +3,32 @@ import time
 import traceback
 from datetime import datetime, timedelta, timezone
 
-from pymongo import MongoClient
+from bson import Binary
+from pymongo import MongoClient, UpdateOne
 from pymongo.errors import ConnectionFailure, PyMongoError
 from pymongo.server_api import ServerApi
 
+from src.models.product_detail import ProductDetail
+from src.utils.bloom_filter import BloomFilter
+from src.utils.fingerprint import (
+    CARD_PRICE_FIELDS,
+    FINGERPRINT_VERSION,
+    price_fingerprint,
+    product_fingerprint,
+)
+from src.utils.known_id_set import KnownIdSet
+from src.utils.sharding import Shard, shard_key
 from src.utils.yeeter import Yeeter, yeet
 
 
 class MongoService:
+    # _id of the Bloom filter snapshot in 'known_id_filter'.
+    KNOWN_ID_FILTER = "known_ids"
+    # known_ids documents of stored products, not just discovery claims.
+    STORED_KNOWN_IDS = {"firstSeen": {"$exists": True}}
+    # Marker in 'migrations' once known_ids has been backfilled from products.
+    KNOWN_IDS_BACKFILL = "known_ids_backfill"
+
     def __init__(self, uri: str, db_name: str, yeeter: Yeeter):
         try:
             self.client = MongoClient(uri, server_api=ServerApi("1"))
@@ -23,9 +41,18 @@ class MongoService:
                 "id_scraped_at",
                 "unit_price_history",
                 "request_counts",
+                "rate_limiter_state",
+                "response_validators",
+                "latest_fingerprint",
+                "known_ids",
+                "known_id_filter",
+                "migrations",
             ]:
                 self.yeeter.yeet(f"Ensuring collection exists: {collection}")
                 self.ensure_collection_exists(collection)
+            self.db.latest_fingerprint.create_index("migrosId", unique=True)
+            # Also finds the entries without one, see backfill_shard_keys.
+            self.db.id_scraped_at.create_index("shardKey")
             self.yeeter.yeet(f"Connected to MongoDB database: {db_name}")
         except ConnectionFailure as e:
             self.yeeter.error(f"MongoDB connection failed: {str(e)}")
@@ -218,6 +245,82 @@ class MongoService:
             self.log_debug_info()
             raise
 
+    @staticmethod
+    def _checkpoint_prefix(shard: Shard | tuple[int, int] = None) -> str:
+        """
+        Where a checkpoint is kept in a category_tracker entry.
+
+        Every shard loads the category pages for its own products, so each one
+        keeps its own checkpoint under 'shardCheckpoints'. Unsharded runs use
+        the top-level fields.
+        """
+        shard = Shard.of(shard)
+        if not shard:
+            return ""
+        return f"shardCheckpoints.{shard.index}_of_{shard.count}."
+
+    def save_category_checkpoint(
+        self,
+        category_id: int,
+        url: str,
+        children: list,
+        current_day,
+        shard: Shard | tuple[int, int] = None,
+    ) -> None:
+        """
+        Record that a category node was scraped, together with its subcategories.
+
+        Args:
+            category_id (int): ID of the scraped category.
+            url (str): The category URL that was loaded.
+            children (list): The subcategories as {"id", "slug"} dicts.
+            current_day (str): The current day in ISO format.
+            shard (Shard | tuple[int, int], optional): The shard that scraped it.
+        """
+        try:
+            prefix = self._checkpoint_prefix(shard)
+            self.db.category_tracker.update_one(
+                {"id": category_id},
+                {
+                    "$set": {
+                        prefix + "url": url,
+                        prefix + "children": children,
+                        prefix + "last_scraped": current_day,
+                    }
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            self.yeeter.error(f"Error saving category checkpoint: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    def get_category_checkpoint(
+        self, category_id: int, shard: Shard | tuple[int, int] = None
+    ) -> dict:
+        """
+        Fetch the checkpoint of a category.
+
+        Args:
+            category_id (int): ID of the category.
+            shard (Shard | tuple[int, int], optional): The shard whose checkpoint to fetch.
+
+        Returns:
+            dict: The entry with "url", "children" and "last_scraped", or None if
+            the category was never tracked (by this shard).
+        """
+        try:
+            entry = self.db.category_tracker.find_one({"id": category_id})
+            prefix = self._checkpoint_prefix(shard)
+            if entry is None or not prefix:
+                return entry
+            _, key, _ = prefix.split(".")
+            return entry.get("shardCheckpoints", {}).get(key)
+        except Exception as e:
+            self.yeeter.error(f"Error fetching category checkpoint: {str(e)}")
+            self.log_debug_info()
+            raise
+
     # ----------------------------------------------
     #       products
     # ----------------------------------------------
@@ -243,17 +346,85 @@ class MongoService:
             self.log_debug_info()
             raise
 
-    def insert_product(self, product_data: dict) -> None:
+    def get_latest_fingerprint(self, migros_id: str) -> dict:
+        """
+        Fetch the fingerprints of the latest stored version of a product.
+
+        Read from the 'latest_fingerprint' collection (indexed by migrosId) on
+        every call, so scrapers in other processes or on other nodes always
+        compare against the version that was stored last. Products stored
+        before the collection existed, or fingerprinted with an older
+        FINGERPRINT_VERSION, are fingerprinted from their latest version once.
+
+        Args:
+            migros_id (str): The unique ID of the product.
+
+        Returns:
+            dict: "fingerprint" and "priceFingerprint", or None if the product is unknown.
+        """
+        try:
+            latest = self.db.latest_fingerprint.find_one(
+                {"migrosId": migros_id},
+                {"_id": 0, "fingerprint": 1, "priceFingerprint": 1, "version": 1},
+            )
+            if latest is None or latest.pop("version", None) != FINGERPRINT_VERSION:
+                product = self.get_latest_product_entry_by_migros_id(migros_id)
+                if product is None:
+                    return None
+                latest = self.save_latest_fingerprint(product)
+            return latest
+        except Exception as e:
+            self.yeeter.error(
+                f"Error fetching latest fingerprint for migrosId {migros_id}: {str(e)}"
+            )
+            self.log_debug_info()
+            raise
+
+    def save_latest_fingerprint(self, product: dict) -> dict:
         """
-        Insert a new product document if the price is new or the product doesn't exist in the database.
+        Record a product version as the latest one in 'latest_fingerprint'.
+
+        Args:
+            product (dict): The stored product version.
+
+        Returns:
+            dict: The saved "fingerprint" and "priceFingerprint".
+        """
+        latest = {
+            "fingerprint": product_fingerprint(product),
+            "priceFingerprint": price_fingerprint(product),
+        }
+        self.db.latest_fingerprint.update_one(
+            {"migrosId": product["migrosId"]},
+            {"$set": dict(latest, version=FINGERPRINT_VERSION)},
+            upsert=True,
+        )
+        return latest
+
+    def insert_product(self, product_data: dict | ProductDetail) -> None:
+        """
+        Insert a new product document if its content changed or the product doesn't exist in the database.
+
+        The tracked content (see TRACKED_FIELDS in src.utils.fingerprint) is
+        compared by fingerprint against 'latest_fingerprint', so changes to the
+        name or nutrients are stored as a new version as well, while stock or
+        order limit changes are not.
+        Price changes are additionally logged in 'unit_price_history'.
 
         Args:
-            product_data (dict): Dictionary containing product details.
+            product_data (dict | ProductDetail): Dictionary containing product details,
+                or the ProductDetail the scraper decoded it into, with the payload in `raw`.
         """
         try:
-            migros_id = product_data.get("migrosId")
-            description = product_data.get("description")
-            name = product_data.get("name")
+            if isinstance(product_data, ProductDetail):
+                detail = product_data
+                product_data = detail.raw
+                migros_id, name = detail.migros_id, detail.name
+                has_offer = detail.offer is not None
+            else:
+                migros_id = product_data.get("migrosId")
+                name = product_data.get("name")
+                has_offer = bool(product_data.get("offer"))
 
             if not migros_id:
                 self.yeeter.error(
@@ -262,43 +433,47 @@ class MongoService:
                 return
 
             # Check if product has offer
-            if not product_data.get("offer"):
+            if not has_offer:
                 self.yeeter.error(
                     f"Product with migrosId {migros_id} does not have an offer, skipping insertion."
                 )
                 return
 
-            existing_product = self.get_latest_product_entry_by_migros_id(migros_id)
+            fingerprint = product_fingerprint(product_data)
+            latest = self.get_latest_fingerprint(migros_id)
             new_price = product_data.get("offer", {}).get("price", {})
 
-            if not existing_product:
-                # Product doesn't exist, insert as new
-                product_data["dateAdded"] = time.strftime("%Y-%m-%dT%H:%M:%S")
-                self.db.products.insert_one(product_data)
-                self.yeeter.yeet(
-                    f"Inserted new product {name} with migrosId: {migros_id}"
+            if latest and latest["fingerprint"] == fingerprint:
+                # Product exists with the same content, skip insertion
+                self.yeeter.logger.debug(
+                    f"Product with migrosId {migros_id} already exists with the same content. Skipping insertion."
                 )
+                return
 
-            elif existing_product.get("offer", {}).get("price", {}) != new_price:
-                # Unit price has changed, insert as new and log price change
-                product_data["dateAdded"] = time.strftime("%Y-%m-%dT%H:%M:%S")
-                self.db.products.insert_one(product_data)
+            product_data["dateAdded"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            product_data["fingerprint"] = fingerprint
+            self.db.products.insert_one(product_data)
+            self.save_latest_fingerprint(product_data)
 
+            if not latest:
+                self.add_known_id(migros_id)
+                self.yeeter.yeet(
+                    f"Inserted new product {name} with migrosId: {migros_id}"
+                )
+            elif latest["priceFingerprint"] != price_fingerprint(product_data):
                 # Log the price change in the 'unit_price_history' collection
                 price_change_entry = {
                     "migrosId": migros_id,
                     "newPrice": new_price,
-                    "dateChanged": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "dateChanged": product_data["dateAdded"],
                 }
                 self.db.unit_price_history.insert_one(price_change_entry)
                 self.yeeter.yeet(
                     f"\033[1;32mNew unit price detected for product {name} with migrosId: {migros_id}. Logged price change.\033[0m"
                 )
-
             else:
-                # Product exists with the same price, skip insertion
-                self.yeeter.logger.debug(
-                    f"Product with migrosId {migros_id} already exists with the same unitPrice. Skipping insertion."
+                self.yeeter.yeet(
+                    f"Product {name} with migrosId: {migros_id} changed without a price change, inserted new version."
                 )
         except Exception as e:
             self.yeeter.error(
@@ -307,6 +482,97 @@ class MongoService:
             self.log_debug_info()
             raise
 
+    def refresh_prices_from_product_cards(self, product_cards: list) -> int:
+        """
+        Update prices of known products from the offers in a product-cards response.
+
+        The price fingerprints of all products on the cards are read from
+        'latest_fingerprint' in one indexed query. Only if a card's price
+        fingerprint differs is the latest stored version fetched, and a new
+        version with the card's price fields (CARD_PRICE_FIELDS in
+        src.utils.fingerprint) is inserted and logged in
+        'unit_price_history', just like insert_product does for a
+        product-detail response. The products on the cards get a
+        'priceCheckedAt' in 'id_scraped_at'. 'lastScraped' is left alone,
+        because the rest of the product was not fetched.
+
+        Args:
+            product_cards (list): Product cards, each with a migrosId and an offer.
+
+        Returns:
+            int: The number of price changes found.
+        """
+        try:
+            cards = {
+                card["migrosId"]: card
+                for card in product_cards
+                if card.get("migrosId") and card.get("offer")
+            }
+            if not cards:
+                return 0
+
+            stored = {
+                entry["migrosId"]: entry["priceFingerprint"]
+                for entry in self.db.latest_fingerprint.find(
+                    {"migrosId": {"$in": list(cards)}, "version": FINGERPRINT_VERSION},
+                    {"_id": 0, "migrosId": 1, "priceFingerprint": 1},
+                )
+            }
+
+            changes = 0
+            for migros_id, card in cards.items():
+                if migros_id not in stored:
+                    # Unknown, or fingerprinted by an older FINGERPRINT_VERSION.
+                    latest_fingerprint = self.get_latest_fingerprint(migros_id)
+                    if latest_fingerprint is None:
+                        continue
+                    stored[migros_id] = latest_fingerprint["priceFingerprint"]
+                if stored[migros_id] == price_fingerprint(card):
+                    continue
+
+                latest = self.get_latest_product_entry_by_migros_id(migros_id)
+                now = time.strftime("%Y-%m-%dT%H:%M:%S")
+                new_version = {
+                    key: value for key, value in latest.items() if key != "_id"
+                }
+                # The rest of the card's offer has a different shape, keep the stored one.
+                offer = {
+                    key: value
+                    for key, value in latest.get("offer", {}).items()
+                    if key not in CARD_PRICE_FIELDS
+                }
+                offer.update(
+                    (key, card["offer"][key])
+                    for key in CARD_PRICE_FIELDS
+                    if key in card["offer"]
+                )
+                new_version["offer"] = offer
+                new_version["dateAdded"] = now
+                new_version["fingerprint"] = product_fingerprint(new_version)
+                new_price = new_version["offer"].get("price", {})
+                self.db.products.insert_one(new_version)
+                self.save_latest_fingerprint(new_version)
+                self.db.unit_price_history.insert_one(
+                    {"migrosId": migros_id, "newPrice": new_price, "dateChanged": now}
+                )
+                changes += 1
+                self.yeeter.yeet(
+                    f"\033[1;32mNew unit price detected for product {latest.get('name')} with migrosId: {migros_id} (from product cards). Logged price change.\033[0m"
+                )
+
+            self.db.id_scraped_at.update_many(
+                {"migrosId": {"$in": list(cards)}},
+                {"$set": {"priceCheckedAt": datetime.now(timezone.utc)}},
+            )
+            self.yeeter.yeet(
+                f"Refreshed prices of {len(cards)} products from product cards, {changes} changed."
+            )
+            return changes
+        except Exception as e:
+            self.yeeter.error(f"Error refreshing prices from product cards: {str(e)}")
+            self.log_debug_info()
+            raise
+
     def get_latest_product_entry_by_migros_id(self, migros_id: str) -> dict:
         """
         Fetch the latest product entry for a given migrosId, based on the date it was added.
@@ -319,7 +585,7 @@ class MongoService:
         """
         try:
             product = self.db.products.find_one(
-                {"migrosId": migros_id}, sort=[("dateAdded", -1)]
+                {"migrosId": migros_id}, sort=[("dateAdded", -1), ("_id", -1)]
             )
             if product:
                 self.yeeter.yeet(
@@ -341,7 +607,11 @@ class MongoService:
             list: List of all known migrosIds.
         """
         try:
-            ids = self.db.products.distinct("migrosId")
+            self._ensure_known_ids()
+            ids = [
+                document["_id"]
+                for document in self.db.known_ids.find(self.STORED_KNOWN_IDS, {})
+            ]
             self.yeeter.yeet(f"Fetched {len(ids)} known migrosIds.")
             return ids
         except Exception as e:
@@ -349,8 +619,137 @@ class MongoService:
             self.log_debug_info()
             raise
 
+    # ----------------------------------------------
+    #       known_ids
+    # ----------------------------------------------
+
+    def add_known_id(self, migros_id: str, first_seen: datetime = None) -> None:
+        """
+        Records a migrosId in 'known_ids', one document per product.
+
+        Args:
+            migros_id (str): The id of a product that was stored for the first time.
+            first_seen (datetime, optional): When it was stored (UTC), defaults to now.
+        """
+        self.db.known_ids.update_one(
+            {"_id": migros_id},
+            # $min also sets firstSeen on documents that only hold a discovery claim.
+            {"$min": {"firstSeen": first_seen or datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    def backfill_known_ids(self, batch_size: int = 1000) -> int:
+        """
+        Adds the migrosId of every stored product to 'known_ids'.
+
+        Runs once on databases from before 'known_ids' existed. The ids are grouped
+        by an aggregation cursor instead of `distinct`, so the 16 MB result limit
+        does not apply. Safe to run again, existing entries are left alone and
+        discovery claims of stored products get their 'firstSeen'.
+
+        Args:
+            batch_size (int): Number of upserts per bulk write.
+
+        Returns:
+            int: The number of ids added or completed.
+        """
+        try:
+            added = 0
+            batch = []
+            for document in self.db.products.aggregate(
+                [{"$group": {"_id": "$migrosId", "firstSeen": {"$min": "$dateAdded"}}}],
+                allowDiskUse=True,
+            ):
+                if not document["_id"]:
+                    continue
+                first_seen = self._local_time_to_utc(document["firstSeen"])
+                batch.append(
+                    UpdateOne(
+                        {"_id": document["_id"]},
+                        {
+                            "$min": {
+                                "firstSeen": first_seen or datetime.now(timezone.utc)
+                            }
+                        },
+                        upsert=True,
+                    )
+                )
+                if len(batch) >= batch_size:
+                    added += self._write_known_ids(batch)
+                    batch = []
+            if batch:
+                added += self._write_known_ids(batch)
+            self.yeeter.yeet(f"Backfilled {added} known migrosIds from products.")
+            return added
+        except Exception as e:
+            self.yeeter.error(f"Error backfilling known migrosIds: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    @staticmethod
+    def _local_time_to_utc(value) -> datetime | None:
+        """Converts a 'dateAdded' string (local time) to a UTC datetime."""
+        if not isinstance(value, str):
+            return value
+        try:
+            return datetime.fromisoformat(value).astimezone(timezone.utc)
+        except ValueError:
+            return None
+
+    def _write_known_ids(self, requests: list) -> int:
+        """Runs known_ids upserts. Returns the number of ids added or given a 'firstSeen'."""
+        result = self.db.known_ids.bulk_write(requests, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def _ensure_known_ids(self) -> None:
+        """
+        Backfills 'known_ids' once per database, recorded by a marker in 'migrations'.
+
+        The marker, not an empty 'known_ids', decides: ids added or claimed
+        before the first load must not make the backfill look done.
+        """
+        if self.db.migrations.find_one({"_id": self.KNOWN_IDS_BACKFILL}) is not None:
+            return
+        self.backfill_known_ids()
+        self.db.migrations.update_one(
+            {"_id": self.KNOWN_IDS_BACKFILL},
+            {"$setOnInsert": {"finishedAt": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    def load_known_id_set(self) -> KnownIdSet:
+        """
+        Loads 'known_ids' into a compact in-memory KnownIdSet.
+
+        Only the _id field is read, streamed from the cursor, so startup time and
+        memory follow the number of products rather than the number of versions.
+
+        Returns:
+            KnownIdSet: All known migrosIds.
+        """
+        try:
+            self._ensure_known_ids()
+            start = time.monotonic()
+            known_ids = KnownIdSet(
+                document["_id"]
+                for document in self.db.known_ids.find(self.STORED_KNOWN_IDS, {})
+            )
+            self.yeeter.yeet(
+                f"Loaded {len(known_ids)} known migrosIds in {time.monotonic() - start:.2f} seconds "
+                f"({known_ids.nbytes / 2**20:.1f} MiB)."
+            )
+            return known_ids
+        except Exception as e:
+            self.yeeter.error(f"Error loading known migrosIds: {str(e)}")
+            self.log_debug_info()
+            raise
+
     def get_products_not_scraped_in_days(
-        self, days: int, limit: int = 100, only_edible=True
+        self,
+        days: int,
+        limit: int = 100,
+        only_edible=True,
+        shard: Shard | tuple[int, int] = None,
     ) -> list:
         """
         Retrieve migrosIds of products that haven't been scraped in the last 'x' days.
@@ -359,6 +758,8 @@ class MongoService:
             days (int): The number of days since the last scrape.
             limit (int): Maximum number of products to retrieve.
             only_edible (bool): If True, only fetch products with nutrients information.
+            shard (Shard | tuple[int, int], optional): Only fetch the products of
+                shard (index, count), see src.utils.sharding.
 
         Returns:
             list: List of migrosIds that meet the criteria.
@@ -367,6 +768,11 @@ class MongoService:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
             query = {"lastScraped": {"$lt": cutoff_date}}
 
+            shard = Shard.of(shard)
+            if shard:
+                self.backfill_shard_keys()
+                query.update(shard.mongo_filter())
+
             if only_edible:
                 # Add the filter for only edible products
                 edible_ids = self.db.products.distinct(
@@ -382,7 +788,8 @@ class MongoService:
 
             ids_to_scrape = [product["migrosId"] for product in products]
             self.yeeter.yeet(
-                f"Found {len(ids_to_scrape)} products that haven't been scraped in {days}+ days."
+                f"Found {len(ids_to_scrape)} products that haven't been scraped in {days}+ days"
+                + (f" in shard {shard}." if shard else ".")
             )
             return ids_to_scrape
         except Exception as e:
@@ -441,7 +848,10 @@ class MongoService:
             current_date = datetime.now(timezone.utc)
             self.db.id_scraped_at.update_one(
                 {"migrosId": migros_id},
-                {"$set": {"lastScraped": current_date}},
+                {
+                    "$set": {"lastScraped": current_date},
+                    "$setOnInsert": {"shardKey": shard_key(migros_id)},
+                },
                 upsert=True,
             )
             self.yeeter.yeet(
@@ -452,6 +862,51 @@ class MongoService:
             self.log_debug_info()
             raise
 
+    def backfill_shard_keys(self, batch_size: int = 1000) -> int:
+        """
+        Adds the 'shardKey' to id_scraped_at entries saved before sharding existed.
+
+        The lookup is served by the index on 'shardKey', so it costs next to
+        nothing once every entry has one. The keys are written with one bulk
+        write per batch.
+
+        Args:
+            batch_size (int): Number of updates per bulk write.
+
+        Returns:
+            int: The number of entries updated.
+        """
+        try:
+            updated = 0
+            batch = []
+            for entry in self.db.id_scraped_at.find(
+                {"shardKey": {"$exists": False}}, {"migrosId": 1}
+            ):
+                batch.append(
+                    UpdateOne(
+                        {"_id": entry["_id"]},
+                        {"$set": {"shardKey": shard_key(entry["migrosId"])}},
+                    )
+                )
+                if len(batch) >= batch_size:
+                    updated += self.db.id_scraped_at.bulk_write(
+                        batch, ordered=False
+                    ).modified_count
+                    batch = []
+            if batch:
+                updated += self.db.id_scraped_at.bulk_write(
+                    batch, ordered=False
+                ).modified_count
+            if updated:
+                self.yeeter.yeet(
+                    f"Added shard keys to {updated} id_scraped_at entries."
+                )
+            return updated
+        except Exception as e:
+            self.yeeter.error(f"Error adding shard keys: {str(e)}")
+            self.log_debug_info()
+            raise
+
     def is_product_scraped_last_24_hours(self, migros_id: str) -> bool:
         """
         Check if a product with the given migrosId has been scraped in the last 24 hours.
@@ -462,9 +917,22 @@ class MongoService:
         Returns:
             bool: True if the product was scraped in the last 24 hours, False otherwise.
         """
+        return self.is_product_scraped_within_hours(migros_id, 24)
+
+    def is_product_scraped_within_hours(self, migros_id: str, hours: float) -> bool:
+        """
+        Check if a product with the given migrosId has been scraped in the last `hours` hours.
+
+        Args:
+            migros_id (str): The unique ID of the product.
+            hours (float): How far back a scrape counts.
+
+        Returns:
+            bool: True if the product was scraped in that time, False otherwise.
+        """
         try:
             now = datetime.now(timezone.utc)
-            cutoff_time = now - timedelta(hours=24)
+            cutoff_time = now - timedelta(hours=hours)
 
             scraped = self.db.id_scraped_at.find_one(
                 {
@@ -473,11 +941,13 @@ class MongoService:
                 }
             )
             result = scraped is not None
-            self.yeeter.yeet(f"Product {migros_id} scraped in last 24 hours: {result}")
+            self.yeeter.yeet(
+                f"Product {migros_id} scraped in last {hours:g} hours: {result}"
+            )
             return result
         except Exception as e:
             self.yeeter.error(
-                f"Error checking if product {migros_id} was scraped in the last 24 hours: {str(e)}"
+                f"Error checking if product {migros_id} was scraped in the last {hours:g} hours: {str(e)}"
             )
             self.log_debug_info()
             raise
@@ -554,6 +1024,302 @@ class MongoService:
             self.log_debug_info()
             raise
 
+    def claim_known_id(self, migros_id: str, claim_ttl_hours: int = 24) -> bool:
+        """
+        Atomically records a migrosId found during discovery.
+
+        The id is inserted with a 'claimedAt' time if it is not in 'known_ids' yet.
+        A claim whose product was never stored (no 'firstSeen') can be taken over
+        once it is older than claim_ttl_hours, so a failed fetch is retried later.
+
+        Args:
+            migros_id (str): The id found on a product card.
+            claim_ttl_hours (int): Age after which an unfinished claim expires.
+
+        Returns:
+            bool: True if the caller claimed the id and should fetch the product.
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            result = self.db.known_ids.update_one(
+                {"_id": migros_id},
+                {"$setOnInsert": {"claimedAt": now}},
+                upsert=True,
+            )
+            if result.upserted_id is not None:
+                return True
+            result = self.db.known_ids.update_one(
+                {
+                    "_id": migros_id,
+                    "firstSeen": {"$exists": False},
+                    "claimedAt": {"$lt": now - timedelta(hours=claim_ttl_hours)},
+                },
+                {"$set": {"claimedAt": now}},
+            )
+            return result.modified_count == 1
+        except Exception as e:
+            self.yeeter.error(f"Error claiming migrosId {migros_id}: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    def find_known_ids(self, migros_ids: list, claim_ttl_hours: int = 24) -> set:
+        """
+        Returns which of the given migrosIds are known, in one query.
+
+        Ids with an expired claim (see claim_known_id) do not count as known.
+
+        Args:
+            migros_ids (list): The ids to look up.
+            claim_ttl_hours (int): Age after which an unfinished claim expires.
+
+        Returns:
+            set: The known ids.
+        """
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=claim_ttl_hours)
+            return {
+                document["_id"]
+                for document in self.db.known_ids.find(
+                    {
+                        "_id": {"$in": list(migros_ids)},
+                        "$or": [
+                            {"firstSeen": {"$exists": True}},
+                            {"claimedAt": {"$gte": cutoff}},
+                        ],
+                    },
+                    {},
+                )
+            }
+        except Exception as e:
+            self.yeeter.error(f"Error looking up known migrosIds: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    # ----------------------------------------------
+    #       known_id_filter
+    # ----------------------------------------------
+
+    def load_known_id_filter(
+        self, error_rate: float = 0.001, min_capacity: int = 100_000
+    ) -> BloomFilter:
+        """
+        Loads the Bloom filter snapshot of 'known_ids'.
+
+        The filter is rebuilt from 'known_ids' when there is no snapshot yet or
+        when it holds more ids than it was sized for. A rebuilt filter gets twice
+        the current number of ids as capacity, so it lasts for a while.
+
+        Args:
+            error_rate (float): False positive rate of a rebuilt filter.
+            min_capacity (int): Smallest capacity of a rebuilt filter.
+
+        Returns:
+            BloomFilter: The filter.
+        """
+        try:
+            snapshot = self.db.known_id_filter.find_one({"_id": self.KNOWN_ID_FILTER})
+            if snapshot is not None:
+                bloom = BloomFilter.from_bytes(
+                    snapshot["bits"],
+                    snapshot["capacity"],
+                    snapshot["errorRate"],
+                    snapshot["count"],
+                )
+                if not bloom.is_full:
+                    self.yeeter.yeet(
+                        f"Loaded known id filter with {len(bloom)} ids "
+                        f"({bloom.nbytes / 2**20:.1f} MiB)."
+                    )
+                    return bloom
+                self.yeeter.yeet("Known id filter is full, rebuilding it.")
+            self._ensure_known_ids()
+            count = self.db.known_ids.estimated_document_count()
+            bloom = BloomFilter(max(min_capacity, 2 * count), error_rate)
+            bloom.update(
+                document["_id"]
+                for document in self.db.known_ids.find(self.STORED_KNOWN_IDS, {})
+            )
+            self.db.known_id_filter.replace_one(
+                {"_id": self.KNOWN_ID_FILTER},
+                self._known_id_filter_document(bloom, version=0),
+                upsert=True,
+            )
+            self.yeeter.yeet(
+                f"Built known id filter with {len(bloom)} ids "
+                f"({bloom.nbytes / 2**20:.1f} MiB)."
+            )
+            return bloom
+        except Exception as e:
+            self.yeeter.error(f"Error loading the known id filter: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    @staticmethod
+    def _known_id_filter_document(bloom: BloomFilter, version: int) -> dict:
+        return {
+            "bits": Binary(bloom.to_bytes()),
+            "capacity": bloom.capacity,
+            "errorRate": bloom.error_rate,
+            "count": len(bloom),
+            "version": version,
+            "updatedAt": datetime.now(timezone.utc),
+        }
+
+    def save_known_id_filter(self, bloom: BloomFilter, retries: int = 3) -> bool:
+        """
+        Merges a filter into the stored snapshot.
+
+        Several processes save their filters at the end of a run. Each save ORs
+        its bits into the latest snapshot and only replaces it if no other
+        process saved in between (compared by 'version'), otherwise it retries.
+        A snapshot of a different size, e.g. after a rebuild, is replaced.
+
+        Args:
+            bloom (BloomFilter): The filter with the ids this process added.
+            retries (int): How often to retry after a concurrent save.
+
+        Returns:
+            bool: True if the snapshot was saved.
+        """
+        try:
+            for _ in range(retries + 1):
+                snapshot = self.db.known_id_filter.find_one(
+                    {"_id": self.KNOWN_ID_FILTER}
+                )
+                if snapshot is None:
+                    self.db.known_id_filter.insert_one(
+                        {
+                            "_id": self.KNOWN_ID_FILTER,
+                            **self._known_id_filter_document(bloom, version=0),
+                        }
+                    )
+                    return True
+                stored = BloomFilter.from_bytes(
+                    snapshot["bits"],
+                    snapshot["capacity"],
+                    snapshot["errorRate"],
+                    snapshot["count"],
+                )
+                if stored.compatible(bloom):
+                    bloom.union(stored)
+                result = self.db.known_id_filter.replace_one(
+                    {"_id": self.KNOWN_ID_FILTER, "version": snapshot["version"]},
+                    self._known_id_filter_document(
+                        bloom, version=snapshot["version"] + 1
+                    ),
+                )
+                if result.modified_count == 1:
+                    self.yeeter.yeet(f"Saved known id filter with {len(bloom)} ids.")
+                    return True
+            self.yeeter.alarm("Known id filter changed during every save attempt.")
+            return False
+        except Exception as e:
+            self.yeeter.error(f"Error saving the known id filter: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    # ----------------------------------------------
+    #       rate_limiter_state
+    # ----------------------------------------------
+
+    def get_rate_limiter_state(self, name: str) -> dict:
+        """
+        Retrieve the persisted state of a rate limiter.
+
+        Args:
+            name (str): The name of the rate limiter.
+
+        Returns:
+            dict: The saved state, or None if the limiter has never been saved.
+        """
+        try:
+            state = self.db.rate_limiter_state.find_one({"name": name}, {"_id": 0})
+            self.yeeter.yeet(f"Rate limiter state for {name}: {state}")
+            return state
+        except Exception as e:
+            self.yeeter.error(f"Error retrieving rate limiter state {name}: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    def save_rate_limiter_state(self, name: str, state: dict) -> None:
+        """
+        Persist the state of a rate limiter so the next run can start from it.
+
+        Args:
+            name (str): The name of the rate limiter.
+            state (dict): The state returned by AdaptiveRateLimiter.state().
+
+        Returns:
+            None
+        """
+        try:
+            self.db.rate_limiter_state.update_one(
+                {"name": name},
+                {"$set": {**state, "updatedAt": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+            self.yeeter.yeet(f"Saved rate limiter state for {name}: {state}")
+        except Exception as e:
+            self.yeeter.error(f"Error saving rate limiter state {name}: {str(e)}")
+            self.log_debug_info()
+            raise
+
+    # ----------------------------------------------
+    #       response_validators
+    # ----------------------------------------------
+
+    def get_response_validator(self, url: str) -> dict:
+        """
+        Retrieve the cache validators of the last response from an endpoint URL.
+
+        Args:
+            url (str): The full request URL, including the query string.
+
+        Returns:
+            dict: The saved "etag", "lastModified" and "bodyHash", or None if the URL was never fetched.
+        """
+        try:
+            return self.db.response_validators.find_one({"url": url}, {"_id": 0})
+        except Exception as e:
+            self.yeeter.error(
+                f"Error retrieving response validator for {url}: {str(e)}"
+            )
+            self.log_debug_info()
+            raise
+
+    def save_response_validator(
+        self, url: str, etag: str, last_modified: str, body_hash: str
+    ) -> None:
+        """
+        Store the cache validators of a response, used for the next conditional request.
+
+        Args:
+            url (str): The full request URL, including the query string.
+            etag (str): The ETag header of the response, if any.
+            last_modified (str): The Last-Modified header of the response, if any.
+            body_hash (str): SHA-256 hex digest of the response body.
+
+        Returns:
+            None
+        """
+        try:
+            self.db.response_validators.update_one(
+                {"url": url},
+                {
+                    "$set": {
+                        "etag": etag,
+                        "lastModified": last_modified,
+                        "bodyHash": body_hash,
+                        "updatedAt": datetime.now(timezone.utc),
+                    }
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            self.yeeter.error(f"Error saving response validator for {url}: {str(e)}")
+            self.log_debug_info()
+            raise
+
 
 if __name__ == "__main__":
     yeeter = Yeeter()
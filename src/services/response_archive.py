@@ -0,0 +1,316 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Iterator
+
+from src.utils.yeeter import Yeeter
+
+# Record: crc32, timestamp (ms), key length, body length, then key and zlib body.
+RECORD_HEADER = struct.Struct("<IqHI")
+# Index slot: key hash (0 = empty), segment number, offset of the record.
+INDEX_SLOT = struct.Struct("<QIQ")
+# Index header: magic, number of slots, number of used slots.
+INDEX_HEADER = struct.Struct("<4sII")
+INDEX_MAGIC = b"RAIX"
+
+
+@dataclass
+class ArchivedResponse:
+    endpoint: str
+    migros_id: str
+    timestamp: int  # milliseconds since the epoch
+    body: bytes
+
+
+def _key(endpoint: str, migros_id: str, timestamp: int) -> bytes:
+    return f"{endpoint}\0{migros_id or ''}\0{timestamp}".encode("utf-8")
+
+
+def _hash(key: bytes) -> int:
+    value = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    return value or 1  # 0 marks an empty slot
+
+
+class ResponseArchive:
+    """
+    Append-only archive of raw API responses.
+
+    Responses are zlib-compressed and appended to numbered segment files, which
+    are rolled over at `max_segment_bytes`. A memory-mapped open-addressing hash
+    table maps (endpoint, migrosId, timestamp) to the segment and offset of the
+    record, so a lookup is one probe sequence plus one read. Full scans read the
+    segments front to back. The index can always be rebuilt from the segments.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        yeeter: Yeeter = None,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        initial_index_slots: int = 1 << 16,
+        compression_level: int = 6,
+    ):
+        self.directory = directory
+        self.yeeter = yeeter
+        self.max_segment_bytes = max_segment_bytes
+        self.compression_level = compression_level
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.segments = self._existing_segments()
+        if not self.segments:
+            self.segments = [1]
+        self._recover_tail()
+        self.active = open(self._segment_path(self.segments[-1]), "ab")
+        self._readers = {}
+
+        self.index_path = os.path.join(directory, "index.bin")
+        if os.path.exists(self.index_path):
+            self._open_index()
+        else:
+            self._create_index(self.index_path, initial_index_slots)
+            self._open_index()
+            self.rebuild_index()
+
+    # ----------------------------------------------
+    #       segments
+    # ----------------------------------------------
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"segment-{number:06d}.log")
+
+    def _existing_segments(self) -> list[int]:
+        return sorted(
+            int(name[8:14])
+            for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.endswith(".log")
+        )
+
+    def _read_record(self, file, offset: int):
+        """Reads the record at offset, returns (key, compressed body, end) or None if torn."""
+        header = os.pread(file.fileno(), RECORD_HEADER.size, offset)
+        if len(header) < RECORD_HEADER.size:
+            return None
+        crc, timestamp, key_length, body_length = RECORD_HEADER.unpack(header)
+        payload = os.pread(
+            file.fileno(), key_length + body_length, offset + len(header)
+        )
+        if len(payload) < key_length + body_length:
+            return None
+        if zlib.crc32(payload, zlib.crc32(header[4:])) != crc:
+            return None
+        end = offset + RECORD_HEADER.size + key_length + body_length
+        return payload[:key_length], payload[key_length:], end
+
+    def _recover_tail(self) -> None:
+        """Cuts off a record that was only partly written when the last run died."""
+        path = self._segment_path(self.segments[-1])
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as file:
+            offset = 0
+            while (record := self._read_record(file, offset)) is not None:
+                offset = record[2]
+            if offset < os.path.getsize(path):
+                file.truncate(offset)
+                if self.yeeter:
+                    self.yeeter.error(f"Truncated torn record at the end of {path}.")
+
+    def _reader(self, segment: int):
+        if segment not in self._readers:
+            self._readers[segment] = open(self._segment_path(segment), "rb")
+        return self._readers[segment]
+
+    # ----------------------------------------------
+    #       index
+    # ----------------------------------------------
+
+    @staticmethod
+    def _create_index(path: str, slots: int) -> None:
+        with open(path, "wb") as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, slots, 0))
+            file.truncate(INDEX_HEADER.size + slots * INDEX_SLOT.size)
+
+    def _open_index(self) -> None:
+        self.index_file = open(self.index_path, "r+b")
+        self.index = mmap.mmap(self.index_file.fileno(), 0)
+        magic, self.index_slots, self.index_count = INDEX_HEADER.unpack_from(
+            self.index, 0
+        )
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{self.index_path} is not a response archive index")
+
+    def _close_index(self) -> None:
+        self.index.close()
+        self.index_file.close()
+
+    def _slot_offset(self, slot: int) -> int:
+        return INDEX_HEADER.size + slot * INDEX_SLOT.size
+
+    def _index_put(self, key_hash: int, segment: int, offset: int) -> None:
+        if (self.index_count + 1) * 10 > self.index_slots * 7:
+            self._grow_index()
+        mask = self.index_slots - 1
+        slot = key_hash & mask
+        while INDEX_SLOT.unpack_from(self.index, self._slot_offset(slot))[0]:
+            slot = (slot + 1) & mask
+        INDEX_SLOT.pack_into(
+            self.index, self._slot_offset(slot), key_hash, segment, offset
+        )
+        self.index_count += 1
+        INDEX_HEADER.pack_into(
+            self.index, 0, INDEX_MAGIC, self.index_slots, self.index_count
+        )
+
+    def _index_candidates(self, key_hash: int) -> Iterator[tuple[int, int]]:
+        mask = self.index_slots - 1
+        slot = key_hash & mask
+        while True:
+            stored_hash, segment, offset = INDEX_SLOT.unpack_from(
+                self.index, self._slot_offset(slot)
+            )
+            if not stored_hash:
+                return
+            if stored_hash == key_hash:
+                yield segment, offset
+            slot = (slot + 1) & mask
+
+    def _grow_index(self) -> None:
+        """Doubles the hash table and re-inserts every used slot."""
+        entries = [
+            INDEX_SLOT.unpack_from(self.index, self._slot_offset(slot))
+            for slot in range(self.index_slots)
+        ]
+        new_path = self.index_path + ".tmp"
+        self._create_index(new_path, self.index_slots * 2)
+        self._close_index()
+        os.replace(new_path, self.index_path)
+        self._open_index()
+        for key_hash, segment, offset in entries:
+            if key_hash:
+                self._index_put(key_hash, segment, offset)
+        self.index.flush()
+
+    def rebuild_index(self) -> int:
+        """
+        Recreates the index from the segment files, e.g. after it was deleted.
+
+        Returns:
+            int: The number of indexed records.
+        """
+        with self.lock:
+            slots = self.index_slots
+            self._close_index()
+            self._create_index(self.index_path, slots)
+            self._open_index()
+            for segment in self.segments:
+                file = self._reader(segment)
+                offset = 0
+                while (record := self._read_record(file, offset)) is not None:
+                    self._index_put(_hash(record[0]), segment, offset)
+                    offset = record[2]
+            self.index.flush()
+            return self.index_count
+
+    # ----------------------------------------------
+    #       public interface
+    # ----------------------------------------------
+
+    def append(
+        self, endpoint: str, migros_id: str, body: bytes, timestamp: int = None
+    ) -> int:
+        """
+        Appends a response to the active segment and indexes it.
+
+        Args:
+            endpoint (str): Name of the endpoint, e.g. "product-detail".
+            migros_id (str): The product the response belongs to, or "" if none.
+            body (bytes): The decoded response body.
+            timestamp (int, optional): Milliseconds since the epoch, defaults to now.
+
+        Returns:
+            int: The timestamp the response was archived under.
+        """
+        timestamp = timestamp if timestamp is not None else time.time_ns() // 1_000_000
+        key = _key(endpoint, migros_id, timestamp)
+        compressed = zlib.compress(body, self.compression_level)
+        header_tail = RECORD_HEADER.pack(0, timestamp, len(key), len(compressed))[4:]
+        crc = zlib.crc32(compressed, zlib.crc32(key, zlib.crc32(header_tail)))
+        record = struct.pack("<I", crc) + header_tail + key + compressed
+
+        with self.lock:
+            if self.active.tell() + len(record) > self.max_segment_bytes and (
+                self.active.tell() > 0
+            ):
+                self.active.close()
+                self.segments.append(self.segments[-1] + 1)
+                self.active = open(self._segment_path(self.segments[-1]), "ab")
+            offset = self.active.tell()
+            self.active.write(record)
+            self.active.flush()
+            self._index_put(_hash(key), self.segments[-1], offset)
+        return timestamp
+
+    def get(self, endpoint: str, migros_id: str, timestamp: int) -> bytes | None:
+        """
+        Looks up one archived response.
+
+        Args:
+            endpoint (str): Name of the endpoint.
+            migros_id (str): The product the response belongs to, or "".
+            timestamp (int): The timestamp returned by `append`.
+
+        Returns:
+            bytes | None: The decoded response body, or None if it is not archived.
+        """
+        key = _key(endpoint, migros_id, timestamp)
+        with self.lock:
+            for segment, offset in self._index_candidates(_hash(key)):
+                record = self._read_record(self._reader(segment), offset)
+                if record and record[0] == key:
+                    return zlib.decompress(record[1])
+        return None
+
+    def scan(self, endpoint: str = None) -> Iterator[ArchivedResponse]:
+        """
+        Reads all archived responses in the order they were appended.
+
+        Args:
+            endpoint (str, optional): Only yield responses of this endpoint.
+
+        Yields:
+            ArchivedResponse: One response at a time.
+        """
+        for segment in list(self.segments):
+            with open(self._segment_path(segment), "rb") as file:
+                offset = 0
+                while (record := self._read_record(file, offset)) is not None:
+                    key, compressed, offset = record
+                    record_endpoint, migros_id, timestamp = key.decode("utf-8").split(
+                        "\0"
+                    )
+                    if endpoint is None or record_endpoint == endpoint:
+                        yield ArchivedResponse(
+                            record_endpoint,
+                            migros_id,
+                            int(timestamp),
+                            zlib.decompress(compressed),
+                        )
+
+    def __len__(self) -> int:
+        return self.index_count
+
+    def close(self) -> None:
+        """Flushes the index and closes all files."""
+        with self.lock:
+            self.active.close()
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+            self.index.flush()
+            self._close_index()
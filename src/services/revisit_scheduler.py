@@ -0,0 +1,277 @@
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, UpdateOne
+
+from src.services.mongo_service import MongoService
+from src.utils.sharding import Shard
+
+
+@dataclass(frozen=True)
+class RevisitPolicy:
+    """
+    How the change rate of a product turns into its revisit interval.
+
+    Price changes are modelled as a Poisson process per product. Its rate is
+    estimated from the changes seen over the time the product has been
+    observed, smoothed with a Gamma prior of `prior_changes` changes in
+    `prior_days` days, so new and never-changing products start from a sensible
+    guess. A product is due again once the chance that its price changed since
+    the last scrape reaches `target_probability`, clamped to
+    [min_interval_days, max_interval_days].
+    """
+
+    target_probability: float = 0.5
+    min_interval_days: float = 0.5
+    max_interval_days: float = 30.0
+    prior_changes: float = 1.0
+    prior_days: float = 30.0
+
+    def __post_init__(self):
+        if not 0 < self.target_probability < 1:
+            raise ValueError("target_probability must be between 0 and 1")
+
+    def change_rate(self, changes: int, observed_days: float) -> float:
+        """
+        Estimates the price changes per day of a product.
+
+        Args:
+            changes (int): Price changes seen so far.
+            observed_days (float): Days the product has been observed.
+
+        Returns:
+            float: The posterior mean of the change rate.
+        """
+        return (changes + self.prior_changes) / (
+            max(observed_days, 0.0) + self.prior_days
+        )
+
+    def interval_days(self, rate: float) -> float:
+        """Days until a product with this change rate is due again."""
+        interval = -math.log(1 - self.target_probability) / rate
+        return min(max(interval, self.min_interval_days), self.max_interval_days)
+
+
+class RevisitScheduler:
+    """
+    Decides when each product is due for a refresh, from how often its price changed.
+
+    `update` estimates the change rate of each product scraped since the last
+    update from its entries in 'unit_price_history' over the time it has been
+    observed (from 'firstSeen' in 'known_ids' to its last scrape), and stores
+    it as 'changeRate' with the next due time as 'nextDue' in 'id_scraped_at',
+    see RevisitPolicy.
+    `due_products` returns the products that are due, ordered by the expected
+    number of price changes missed so far (rate times time since the last
+    scrape), so a limited budget of requests goes to the products most likely
+    to have changed.
+    """
+
+    def __init__(self, mongo_service: MongoService, policy: RevisitPolicy = None):
+        self.mongo_service = mongo_service
+        self.yeeter = mongo_service.yeeter
+        self.db = mongo_service.db
+        self.policy = policy or RevisitPolicy()
+        self.db.id_scraped_at.create_index([("nextDue", ASCENDING)])
+
+    @staticmethod
+    def _utc(value) -> datetime | None:
+        """
+        Reads a stored date as a naive UTC datetime.
+
+        BSON dates are UTC. ISO strings, as written for 'firstSeen' before it
+        was stored as a date, are in the local time of the scraper.
+        """
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value).astimezone(timezone.utc)
+            except ValueError:
+                return None
+        if not isinstance(value, datetime):
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def update(
+        self,
+        shard: Shard | tuple[int, int] = None,
+        full: bool = False,
+        batch_size: int = 1000,
+    ) -> int:
+        """
+        Recomputes 'changeRate' and 'nextDue' of the products scraped since the last update.
+
+        Price changes are only recorded when a product is scraped, so the
+        estimate of a product can only change with its 'lastScraped'. The
+        'lastScraped' a schedule was computed from is kept as 'scheduledFor',
+        and only entries where the two differ are read. Their price changes and
+        first sightings are looked up per batch and written with one bulk write.
+
+        Args:
+            shard (Shard | tuple[int, int], optional): Only update the products of this shard.
+            full (bool): Recompute every product, e.g. after changing the policy.
+            batch_size (int): Number of entries per lookup and bulk write.
+
+        Returns:
+            int: The number of entries updated.
+        """
+        try:
+            query = {}
+            if not full:
+                query["$or"] = [
+                    {"scheduledFor": {"$exists": False}},
+                    {"$expr": {"$ne": ["$lastScraped", "$scheduledFor"]}},
+                ]
+            shard = Shard.of(shard)
+            if shard:
+                self.mongo_service.backfill_shard_keys()
+                query = {"$and": [query, shard.mongo_filter()]}
+            updated = 0
+            batch = []
+            for entry in self.db.id_scraped_at.find(
+                query, {"migrosId": 1, "lastScraped": 1}
+            ):
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    updated += self._update_batch(batch)
+                    batch = []
+            if batch:
+                updated += self._update_batch(batch)
+            self.yeeter.yeet(
+                f"Revisit schedule: updated {updated} products"
+                + (f" in shard {shard}." if shard else ".")
+            )
+            return updated
+        except Exception as e:
+            self.yeeter.error(f"Error updating the revisit schedule: {str(e)}")
+            self.mongo_service.log_debug_info()
+            raise
+
+    def _update_batch(self, entries: list) -> int:
+        """Schedules a batch of id_scraped_at entries with one bulk write."""
+        migros_ids = [entry["migrosId"] for entry in entries]
+        changes = {
+            row["_id"]: row["count"]
+            for row in self.db.unit_price_history.aggregate(
+                [
+                    {"$match": {"migrosId": {"$in": migros_ids}}},
+                    {"$group": {"_id": "$migrosId", "count": {"$sum": 1}}},
+                ]
+            )
+        }
+        first_seen = {
+            row["_id"]: row.get("firstSeen")
+            for row in self.db.known_ids.find(
+                {"_id": {"$in": migros_ids}}, {"firstSeen": 1}
+            )
+        }
+        requests = []
+        for entry in entries:
+            last_scraped = self._utc(entry.get("lastScraped"))
+            if last_scraped is None:
+                continue
+            migros_id = entry["migrosId"]
+            start = self._utc(first_seen.get(migros_id)) or last_scraped
+            observed_days = (last_scraped - start).total_seconds() / 86400
+            rate = self.policy.change_rate(changes.get(migros_id, 0), observed_days)
+            requests.append(
+                UpdateOne(
+                    {"_id": entry["_id"]},
+                    {
+                        "$set": {
+                            "changeRate": rate,
+                            "nextDue": last_scraped
+                            + timedelta(days=self.policy.interval_days(rate)),
+                            "scheduledFor": entry["lastScraped"],
+                        }
+                    },
+                )
+            )
+        if not requests:
+            return 0
+        return self.db.id_scraped_at.bulk_write(requests, ordered=False).matched_count
+
+    def due_products(
+        self,
+        limit: int = 100,
+        only_edible: bool = True,
+        shard: Shard | tuple[int, int] = None,
+        fill: bool = False,
+    ) -> list:
+        """
+        Returns the migrosIds that are due, the most likely changed first.
+
+        Products without a schedule yet (see update) count as due, with the
+        prior change rate.
+
+        Args:
+            limit (int): Maximum number of products to return.
+            only_edible (bool): If True, only return products with nutrients information.
+            shard (Shard | tuple[int, int], optional): Only return the products of this shard.
+            fill (bool): If fewer than limit products are due, fill up with the
+                products that are not due yet but most likely changed, so a
+                fixed request budget is used completely.
+
+        Returns:
+            list: The migrosIds to refresh.
+        """
+        try:
+            # BSON dates are read back as naive UTC, compare them with the same.
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            query = {}
+            if not fill:
+                query["$or"] = [{"nextDue": {"$lte": now}}, {"nextDue": None}]
+            shard = Shard.of(shard)
+            if shard:
+                self.mongo_service.backfill_shard_keys()
+                query.update(shard.mongo_filter())
+            if only_edible:
+                query["migrosId"] = {
+                    "$in": self.db.products.distinct(
+                        "migrosId",
+                        {"productInformation.nutrientsInformation": {"$exists": True}},
+                    )
+                }
+            due = [
+                entry["migrosId"]
+                for entry in self.db.id_scraped_at.aggregate(
+                    [
+                        {"$match": query},
+                        {
+                            "$addFields": {
+                                "expectedChanges": {
+                                    "$multiply": [
+                                        {
+                                            "$ifNull": [
+                                                "$changeRate",
+                                                self.policy.change_rate(0, 0),
+                                            ]
+                                        },
+                                        {
+                                            "$divide": [
+                                                {"$subtract": [now, "$lastScraped"]},
+                                                86400000,
+                                            ]
+                                        },
+                                    ]
+                                },
+                                "due": {"$lte": [{"$ifNull": ["$nextDue", now]}, now]},
+                            }
+                        },
+                        {"$sort": {"due": -1, "expectedChanges": -1}},
+                        {"$limit": limit},
+                        {"$project": {"migrosId": 1}},
+                    ]
+                )
+            ]
+            self.yeeter.yeet(
+                f"Found {len(due)} products due for a refresh"
+                + (f" in shard {shard}." if shard else ".")
+            )
+            return due
+        except Exception as e:
+            self.yeeter.error(f"Error retrieving due products: {str(e)}")
+            self.mongo_service.log_debug_info()
+            raise
@@ -0,0 +1,118 @@
+import re
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+
+@dataclass(frozen=True)
+class BlockingProfile:
+    """
+    Describes which requests the scraping browser may make and which ones get recorded.
+
+    - `blocked_extensions` and `blocked_hosts` are aborted: inside the browser via
+      CDP `Network.setBlockedURLs`, so they never reach the selenium-wire proxy, and
+      again by the proxy's request interceptor for anything that slips through.
+    - `capture_hosts` becomes selenium-wire's `scopes`. Requests to other hosts
+      pass the proxy without being stored in `driver.requests`.
+    - `disable_images` stops Chromium from requesting images at all.
+    """
+
+    name: str
+    blocked_extensions: tuple[str, ...] = ()
+    blocked_hosts: tuple[str, ...] = ()
+    capture_hosts: tuple[str, ...] = ()
+    disable_images: bool = False
+
+    def _host_matches(self, host: str, domains: tuple[str, ...]) -> bool:
+        return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+    def should_block(self, url: str) -> bool:
+        """
+        Decides whether a request is non-essential for scraping.
+
+        Args:
+            url (str): The request URL.
+
+        Returns:
+            bool: True if the request should be aborted.
+        """
+        parsed = urlparse(url)
+        if self._host_matches(parsed.hostname or "", self.blocked_hosts):
+            return True
+        return parsed.path.lower().endswith(self.blocked_extensions)
+
+    def blocked_url_patterns(self) -> list[str]:
+        """Wildcard patterns for CDP `Network.setBlockedURLs`."""
+        patterns = [f"*{extension}" for extension in self.blocked_extensions]
+        patterns += [f"*{extension}?*" for extension in self.blocked_extensions]
+        patterns += [f"*://{host}/*" for host in self.blocked_hosts]
+        patterns += [f"*://*.{host}/*" for host in self.blocked_hosts]
+        return patterns
+
+    def capture_scopes(self) -> list[str]:
+        """Regular expressions for selenium-wire's `driver.scopes`."""
+        return [
+            rf"^https?://([^/]*\.)?{re.escape(host)}(:\d+)?/"
+            for host in self.capture_hosts
+        ]
+
+    def request_interceptor(self, request) -> None:
+        """selenium-wire request interceptor that aborts blocked requests."""
+        if self.should_block(request.url):
+            request.abort()
+
+    def apply(self, driver) -> None:
+        """
+        Installs the profile on a running selenium-wire driver.
+
+        Args:
+            driver (seleniumwire.webdriver.Chrome): The driver to configure.
+        """
+        if self.capture_hosts:
+            driver.scopes = self.capture_scopes()
+        if self.blocked_extensions or self.blocked_hosts:
+            driver.request_interceptor = self.request_interceptor
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd(
+                "Network.setBlockedURLs", {"urls": self.blocked_url_patterns()}
+            )
+
+
+BLOCKING_PROFILES = {
+    "off": BlockingProfile(name="off"),
+    "lean": BlockingProfile(
+        name="lean",
+        blocked_extensions=(
+            ".png",
+            ".jpg",
+            ".jpeg",
+            ".gif",
+            ".webp",
+            ".avif",
+            ".svg",
+            ".ico",
+            ".woff",
+            ".woff2",
+            ".ttf",
+            ".otf",
+            ".css",
+            ".mp4",
+            ".webm",
+        ),
+        blocked_hosts=(
+            "cloudinary.com",
+            "google-analytics.com",
+            "googletagmanager.com",
+            "doubleclick.net",
+            "googlesyndication.com",
+            "facebook.net",
+            "facebook.com",
+            "hotjar.com",
+            "bing.com",
+            "criteo.com",
+            "tiktok.com",
+            "usercentrics.eu",
+        ),
+        capture_hosts=("migros.ch",),
+        disable_images=True,
+    ),
+}
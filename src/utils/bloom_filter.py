@@ -0,0 +1,128 @@
+import hashlib
+import math
+
+import numpy as np
+
+
+class BloomFilter:
+    """
+    A Bloom filter over strings, sized for `capacity` items at `error_rate` false positives.
+
+    The bits live in a numpy uint8 array, so a filter for a million ids at 0.1%
+    takes about 1.8 MB. Positions come from one blake2b digest per item split
+    into two 64-bit hashes (double hashing), which is stable across processes
+    and Python versions, unlike `hash()`. A filter can be serialized with
+    `to_bytes` and merged with another filter of the same size with `union`.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate in (0, 1)")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2 / 8) * 8
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros(self.size // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, item: str) -> np.ndarray:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return np.array(
+            [(first + i * second) % self.size for i in range(self.hash_count)],
+            dtype=np.int64,
+        )
+
+    def add(self, item: str) -> bool:
+        """
+        Adds an item.
+
+        Returns:
+            bool: True if the item was not in the filter before.
+        """
+        positions = self._positions(item)
+        masks = np.left_shift(1, positions & 7).astype(np.uint8)
+        bytes_ = positions >> 3
+        if np.all(self.bits[bytes_] & masks):
+            return False
+        np.bitwise_or.at(self.bits, bytes_, masks)
+        self.count += 1
+        return True
+
+    def update(self, items) -> None:
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        if not isinstance(item, str):
+            return False
+        positions = self._positions(item)
+        masks = np.left_shift(1, positions & 7).astype(np.uint8)
+        return bool(np.all(self.bits[positions >> 3] & masks))
+
+    def __len__(self) -> int:
+        """The number of distinct items added, as far as the filter can tell."""
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    @property
+    def is_full(self) -> bool:
+        """True once more items were added than the filter was sized for."""
+        return self.count > self.capacity
+
+    def compatible(self, other: "BloomFilter") -> bool:
+        return self.size == other.size and self.hash_count == other.hash_count
+
+    def union(self, other: "BloomFilter") -> None:
+        """
+        Adds all items of another filter with the same size and hash count.
+
+        The count becomes an estimate from the number of set bits, as items
+        added to both filters would otherwise be counted twice.
+        """
+        if not self.compatible(other):
+            raise ValueError("Cannot merge Bloom filters of different sizes")
+        np.bitwise_or(self.bits, other.bits, out=self.bits)
+        set_bits = int(np.unpackbits(self.bits).sum())
+        if set_bits >= self.size:
+            self.count = max(self.count, other.count)
+            return
+        self.count = max(
+            self.count,
+            other.count,
+            round(-self.size / self.hash_count * math.log(1 - set_bits / self.size)),
+        )
+
+    def to_bytes(self) -> bytes:
+        return self.bits.tobytes()
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes, capacity: int, error_rate: float, count: int
+    ) -> "BloomFilter":
+        """
+        Restores a filter serialized with `to_bytes`.
+
+        Args:
+            data (bytes): The bits.
+            capacity (int): The capacity the filter was created with.
+            error_rate (float): The error rate the filter was created with.
+            count (int): The number of items it holds.
+
+        Returns:
+            BloomFilter: The filter.
+        """
+        bloom = cls(capacity, error_rate)
+        if len(data) != bloom.nbytes:
+            raise ValueError(
+                f"Expected {bloom.nbytes} bytes for this capacity, got {len(data)}"
+            )
+        bloom.bits = np.frombuffer(data, dtype=np.uint8).copy()
+        bloom.count = count
+        return bloom
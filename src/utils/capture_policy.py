@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CapturePolicy:
+    """
+    Limits how much captured traffic the scraper keeps around.
+
+    - `storage` is where selenium-wire keeps `driver.requests`: "memory" (at most
+      `max_requests`, the oldest are evicted) or "disk" (in `storage_dir`, or a
+      temp directory if None). The scraper purges it after every page either way.
+    - Responses with a body over `max_body_bytes` are not kept in the response
+      mailbox. With the CDP backend, it also caps Chrome's per-resource buffer.
+    - Every `report_interval` seconds the scraper logs its memory usage, 0 disables.
+    """
+
+    name: str
+    storage: str = "memory"
+    max_requests: int = 500
+    storage_dir: str = None
+    max_body_bytes: int = 8 * 1024 * 1024
+    report_interval: float = 300.0
+
+    def __post_init__(self):
+        if self.storage not in ("memory", "disk"):
+            raise ValueError(
+                f"Unknown capture storage {self.storage!r}, expected 'memory' or 'disk'"
+            )
+
+    def seleniumwire_options(self) -> dict:
+        """Storage options for selenium-wire's `seleniumwire_options`."""
+        if self.storage == "memory":
+            return {
+                "request_storage": "memory",
+                "request_storage_max_size": self.max_requests,
+            }
+        if self.storage_dir:
+            return {"request_storage_base_dir": self.storage_dir}
+        return {}
+
+    def cdp_network_params(self) -> dict:
+        """Parameters for CDP `Network.enable` that bound Chrome's body buffers."""
+        return {
+            "maxResourceBufferSize": self.max_body_bytes,
+            "maxTotalBufferSize": self.max_body_bytes * 4,
+        }
+
+
+CAPTURE_POLICIES = {
+    "bounded": CapturePolicy(name="bounded"),
+    "disk": CapturePolicy(name="disk", storage="disk"),
+}
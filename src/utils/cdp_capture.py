@@ -0,0 +1,95 @@
+import base64
+import json
+
+from requests.structures import CaseInsensitiveDict
+from selenium.common.exceptions import WebDriverException
+
+from src.utils.response_mailbox import ResponseMailbox
+
+
+class CdpCapture:
+    """
+    Captures responses from Chrome DevTools Protocol `Network` events instead of a proxy.
+
+    The browser runs without selenium-wire, with the performance log enabled
+    (`goog:loggingPrefs`). `poll` reads the `Network.responseReceived` and
+    `Network.loadingFinished` events from that log and, for URLs the mailbox
+    watches, fetches the body with `Network.getResponseBody`. Chrome hands out
+    bodies already decompressed, so Content-Encoding is dropped from the headers.
+    Document responses are filed without a body, only their status is used.
+
+    The performance log has to be pulled, so `install` sets `poll` as the
+    mailbox's pump. Everything runs on the thread that waits for a response.
+    """
+
+    LOGGING_PREFS = {"performance": "ALL"}
+
+    def __init__(self, driver, mailbox: ResponseMailbox):
+        self.driver = driver
+        self.mailbox = mailbox
+        self._pending = {}  # requestId -> (url, status, headers, is_document)
+
+    def install(self, network_params: dict = None) -> None:
+        """
+        Enables the Network domain and makes the mailbox poll this capture.
+
+        Args:
+            network_params (dict, optional): Parameters for `Network.enable`, e.g. buffer sizes.
+        """
+        self.driver.execute_cdp_cmd("Network.enable", network_params or {})
+        self.mailbox.pump = self.poll
+
+    def clear(self) -> None:
+        """Drops all events logged so far, called before each page load."""
+        self.driver.get_log("performance")
+        self._pending.clear()
+
+    def _body(self, request_id: str) -> bytes | None:
+        try:
+            result = self.driver.execute_cdp_cmd(
+                "Network.getResponseBody", {"requestId": request_id}
+            )
+        except WebDriverException:
+            # The body was evicted from Chrome's buffer or never existed.
+            return None
+        if result.get("base64Encoded"):
+            return base64.b64decode(result["body"])
+        return result["body"].encode("utf-8")
+
+    def poll(self) -> int:
+        """
+        Files every watched response that finished loading since the last poll.
+
+        Returns:
+            int: The number of responses delivered to the mailbox.
+        """
+        delivered = 0
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method", "")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                response = params["response"]
+                if not self.mailbox.wants(response["url"]):
+                    continue
+                headers = CaseInsensitiveDict(response.get("headers", {}))
+                headers.pop("Content-Encoding", None)
+                self._pending[params["requestId"]] = (
+                    response["url"],
+                    response["status"],
+                    headers,
+                    params.get("type") == "Document",
+                )
+            elif method == "Network.loadingFinished":
+                pending = self._pending.pop(params["requestId"], None)
+                if pending is None:
+                    continue
+                url, status, headers, is_document = pending
+                body = b"" if is_document else self._body(params["requestId"])
+                if body is None:
+                    continue
+                self.mailbox.deliver(url, status, headers, body)
+                delivered += 1
+            elif method == "Network.loadingFailed":
+                self._pending.pop(params["requestId"], None)
+        return delivered
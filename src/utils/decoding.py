@@ -0,0 +1,152 @@
+import json
+import zlib
+from typing import Iterable
+
+import brotli
+
+try:
+    import orjson
+except ImportError:  # a dependency, but the stdlib parser still works without it
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # a dependency, zstd bodies cannot be decoded without it
+    zstandard = None
+
+JSON_BACKEND = "orjson" if orjson else "json"
+
+
+class DecodingError(ValueError):
+    """Raised when a response body cannot be decompressed."""
+
+
+class _DeflateDecompressor:
+    """
+    Decompressor for "deflate", which servers send either zlib-wrapped (as the
+    RFC says) or raw. The format is detected on the first chunk.
+    """
+
+    def __init__(self):
+        self._decompressor = None
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._decompressor is None:
+            self._decompressor = zlib.decompressobj()
+            try:
+                return self._decompressor.decompress(chunk)
+            except zlib.error:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(chunk)
+
+
+class _BrotliDecompressor:
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, chunk: bytes) -> bytes:
+        return self._decompressor.process(chunk)
+
+
+def _decompressor(encoding: str):
+    """Returns a decompressor for the encoding, or None if the encoding is unknown."""
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _DeflateDecompressor()
+    if encoding == "br":
+        return _BrotliDecompressor()
+    if encoding == "zstd":
+        if zstandard is None:
+            raise DecodingError("zstd encoded body, but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+def _encodings(content_encoding: str) -> list[str]:
+    """Content-Encoding values in the order they have to be undone."""
+    encodings = [value.strip().lower() for value in (content_encoding or "").split(",")]
+    return [value for value in reversed(encodings) if value and value != "identity"]
+
+
+def decompress_chunks(chunks: Iterable[bytes], content_encoding: str) -> bytes:
+    """
+    Decompresses a body chunk by chunk, so it can be fed from a stream.
+
+    A body with an unknown Content-Encoding is returned as it is, like a
+    browser would try to use it, instead of failing the response.
+
+    Args:
+        chunks (Iterable[bytes]): The encoded body in pieces.
+        content_encoding (str): The Content-Encoding header, e.g. "gzip" or "br".
+
+    Returns:
+        bytes: The decoded body.
+
+    Raises:
+        DecodingError: If the body is corrupt or zstandard is missing for a zstd body.
+    """
+    encodings = _encodings(content_encoding)
+    if not encodings:
+        return b"".join(chunks)
+    decompressor = _decompressor(encodings[0])
+    if decompressor is None:
+        return b"".join(chunks)
+    output = bytearray()
+    try:
+        for chunk in chunks:
+            output += decompressor.decompress(chunk)
+    except (zlib.error, brotli.error) as e:
+        raise DecodingError(f"{encodings[0]} decompression failed: {str(e)}") from e
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise DecodingError(f"zstd decompression failed: {str(e)}") from e
+        raise
+    if len(encodings) > 1:
+        return decompress_chunks([bytes(output)], ", ".join(reversed(encodings[1:])))
+    return bytes(output)
+
+
+def decompress(body: bytes, content_encoding: str) -> bytes:
+    """
+    Decompresses a complete response body.
+
+    Args:
+        body (bytes): The encoded body.
+        content_encoding (str): The Content-Encoding header.
+
+    Returns:
+        bytes: The decoded body, or the body itself for an unknown encoding.
+
+    Raises:
+        DecodingError: If the body is corrupt, see decompress_chunks.
+    """
+    if not _encodings(content_encoding):
+        return body
+    return decompress_chunks((body,), content_encoding)
+
+
+def loads(data: bytes):
+    """
+    Parses JSON straight from bytes with orjson if it is installed, else with the stdlib.
+
+    Raises:
+        json.JSONDecodeError: If the data is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_json(body: bytes, content_encoding: str):
+    """
+    Decompresses and parses a JSON response body.
+
+    Args:
+        body (bytes): The encoded body.
+        content_encoding (str): The Content-Encoding header.
+
+    Returns:
+        dict | list: The decoded JSON.
+    """
+    return loads(decompress(body, content_encoding))
@@ -0,0 +1,107 @@
+import hashlib
+import json
+
+# The content whose change is worth a new product version, as dotted paths.
+# Stock, order limits, badges, images and ratings change all the time without
+# the product changing, so they are left out.
+TRACKED_FIELDS = (
+    "name",
+    "brand",
+    "versioning",
+    "title",
+    "description",
+    "productRange",
+    "gtins",
+    "breadcrumb",
+    "offer.price",
+    "offer.promotionPrice",
+    "offer.promotionDateRange",
+    "offer.quantity",
+    "offer.quantityPrice",
+    "offer.isVariableWeight",
+    "offer.type",
+    "productInformation.mainInformation.brand",
+    "productInformation.mainInformation.labels",
+    "productInformation.mainInformation.ingredients",
+    "productInformation.mainInformation.allergens",
+    "productInformation.mainInformation.allergenIndication",
+    "productInformation.mainInformation.origin",
+    "productInformation.nutrientsInformation",
+    "productInformation.otherInformation.articleNumber",
+    "productInformation.otherInformation.legalDesignation",
+)
+# Offer fields a product-cards response carries with the same meaning as a
+# product-detail response. A price refresh from product cards copies only these.
+CARD_PRICE_FIELDS = ("price", "promotionPrice", "promotionDateRange", "quantityPrice")
+# Stored with each fingerprint, bumped whenever TRACKED_FIELDS or price_fingerprint changes.
+FINGERPRINT_VERSION = 3
+
+
+def _digest(value) -> str:
+    canonical = json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _get_path(document: dict, path: str):
+    value = document
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def product_fingerprint(product: dict) -> str:
+    """
+    Stable hash over the TRACKED_FIELDS of a product.
+
+    Keys are sorted before hashing, so two responses with the same content give
+    the same fingerprint regardless of key order.
+
+    Args:
+        product (dict): A product-detail product, optionally with _id and dateAdded.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    return _digest({path: _get_path(product, path) for path in TRACKED_FIELDS})
+
+
+def _normalize_price(price) -> dict | None:
+    """The amount, unit price and unit of a price, as both response shapes have them."""
+    if not isinstance(price, dict):
+        return None
+    value = price.get("value")
+    if value is None:
+        value = price.get("effectiveValue", price.get("advertisedValue"))
+    unit_price = price.get("unitPrice") or {}
+    return {
+        "value": value,
+        "unitPrice": unit_price.get("value"),
+        "unit": unit_price.get("unit"),
+    }
+
+
+def price_fingerprint(product: dict) -> str:
+    """
+    Stable hash over the price and promotion price, used to tell price changes from other changes.
+
+    Only the amounts and unit prices are hashed, normalized, so a product card
+    and a product-detail response with the same prices give the same
+    fingerprint, even though their price objects have different keys.
+
+    Args:
+        product (dict): A product-detail product or a product card.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    offer = product.get("offer") or {}
+    return _digest(
+        {
+            "price": _normalize_price(offer.get("price")),
+            "promotionPrice": _normalize_price(offer.get("promotionPrice")),
+        }
+    )
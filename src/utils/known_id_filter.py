@@ -0,0 +1,63 @@
+from src.utils.bloom_filter import BloomFilter
+
+
+class KnownIdFilter:
+    """
+    Discovery dedup through a Bloom filter, confirmed against the 'known_ids' collection.
+
+    Every scraper process loads the same filter snapshot from MongoDB instead of
+    the full id list. A miss in the filter means the id is new for certain, a
+    hit may be a false positive and is confirmed with the store. Claims go to
+    the store as atomic upserts, so two processes never both fetch the same new
+    product, even when their snapshots are out of date.
+
+    The store is a MongoService, or anything with `find_known_ids(ids)` and
+    `claim_known_id(id)`.
+    """
+
+    def __init__(self, bloom: BloomFilter, store):
+        self.bloom = bloom
+        self.store = store
+        self.confirmations = 0
+        self.false_positives = 0
+
+    def known(self, migros_ids) -> set:
+        """
+        Returns the ids that are known, with one store query for all filter hits.
+
+        Args:
+            migros_ids: The ids to check, e.g. all product cards of a page.
+
+        Returns:
+            set: The known ids.
+        """
+        candidates = {migros_id for migros_id in migros_ids if migros_id in self.bloom}
+        if not candidates:
+            return set()
+        known = self.store.find_known_ids(list(candidates))
+        self.confirmations += len(candidates)
+        self.false_positives += len(candidates) - len(known)
+        return known
+
+    def __contains__(self, migros_id: str) -> bool:
+        return bool(self.known([migros_id]))
+
+    def __len__(self) -> int:
+        return len(self.bloom)
+
+    def add(self, migros_id: str) -> None:
+        self.bloom.add(migros_id)
+
+    def claim(self, migros_id: str) -> bool:
+        """
+        Claims an id in the store and adds it to the filter.
+
+        Args:
+            migros_id (str): The id to claim.
+
+        Returns:
+            bool: True if the id was not known before and now belongs to the caller.
+        """
+        claimed = self.store.claim_known_id(migros_id)
+        self.bloom.add(migros_id)
+        return claimed
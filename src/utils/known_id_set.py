@@ -0,0 +1,84 @@
+from array import array
+
+import numpy as np
+
+
+class KnownIdSet:
+    """
+    A compact set of migrosIds.
+
+    migrosIds are numeric strings, so they are kept as a sorted int64 numpy array
+    (8 bytes per id instead of a ~60 byte str plus its set slot) and looked up by
+    binary search. Ids added later go to a small Python set that is merged into
+    the array once it holds `merge_threshold` ids. Ids that do not round-trip
+    through int (leading zeros, letters) are kept in a plain set.
+    """
+
+    def __init__(self, migros_ids=(), merge_threshold: int = 4096):
+        self.merge_threshold = merge_threshold
+        numeric = array("q")
+        self._other = set()
+        for migros_id in migros_ids:
+            key = self._key(migros_id)
+            if key is None:
+                self._other.add(migros_id)
+            else:
+                numeric.append(key)
+        self._sorted = np.unique(np.frombuffer(numeric, dtype=np.int64))
+        self._added = set()
+
+    @staticmethod
+    def _key(migros_id: str) -> int | None:
+        """The int64 key of a canonical numeric id, None for every other id."""
+        if (
+            not isinstance(migros_id, str)
+            or not migros_id.isdigit()
+            or len(migros_id) > 18
+            or (migros_id[0] == "0" and len(migros_id) > 1)
+        ):
+            return None
+        return int(migros_id)
+
+    def _merge(self) -> None:
+        added = np.fromiter(self._added, dtype=np.int64, count=len(self._added))
+        self._sorted = np.union1d(self._sorted, added)
+        self._added.clear()
+
+    def __contains__(self, migros_id: str) -> bool:
+        key = self._key(migros_id)
+        if key is None:
+            return migros_id in self._other
+        if key in self._added:
+            return True
+        index = np.searchsorted(self._sorted, key)
+        return bool(index < len(self._sorted) and self._sorted[index] == key)
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._added) + len(self._other)
+
+    def __iter__(self):
+        for key in self._sorted:
+            yield str(key)
+        for key in list(self._added):
+            yield str(key)
+        yield from list(self._other)
+
+    def add(self, migros_id: str) -> None:
+        if migros_id in self:
+            return
+        key = self._key(migros_id)
+        if key is None:
+            self._other.add(migros_id)
+            return
+        self._added.add(key)
+        if len(self._added) >= self.merge_threshold:
+            self._merge()
+
+    def update(self, migros_ids) -> None:
+        for migros_id in migros_ids:
+            self.add(migros_id)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the numeric part, for logging."""
+        return self._sorted.nbytes
@@ -0,0 +1,69 @@
+import os
+import resource
+
+
+def rss_bytes(pid: int = None) -> int:
+    """
+    Returns the resident set size of a process.
+
+    Reads /proc/<pid>/statm on Linux. Elsewhere only the own process can be
+    measured, and only its peak RSS (ru_maxrss) is available.
+
+    Args:
+        pid (int, optional): The process id, defaults to the current process.
+
+    Returns:
+        int: The resident memory in bytes, 0 if the process does not exist.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as file:
+            resident_pages = int(file.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except FileNotFoundError:
+        if pid is not None and pid != os.getpid():
+            return 0
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+
+
+def _children() -> dict[int, list[int]]:
+    """Maps each process id to the ids of its direct children, from /proc."""
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as file:
+                # The command name in parentheses may contain spaces.
+                fields = file.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(name))
+    return children
+
+
+def process_tree_rss_bytes(pid: int = None) -> int:
+    """
+    Returns the summed RSS of a process and all its descendants.
+
+    For the scraper this covers the Python process (including the selenium-wire
+    proxy threads), chromedriver and every Chromium process. Shared pages are
+    counted once per process, so the sum overestimates the real footprint.
+
+    Args:
+        pid (int, optional): The root process id, defaults to the current process.
+
+    Returns:
+        int: The resident memory in bytes. Without /proc only the root is measured.
+    """
+    pid = pid or os.getpid()
+    if not os.path.isdir("/proc"):
+        return rss_bytes(pid)
+    children = _children()
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_bytes(current)
+        stack.extend(children.get(current, ()))
+    return total
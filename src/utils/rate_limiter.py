@@ -0,0 +1,125 @@
+import math
+import threading
+import time
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts with AIMD (additive increase, multiplicative decrease).
+
+    Every healthy response nudges the rate up by `additive_increase` requests per
+    second. A 429, or a response much slower than the running latency baseline,
+    cuts the rate by `multiplicative_decrease`. Retry-After blocks the bucket until
+    the given time has passed. The state can be exported and restored, so a new
+    run starts at the last rate the site tolerated.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.5,
+        min_rate: float = 0.05,
+        max_rate: float = 2.0,
+        burst: float = 1.0,
+        additive_increase: float = 0.01,
+        multiplicative_decrease: float = 0.5,
+        latency_backoff_factor: float = 3.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = burst
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.latency_backoff_factor = latency_backoff_factor
+        self.latency_baseline = None
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst
+        self.last_refill = clock()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def unlimited(cls) -> "AdaptiveRateLimiter":
+        """A limiter that never waits, e.g. for tests."""
+        return cls(rate=math.inf, min_rate=math.inf, max_rate=math.inf)
+
+    @property
+    def is_unlimited(self) -> bool:
+        return math.isinf(self.rate)
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.last_refill)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def acquire(self) -> float:
+        """
+        Blocks until a request may be sent.
+
+        Returns:
+            float: The time waited in seconds.
+        """
+        if self.is_unlimited:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                wait = max(0.0, self.blocked_until - now)
+                if wait == 0.0:
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return waited
+                    wait = (1.0 - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+    def record_success(self, latency: float) -> None:
+        """
+        Reports a healthy response and adapts the rate to its latency.
+
+        Args:
+            latency (float): Time the request took in seconds.
+        """
+        with self.lock:
+            if (
+                self.latency_baseline is not None
+                and latency > self.latency_baseline * self.latency_backoff_factor
+            ):
+                self._decrease()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.additive_increase)
+            if self.latency_baseline is None:
+                self.latency_baseline = latency
+            else:
+                self.latency_baseline = 0.9 * self.latency_baseline + 0.1 * latency
+
+    def record_throttle(self, retry_after: float = None) -> None:
+        """
+        Reports a 429 answer: cuts the rate and honours Retry-After.
+
+        Args:
+            retry_after (float, optional): Seconds the server asked us to wait.
+        """
+        with self.lock:
+            self._decrease()
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, self.clock() + retry_after)
+
+    def _decrease(self) -> None:
+        self.rate = max(self.min_rate, self.rate * self.multiplicative_decrease)
+
+    def state(self) -> dict:
+        """Returns the adaptive part of the limiter for persisting."""
+        return {"rate": self.rate, "latencyBaseline": self.latency_baseline}
+
+    def restore(self, state: dict) -> None:
+        """Continues from a state previously returned by `state`."""
+        if state.get("rate"):
+            self.rate = min(max(state["rate"], self.min_rate), self.max_rate)
+        self.latency_baseline = state.get("latencyBaseline")
@@ -0,0 +1,250 @@
+import gzip
+import json
+import time
+import zlib
+from types import SimpleNamespace
+from urllib.parse import urlencode, urlparse
+
+from src.services.migros_api import MigrosApiClient
+from src.services.response_archive import ResponseArchive
+
+API_URL = MigrosApiClient.BASE_URL
+# The scraper only matches the watched fragments, the rest of these URLs is made up.
+STOREMAP_URL = API_URL + "/replay/storemap"
+CATEGORY_URL = API_URL + "/replay/products/category"
+
+STORED_FIELDS = ("_id", "dateAdded", "fingerprint")
+
+
+def _strip(document: dict) -> dict:
+    return {key: value for key, value in document.items() if key not in STORED_FIELDS}
+
+
+class ReplayCorpus:
+    """
+    Recorded responses that a ReplayDriver serves instead of the live site.
+
+    Categories are kept as one flat list. A category page answers with the
+    category and all its descendants (by `path`), like the products/category
+    endpoint does. Every page also gets a deterministic slice of product cards,
+    so discovery runs as it would online.
+
+    With `synthetic_products`, that many extra products are derived from the
+    recorded ones (with ids starting with "9"), to get a corpus big enough for
+    throughput measurements.
+    """
+
+    def __init__(
+        self,
+        base_categories: list[dict],
+        categories: list[dict] = (),
+        products: list[dict] = (),
+        synthetic_products: int = 0,
+        cards_per_page: int = 20,
+    ):
+        # Documents read back from MongoDB carry fields the API does not send.
+        base_categories = [_strip(category) for category in base_categories]
+        self.base_categories = base_categories
+        self.categories_by_slug = {}
+        # Entries from category responses win, they carry the levels of the subtree.
+        for category in [_strip(category) for category in categories] + base_categories:
+            self.categories_by_slug.setdefault(category["slug"], category)
+        self.products = {}
+        for product in products:
+            product = _strip(product)
+            self.products[product["migrosId"]] = product
+        self.templates = list(self.products.values())
+        self.synthetic_products = synthetic_products if self.templates else 0
+        self.product_ids = list(self.products) + [
+            self._synthetic_id(index) for index in range(self.synthetic_products)
+        ]
+        self.cards_per_page = cards_per_page
+
+    @classmethod
+    def from_archive(cls, archive: ResponseArchive, **kwargs) -> "ReplayCorpus":
+        """
+        Builds a corpus from the responses in a ResponseArchive. Later responses
+        replace earlier ones for the same product.
+
+        Args:
+            archive (ResponseArchive): The archive to read.
+            **kwargs: Passed on to the constructor.
+
+        Returns:
+            ReplayCorpus: The corpus.
+        """
+        base_categories, categories, products = [], [], {}
+        for response in archive.scan():
+            try:
+                data = json.loads(response.body)
+            except ValueError:
+                continue
+            if response.endpoint == "storemap":
+                base_categories = data.get("categories", [])
+            elif response.endpoint == "products/category":
+                categories.extend(data.get("categories", []))
+            elif response.endpoint == "product-detail":
+                for product in data:
+                    products[product["migrosId"]] = product
+        return cls(base_categories, categories, list(products.values()), **kwargs)
+
+    @staticmethod
+    def _synthetic_id(index: int) -> str:
+        return f"9{index:011d}"
+
+    def _template(self, migros_id: str) -> dict | None:
+        """The recorded product a migrosId is served from, None if unknown."""
+        if migros_id in self.products:
+            return self.products[migros_id]
+        if len(migros_id) == 12 and migros_id.startswith("9") and migros_id.isdigit():
+            index = int(migros_id[1:])
+            if index < self.synthetic_products:
+                return self.templates[index % len(self.templates)]
+        return None
+
+    def product_detail(self, migros_id: str) -> list:
+        """Returns the product-detail response for a migrosId, [] if unknown."""
+        template = self._template(migros_id)
+        if template is None:
+            return []
+        if template["migrosId"] == migros_id:
+            return [template]
+        return [dict(template, migrosId=migros_id, uid=migros_id)]
+
+    def category(self, slug: str) -> dict:
+        """Returns the products/category response for a category slug."""
+        category = self.categories_by_slug.get(slug)
+        if category is None:
+            return {"categories": []}
+        prefix = category.get("path", "") + "/"
+        return {
+            "categories": [category]
+            + [
+                other
+                for other in self.categories_by_slug.values()
+                if other.get("path", "").startswith(prefix)
+            ]
+        }
+
+    def product_cards(self, url: str) -> list:
+        """Returns the product cards shown on a page, always the same ones per URL."""
+        if not self.product_ids:
+            return []
+        count = len(self.product_ids)
+        start = zlib.crc32(url.encode()) % count
+        cards = []
+        for offset in range(min(self.cards_per_page, count)):
+            migros_id = self.product_ids[(start + offset) % count]
+            card = {"migrosId": migros_id}
+            offer = self._template(migros_id).get("offer")
+            if offer:
+                card["offer"] = offer
+            cards.append(card)
+        return cards
+
+
+class ReplayDriver:
+    """
+    Stands in for the selenium-wire driver and answers page loads from a ReplayCorpus.
+
+    `get` files the document response and the API responses the real page would
+    trigger (storemap, products/category, product-detail and product-cards)
+    through `response_interceptor`, synchronously and without any network. With
+    it, MigrosScraper runs its category traversal, discovery and MongoDB writes
+    at full speed and deterministically. Bodies are sent with `content_encoding`
+    ("gzip" or "identity") so the decompression path is part of the measurement.
+    The time spent building responses is summed up in `serve_seconds`, so it can
+    be subtracted from timings of the scraper.
+    """
+
+    def __init__(self, corpus: ReplayCorpus, content_encoding: str = "gzip"):
+        self.corpus = corpus
+        self.content_encoding = content_encoding
+        self.requests = []
+        self.scopes = []
+        self.request_interceptor = None
+        self.response_interceptor = None
+        self.current_url = None
+        self.page_loads = 0
+        self.serve_seconds = 0.0
+
+    def __delattr__(self, name: str) -> None:
+        # selenium-wire clears captured requests with `del driver.requests`.
+        if name == "requests":
+            self.requests = []
+        else:
+            super().__delattr__(name)
+
+    def _encode(self, data) -> bytes:
+        body = json.dumps(data).encode()
+        if self.content_encoding == "gzip":
+            return gzip.compress(body, compresslevel=5)
+        return body
+
+    def _exchanges(self, url: str) -> list[tuple[str, object]]:
+        """The API responses the page at url triggers, as (url, JSON data) pairs."""
+        path = urlparse(url).path.rstrip("/")
+        exchanges = []
+        if "/category/" in path:
+            slug = path.rsplit("/", 1)[-1]
+            exchanges.append(
+                (
+                    CATEGORY_URL + "?" + urlencode({"slug": slug}),
+                    self.corpus.category(slug),
+                )
+            )
+        elif "/product/" in path:
+            migros_id = path.rsplit("/", 1)[-1]
+            exchanges.append(
+                (
+                    API_URL
+                    + MigrosApiClient.PRODUCT_DETAIL_PATH
+                    + "?"
+                    + urlencode({"migrosIds": migros_id}),
+                    self.corpus.product_detail(migros_id),
+                )
+            )
+        else:
+            exchanges.append(
+                (STOREMAP_URL, {"categories": self.corpus.base_categories})
+            )
+        exchanges.append(
+            (
+                API_URL + MigrosApiClient.PRODUCT_CARDS_PATH,
+                self.corpus.product_cards(url),
+            )
+        )
+        return exchanges
+
+    def _deliver(self, url: str, status_code: int, headers: dict, body: bytes) -> None:
+        request = SimpleNamespace(url=url, headers={})
+        response = SimpleNamespace(status_code=status_code, headers=headers, body=body)
+        request.response = response
+        self.requests.append(request)
+        if self.response_interceptor:
+            self.response_interceptor(request, response)
+
+    def get(self, url: str) -> None:
+        """Loads a page: delivers its document and API responses to the interceptor."""
+        self.current_url = url
+        self.page_loads += 1
+        start = time.perf_counter()
+        headers = {"Content-Type": "application/json"}
+        if self.content_encoding != "identity":
+            headers["Content-Encoding"] = self.content_encoding
+        responses = [
+            (api_url, self._encode(data)) for api_url, data in self._exchanges(url)
+        ]
+        self.serve_seconds += time.perf_counter() - start
+        self._deliver(url, 200, {"Content-Type": "text/html"}, b"<html></html>")
+        for api_url, body in responses:
+            self._deliver(api_url, 200, headers, body)
+
+    def execute_cdp_cmd(self, cmd: str, params: dict) -> dict:
+        return {}
+
+    def get_cookies(self) -> list:
+        return []
+
+    def quit(self) -> None:
+        pass
@@ -0,0 +1,165 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.utils import decoding
+
+PAGE = "page"  # mailbox key for the document response of the current page load
+
+
+@dataclass
+class CapturedResponse:
+    url: str
+    status_code: int
+    headers: object  # case-insensitive header mapping from selenium-wire
+    body: bytes
+    # True if the body was over the mailbox's max_body_bytes and was dropped.
+    truncated: bool = False
+    _parsed: object = field(default=None, repr=False)
+    _is_parsed: bool = field(default=False, repr=False)
+
+    def json(self, decompress):
+        """
+        Decompresses and decodes the body. The result is cached, so a response
+        that several callers read is only decoded once.
+
+        Args:
+            decompress (Callable[[bytes, str], bytes]): Decompresses a body for a Content-Encoding.
+
+        Returns:
+            dict | list: The decoded JSON body.
+
+        Raises:
+            json.JSONDecodeError: If the body is not valid JSON.
+        """
+        if not self._is_parsed:
+            encoding = self.headers.get("Content-Encoding", "")
+            self._parsed = decoding.loads(decompress(self.body, encoding))
+            self._is_parsed = True
+        return self._parsed
+
+
+class ResponseMailbox:
+    """
+    Per-page index of responses captured by the selenium-wire proxy.
+
+    `interceptor` is installed as the driver's response interceptor. It runs on
+    the proxy threads and files every response exactly once: under each watched
+    fragment its URL contains, and under PAGE if it is the document response of
+    the current page load. Waiting callers wake up as soon as their key is filled.
+    An optional `listener` is called with (fragment, response) for every response
+    that matched a watched fragment, e.g. to archive it.
+
+    Capture backends that have to be polled (see CdpCapture) set `pump`. Waiting
+    callers then call it every `pump_interval` seconds to pull in new responses.
+
+    Bodies larger than `max_body_bytes` are filed as empty bodies marked as
+    `truncated`, so waiting callers see the response, and that its payload is
+    gone, but the mailbox does not hold on to it.
+    """
+
+    def __init__(
+        self, fragments: tuple[str, ...], listener=None, max_body_bytes: int = None
+    ):
+        self.fragments = tuple(fragments)
+        self.listener = listener
+        self.max_body_bytes = max_body_bytes
+        self.oversized_count = 0
+        self.pump = None
+        self.pump_interval = 0.05
+        self.page_url = None
+        self._responses: dict[str, list[CapturedResponse]] = {}
+        self._condition = threading.Condition()
+
+    def interceptor(self, request, response) -> None:
+        """selenium-wire response interceptor, called once per proxied response."""
+        self.deliver(request.url, response.status_code, response.headers, response.body)
+
+    def wants(self, url: str) -> bool:
+        """True if a response for this URL would be filed."""
+        return any(fragment in url for fragment in self.fragments) or bool(
+            self.page_url and self.page_url in url
+        )
+
+    def deliver(self, url: str, status_code: int, headers, body: bytes) -> None:
+        """
+        Files a captured response under every key it matches.
+
+        Args:
+            url (str): The request URL.
+            status_code (int): The HTTP status code.
+            headers: Case-insensitive header mapping.
+            body (bytes): The response body, as it came over the wire.
+        """
+        keys = [fragment for fragment in self.fragments if fragment in url]
+        if self.page_url and self.page_url in url:
+            keys.append(PAGE)
+        if not keys:
+            return
+        truncated = (
+            self.max_body_bytes is not None and len(body or b"") > self.max_body_bytes
+        )
+        if truncated:
+            self.oversized_count += 1
+            body = b""
+        captured = CapturedResponse(
+            url=url,
+            status_code=status_code,
+            headers=headers,
+            body=body,
+            truncated=truncated,
+        )
+        with self._condition:
+            for key in keys:
+                self._responses.setdefault(key, []).append(captured)
+            self._condition.notify_all()
+        if self.listener:
+            for key in keys:
+                if key != PAGE:
+                    self.listener(key, captured)
+
+    def reset(self, page_url: str = None) -> None:
+        """
+        Forget all captured responses, called before each page load.
+
+        Args:
+            page_url (str, optional): The URL about to be loaded, its responses are filed under PAGE.
+        """
+        with self._condition:
+            self.page_url = page_url
+            self._responses.clear()
+
+    def page_responses(self) -> list[CapturedResponse]:
+        """Returns the responses captured for the current page URL so far."""
+        if self.pump:
+            self.pump()
+        with self._condition:
+            return list(self._responses.get(PAGE, ()))
+
+    def wait_for(
+        self, fragment: str, timeout: float, index: int = 0
+    ) -> CapturedResponse | None:
+        """
+        Waits until the `index`-th response for a fragment has arrived.
+
+        Args:
+            fragment (str): One of the watched URL fragments.
+            timeout (float): Maximum time to wait in seconds.
+            index (int): Which response to return if the fragment matched several times.
+
+        Returns:
+            CapturedResponse | None: The response, or None if it did not arrive in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.pump:
+                self.pump()
+            with self._condition:
+                if len(self._responses.get(fragment, ())) > index:
+                    return self._responses[fragment][index]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                if self.pump:
+                    remaining = min(remaining, self.pump_interval)
+                self._condition.wait(remaining)
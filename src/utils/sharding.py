@@ -0,0 +1,50 @@
+import zlib
+from dataclasses import dataclass
+
+
+def shard_key(migros_id: str) -> int:
+    """
+    Returns the stable hash a migrosId is partitioned by.
+
+    CRC-32 of the id, the same in every process, Python version and language,
+    unlike `hash()`. It is stored as 'shardKey' so MongoDB can select a shard
+    with `$mod`, for any shard count.
+    """
+    return zlib.crc32(str(migros_id).encode())
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    Shard `index` of `count`: the migrosIds whose shard_key % count == index.
+
+    K scraper instances started with shards (0, K) ... (K - 1, K) own disjoint
+    slices of the products that together cover all of them, without talking
+    to each other.
+    """
+
+    index: int
+    count: int
+
+    def __post_init__(self):
+        if self.count < 1 or not 0 <= self.index < self.count:
+            raise ValueError(
+                f"Invalid shard {self.index} of {self.count}, expected 0 <= index < count"
+            )
+
+    @classmethod
+    def of(cls, shard) -> "Shard":
+        """Returns a Shard for a Shard, an (index, count) tuple or None (no sharding)."""
+        if shard is None or isinstance(shard, Shard):
+            return shard
+        return cls(*shard)
+
+    def owns(self, migros_id: str) -> bool:
+        return shard_key(migros_id) % self.count == self.index
+
+    def mongo_filter(self, field: str = "shardKey") -> dict:
+        """A MongoDB filter for the documents of this shard, served by an index on field."""
+        return {field: {"$mod": [self.count, self.index]}}
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
@@ -0,0 +1,98 @@
+import threading
+from multiprocessing.managers import SyncManager
+
+from src.utils.known_id_set import KnownIdSet
+
+
+class _IdStore:
+    """The ids of a SharedIdSet, living inside the manager process."""
+
+    def __init__(self, ids: KnownIdSet = None):
+        self._ids = ids if ids is not None else KnownIdSet()
+        self._lock = threading.Lock()
+
+    def contains(self, migros_id: str) -> bool:
+        return migros_id in self._ids
+
+    def size(self) -> int:
+        return len(self._ids)
+
+    def update(self, migros_ids: list) -> None:
+        with self._lock:
+            self._ids.update(migros_ids)
+
+    def known(self, migros_ids: list) -> list:
+        return [migros_id for migros_id in migros_ids if migros_id in self._ids]
+
+    def claim(self, migros_id: str) -> bool:
+        with self._lock:
+            if migros_id in self._ids:
+                return False
+            self._ids.add(migros_id)
+            return True
+
+
+class IdSetManager(SyncManager):
+    """A SyncManager that can host SharedIdSet stores."""
+
+
+IdSetManager.register("IdStore", _IdStore)
+
+
+class SharedIdSet:
+    """
+    A set of migrosIds shared between worker processes through a manager.
+
+    The ids live in the manager process, so membership checks and claims are
+    seen by every process holding this object. Every call is a round trip to
+    the manager, so a page of product cards is checked with one `known` call
+    instead of one membership test per card. Instances can be passed to worker
+    processes as arguments.
+
+    The ids are kept in a KnownIdSet. One passed in is sent to the manager as
+    is, its int64 array pickled in one piece, instead of as a list of strings.
+    """
+
+    def __init__(self, manager: IdSetManager, ids=()):
+        if not isinstance(ids, KnownIdSet):
+            ids = KnownIdSet(ids)
+        self._store = manager.IdStore(ids)
+
+    def __contains__(self, migros_id: str) -> bool:
+        return self._store.contains(migros_id)
+
+    def __len__(self) -> int:
+        return self._store.size()
+
+    def add(self, migros_id: str) -> None:
+        self._store.update([migros_id])
+
+    def update(self, migros_ids) -> None:
+        self._store.update(list(migros_ids))
+
+    def known(self, migros_ids) -> set:
+        """
+        Returns the given ids that are in the set, with one call to the manager.
+
+        Args:
+            migros_ids (Iterable[str]): The ids to check, e.g. of a page of product cards.
+
+        Returns:
+            set: The known ids.
+        """
+        return set(self._store.known(list(migros_ids)))
+
+    def claim(self, migros_id: str) -> bool:
+        """
+        Atomically adds an id and reports whether this caller added it.
+
+        The check and the insert run under one lock inside the manager process,
+        so when two workers claim the same id only the first one gets True.
+
+        Args:
+            migros_id (str): The id to claim.
+
+        Returns:
+            bool: True if the id was not known before and now belongs to the caller.
+        """
+        return self._store.claim(migros_id)
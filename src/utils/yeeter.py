@@ -99,11 +99,17 @@ class Yeeter:
                 self.yeet(f"Deleted log file: {log_file_path}")
 
     def log_scraper_state(
-        self, url: str, request=None, scraped_product_ids=None, base_categories=None
+        self,
+        url: str,
+        request=None,
+        scraped_product_ids=None,
+        base_categories=None,
+        response=None,
     ):
         """
         Log the final state of the scraper before shutdown.
         This captures details about the URL, request, response, and any other relevant data.
+        `response` is a captured response with url, status_code, headers and body.
         """
         self.yeet("Something triggered the scraper to log final state...")
         self.yeet(f"Logging scraper state for URL: {url}")
@@ -111,14 +117,14 @@ class Yeeter:
         # Log the request and response if available
         if request:
             self.yeet(f"Request URL: {request.url}")
-            if request.response:
-                self.yeet(f"Response Status Code: {request.response.status_code}")
-                self.yeet(f"Response Headers: {request.response.headers}")
-                self.yeet(f"Response Body: {request.response.body}")
-            else:
-                self.yeet("No response available for this request.")
+            response = response or request.response
+        if response:
+            self.yeet(f"Response URL: {getattr(response, 'url', url)}")
+            self.yeet(f"Response Status Code: {response.status_code}")
+            self.yeet(f"Response Headers: {response.headers}")
+            self.yeet(f"Response Body: {response.body}")
         else:
-            self.yeet("No specific request object available.")
+            self.yeet("No response available for this request.")
 
         # Log the number of products or categories scraped
         if scraped_product_ids is not None:
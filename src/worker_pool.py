@@ -0,0 +1,269 @@
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+from multiprocessing.managers import BaseProxy
+
+from src.migros_scraper import MigrosScraper
+from src.services.crawl_frontier import CrawlFrontier
+from src.services.mongo_service import MongoService
+from src.utils.known_id_set import KnownIdSet
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.sharding import Shard
+from src.utils.shared_id_set import IdSetManager, SharedIdSet
+from src.utils.yeeter import Yeeter
+
+
+@dataclass
+class WorkerConfig:
+    mongo_uri: str
+    mongo_db_name: str
+    # 9222 stays free for the main scraper's own browser.
+    base_debugging_port: int = 9223
+    base_proxy_port: int = 8900
+    # None walks the category tree to any depth.
+    max_category_depth: int = None
+    # The crawl frontier the workers share with the main scraper.
+    frontier_collection: str = "crawl_frontier"
+    # A worker with nothing to do gives up after this many seconds, even if
+    # frontier items are still in progress (e.g. of a worker that was killed).
+    idle_timeout: float = 300
+    scraper_options: dict = field(default_factory=dict)
+
+
+class RateLimiterProxy(BaseProxy):
+    """Proxy of an AdaptiveRateLimiter in the pool's manager, used like the limiter itself."""
+
+    _exposed_ = (
+        "acquire",
+        "record_success",
+        "record_throttle",
+        "state",
+        "restore",
+        "__getattribute__",
+    )
+
+    def acquire(self) -> float:
+        return self._callmethod("acquire")
+
+    def record_success(self, latency: float) -> None:
+        self._callmethod("record_success", (latency,))
+
+    def record_throttle(self, retry_after: float = None) -> None:
+        self._callmethod("record_throttle", (retry_after,))
+
+    def state(self) -> dict:
+        return self._callmethod("state")
+
+    def restore(self, state: dict) -> None:
+        self._callmethod("restore", (state,))
+
+    @property
+    def rate(self) -> float:
+        return self._callmethod("__getattribute__", ("rate",))
+
+    @property
+    def is_unlimited(self) -> bool:
+        return self._callmethod("__getattribute__", ("is_unlimited",))
+
+
+class PoolManager(IdSetManager):
+    """Hosts the known ids and the rate limiter all workers share."""
+
+
+PoolManager.register("AdaptiveRateLimiter", AdaptiveRateLimiter, RateLimiterProxy)
+
+
+def _next_product(task_queue) -> str | None:
+    try:
+        return task_queue.get(timeout=1)
+    except queue.Empty:
+        return None
+
+
+def _worker_main(
+    worker_index: int,
+    task_queue,
+    pending,
+    known_ids,
+    rate_limiter,
+    results,
+    config,
+):
+    """
+    Entry point of a worker process: one MongoService, one browser, one queue consumer.
+
+    A worker takes product ids from the task queue and, while the queue is
+    empty, items from the crawl frontier, where it also pushes the
+    subcategories and products it finds. It stops once the queue is drained and
+    no frontier item is pending or in progress at another worker, which could
+    still push new ones.
+
+    Each worker uses its own remote debugging and selenium-wire proxy port so
+    several browsers can run side by side.
+    """
+    yeeter = Yeeter(log_filename=f"scraper-worker-{worker_index}.log")
+    mongo_service = MongoService(config.mongo_uri, config.mongo_db_name, yeeter)
+    frontier = CrawlFrontier(mongo_service, collection=config.frontier_collection)
+    scraper_options = dict(config.scraper_options)
+    if scraper_options.get("profile_dir"):
+        # Chromium locks its profile, so every worker keeps its own.
+        scraper_options["profile_dir"] = os.path.join(
+            scraper_options["profile_dir"], f"worker-{worker_index}"
+        )
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=yeeter,
+        debugging_port=config.base_debugging_port + worker_index,
+        proxy_port=config.base_proxy_port + worker_index,
+        known_ids=known_ids,
+        rate_limiter=rate_limiter,
+        frontier=frontier,
+        max_category_depth=config.max_category_depth,
+        **scraper_options,
+    )
+    processed = 0
+    idle_since = None
+    try:
+        while True:
+            migros_id = _next_product(task_queue)
+            if migros_id is not None:
+                try:
+                    scraper.scrape_product_by_id(migros_id)
+                    processed += 1
+                finally:
+                    with pending.get_lock():
+                        pending.value -= 1
+                idle_since = None
+                continue
+            if scraper.run_frontier_item():
+                processed += 1
+                idle_since = None
+                continue
+            if pending.value == 0 and frontier.in_progress_count() == 0:
+                break
+            idle_since = idle_since or time.monotonic()
+            if time.monotonic() - idle_since > config.idle_timeout:
+                yeeter.error(f"Worker {worker_index} idle too long, stopping.")
+                break
+    except SystemExit as e:
+        yeeter.error(f"Worker {worker_index} stopped: {str(e)}")
+    finally:
+        results.put((worker_index, processed))
+        scraper.close()
+        mongo_service.close()
+
+
+class ScraperWorkerPool:
+    """
+    Runs N headless browsers, each in its own process, sharing one crawl.
+
+    Products to refresh are handed out through a queue. Categories, and the
+    products found on product cards, go through the same CrawlFrontier the
+    single-process crawl uses, so a killed pool run resumes like any other.
+    Known ids are shared between all workers, so a product found on a product
+    card is only fetched by the worker that claims it first. All workers send
+    their requests through one AdaptiveRateLimiter in the manager process, so
+    N browsers together keep the request rate of one scraper.
+    """
+
+    def __init__(
+        self,
+        config: WorkerConfig,
+        yeeter: Yeeter,
+        workers: int = 4,
+    ):
+        self.config = config
+        self.yeeter = yeeter
+        self.workers = workers
+        # Workers build their own MongoClient and browser, so do not fork them.
+        self.context = multiprocessing.get_context("spawn")
+
+    def _shared_rate_limiter(self, manager: PoolManager, state: dict | None):
+        """
+        Creates the rate limiter of all workers in the manager process.
+
+        It starts like MigrosScraper._load_rate_limiter, at one request per
+        `average_request_sleep_time` seconds (divided among the shards), or at
+        the given saved state.
+
+        Returns:
+            RateLimiterProxy: The shared limiter, or None if requests are not paced.
+        """
+        sleep_time = self.config.scraper_options.get("average_request_sleep_time", 4.0)
+        if sleep_time <= 0:
+            return None
+        shard = Shard.of(self.config.scraper_options.get("shard"))
+        share = shard.count if shard else 1
+        rate_limiter = manager.AdaptiveRateLimiter(
+            rate=1 / (sleep_time * share), max_rate=1.0 / share
+        )
+        if state:
+            rate_limiter.restore(state)
+        return rate_limiter
+
+    def run(
+        self,
+        known_ids: KnownIdSet | list[str] | None,
+        product_ids: list[str] = (),
+        rate_limiter_state: dict = None,
+    ) -> dict[int, int]:
+        """
+        Scrapes the given products and the pending crawl frontier with all workers.
+
+        Args:
+            known_ids (KnownIdSet | list[str] | None): Ids already in the database, used
+                for discovery dedup. None if the workers dedup through the known id
+                filter instead.
+            product_ids (list[str]): Products to refresh.
+            rate_limiter_state (dict, optional): State of the main scraper's rate
+                limiter, the shared limiter continues from it.
+
+        Returns:
+            dict[int, int]: Number of products and frontier items processed per worker index.
+        """
+        with PoolManager(ctx=self.context) as manager:
+            shared_ids = (
+                SharedIdSet(manager, known_ids) if known_ids is not None else None
+            )
+            rate_limiter = self._shared_rate_limiter(manager, rate_limiter_state)
+            task_queue = self.context.Queue()
+            pending = self.context.Value("i", 0)
+            results = self.context.Queue()
+
+            for migros_id in product_ids:
+                pending.value += 1
+                task_queue.put(migros_id)
+            self.yeeter.yeet(
+                f"Starting {self.workers} workers for {pending.value} products "
+                f"and the crawl frontier."
+            )
+
+            processes = [
+                self.context.Process(
+                    target=_worker_main,
+                    args=(
+                        index,
+                        task_queue,
+                        pending,
+                        shared_ids,
+                        rate_limiter,
+                        results,
+                        self.config,
+                    ),
+                    name=f"scraper-worker-{index}",
+                )
+                for index in range(self.workers)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+            processed = {}
+            while not results.empty():
+                worker_index, count = results.get()
+                processed[worker_index] = count
+            self.yeeter.yeet(f"Worker pool finished, tasks per worker: {processed}")
+            return processed
@@ -0,0 +1,108 @@
+import copy
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.services.migros_api import MigrosApiClient
+from src.utils.replay_driver import ReplayCorpus
+from src.utils.yeeter import Yeeter
+from tests.data.base_categories import base_categories
+from tests.data.higher_level_categories import higher_level_categories
+from tests.data.oliveoil import oliveoil
+
+GUEST_TOKEN = "test-guest-token"
+# insert_product adds _id and dateAdded to the dict it is given, keep a clean copy.
+PRODUCT = copy.deepcopy(oliveoil)
+CATEGORIES = ReplayCorpus(base_categories, higher_level_categories, [])
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves canned Migros API responses for the direct fetch mode."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_product_detail(self, etag: bool):
+        """Answers with the product, honouring If-None-Match if etag is True."""
+        payload = json.dumps([PRODUCT]).encode("utf-8")
+        tag = '"' + hashlib.sha256(payload).hexdigest()[:16] + '"'
+        if etag and self.headers.get("If-None-Match") == tag:
+            self.send_response(304)
+            self.send_header("ETag", tag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(200, [PRODUCT], {"ETag": tag} if etag else None)
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        url = urlparse(self.path)
+        if url.path == MigrosApiClient.GUEST_TOKEN_PATH:
+            self._send_json(200, {}, {MigrosApiClient.TOKEN_HEADER: GUEST_TOKEN})
+        elif self.headers.get(MigrosApiClient.TOKEN_HEADER) != GUEST_TOKEN:
+            self._send_json(401, {"error": "missing token"})
+        elif url.path == MigrosApiClient.STOREMAP_PATH:
+            self._send_json(200, {"categories": CATEGORIES.base_categories})
+        elif url.path == MigrosApiClient.CATEGORY_PATH:
+            slug = parse_qs(url.query)["slug"][0]
+            self._send_json(200, CATEGORIES.category(slug))
+        elif url.path == MigrosApiClient.PRODUCT_DETAIL_PATH:
+            migros_id = parse_qs(url.query)["migrosIds"][0]
+            if migros_id == PRODUCT["migrosId"]:
+                self._send_product_detail(etag=True)
+            elif migros_id == "no-etag":
+                self._send_product_detail(etag=False)
+            elif migros_id == "429":
+                self._send_json(429, {}, {"Retry-After": "7"})
+            else:
+                self._send_json(404, {"error": "not found"})
+        else:
+            self._send_json(404, {"error": "unknown endpoint"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        ids = body["productFilter"]["migrosIds"]
+        cards = [
+            {"migrosId": PRODUCT["migrosId"], "offer": PRODUCT["offer"]}
+            for migros_id in ids
+            if migros_id == PRODUCT["migrosId"]
+        ]
+        self._send_json(200, cards)
+
+
+@pytest.fixture(scope="module")
+def stand_in_server():
+    """Runs a local stand-in for the Migros API on a free port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.connections = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api_client(stand_in_server):
+    """Provides a MigrosApiClient pointed at the stand-in server."""
+    host, port = stand_in_server.server_address
+    client = MigrosApiClient(Yeeter(), base_url=f"http://{host}:{port}", max_retries=0)
+    yield client
+    client.close()
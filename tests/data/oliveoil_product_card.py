@@ -0,0 +1,35 @@
+# The olive oil as a product-cards (v3) response lists it, with the same prices
+# as the product-detail response in oliveoil.py.
+oliveoil_product_card = {
+    "uid": 100032983,
+    "migrosId": "103302600000",
+    "migrosOnlineId": "4139848",
+    "name": "olive oil",
+    "brand": "M-Budget",
+    "versioning": "Virgin",
+    "title": "M-Budget · olive oil · Virgin",
+    "productRange": "STANDARD",
+    "productAvailability": "ONLINE_AND_INSTORE",
+    "images": [
+        {
+            "url": "https://image.migros.ch/{stack}/f1b9a9d6ee4bfa6d2f4b8cbb3b6a4e53b2d69b3a/m-budget-olive-oil-virgin.jpg",
+            "cdn": "migros",
+        }
+    ],
+    "offer": {
+        "price": {
+            "advertisedValue": 10,
+            "advertisedDisplayValue": "10.–",
+            "effectiveValue": 10,
+            "effectiveDisplayValue": "10.–",
+            "unitPrice": {"value": 1, "unit": "100ml"},
+        },
+        "quantity": "1 l",
+        "quantityPrice": "1.–/100ml",
+        "isVariableWeight": False,
+        "displayPrice": True,
+        "type": "STANDARD",
+        "badges": [],
+    },
+    "productUrls": "https://www.migros.ch/en/product/103302600000",
+}
@@ -0,0 +1,78 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.blocking_profile import BLOCKING_PROFILES, BlockingProfile
+
+lean = BLOCKING_PROFILES["lean"]
+
+
+@pytest.mark.parametrize(
+    "url, blocked",
+    [
+        ("https://www.migros.ch/en/product/100100300000", False),
+        (
+            "https://www.migros.ch/product-display/public/v2/product-detail?migrosIds=1",
+            False,
+        ),
+        ("https://www.migros.ch/static/main.css", True),
+        ("https://www.migros.ch/static/font.woff2", True),
+        ("https://www.migros.ch/static/logo.SVG", True),
+        (
+            "https://www-leshop-ch-cld-res.cloudinary.com/image/upload/v1/labels/fresh",
+            True,
+        ),
+        ("https://www.googletagmanager.com/gtm.js?id=GTM-1", True),
+        ("https://notgoogletagmanager.com/gtm.js", False),
+    ],
+)
+def test_should_block(url, blocked):
+    """Test that only non-essential resources and tracker hosts are blocked."""
+    assert lean.should_block(url) == blocked
+
+
+def test_capture_scopes_only_match_api_hosts():
+    """Test that the capture scope covers migros.ch and its subdomains only."""
+    scopes = [re.compile(scope) for scope in lean.capture_scopes()]
+
+    def in_scope(url):
+        return any(scope.search(url) for scope in scopes)
+
+    assert in_scope("https://www.migros.ch/product-display/public/v3/product-cards")
+    assert in_scope("https://migros.ch/en/")
+    assert not in_scope("https://www.google-analytics.com/collect?u=migros.ch/")
+    assert not in_scope("https://evilmigros.ch/")
+
+
+def test_request_interceptor_aborts_blocked_requests():
+    """Test that the proxy-side interceptor aborts blocked requests only."""
+    aborted = []
+
+    def make_request(url):
+        return SimpleNamespace(url=url, abort=lambda: aborted.append(url))
+
+    lean.request_interceptor(make_request("https://www.migros.ch/img/a.png"))
+    lean.request_interceptor(make_request("https://www.migros.ch/en/"))
+    assert aborted == ["https://www.migros.ch/img/a.png"]
+
+
+def test_off_profile_changes_nothing():
+    """Test that the off profile neither blocks nor narrows the capture scope."""
+    off = BLOCKING_PROFILES["off"]
+    assert not off.should_block("https://www.migros.ch/static/main.css")
+    assert off.capture_scopes() == []
+    assert off.blocked_url_patterns() == []
+
+
+def test_blocked_url_patterns_cover_hosts_and_extensions():
+    """Test the CDP patterns generated for a small profile."""
+    profile = BlockingProfile(
+        name="small", blocked_extensions=(".png",), blocked_hosts=("ads.com",)
+    )
+    assert profile.blocked_url_patterns() == [
+        "*.png",
+        "*.png?*",
+        "*://ads.com/*",
+        "*://*.ads.com/*",
+    ]
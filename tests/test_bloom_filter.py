@@ -0,0 +1,55 @@
+import pytest
+
+from src.utils.bloom_filter import BloomFilter
+
+
+def test_added_items_are_found():
+    bloom = BloomFilter(1000, 0.01)
+    ids = [str(100000000 + i) for i in range(1000)]
+    bloom.update(ids)
+
+    assert all(migros_id in bloom for migros_id in ids)
+    assert len(bloom) <= 1000
+    assert not bloom.is_full
+
+
+def test_false_positive_rate_is_near_the_target():
+    bloom = BloomFilter(10000, 0.01)
+    bloom.update(str(i) for i in range(10000))
+
+    false_positives = sum(str(i) in bloom for i in range(10000, 30000))
+
+    assert false_positives / 20000 < 0.02
+
+
+def test_add_reports_new_items():
+    bloom = BloomFilter(100)
+
+    assert bloom.add("42") is True
+    assert bloom.add("42") is False
+    assert len(bloom) == 1
+    assert None not in bloom
+
+
+def test_round_trip_through_bytes():
+    bloom = BloomFilter(100)
+    bloom.update(["1", "2"])
+
+    restored = BloomFilter.from_bytes(bloom.to_bytes(), 100, bloom.error_rate, 2)
+
+    assert "1" in restored and "2" in restored
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(b"\0", 100, bloom.error_rate, 0)
+
+
+def test_union():
+    first, second = BloomFilter(100), BloomFilter(100)
+    first.update(["1", "2"])
+    second.update(["2", "3"])
+
+    first.union(second)
+
+    assert all(migros_id in first for migros_id in ("1", "2", "3"))
+    assert 3 <= len(first) <= 4
+    with pytest.raises(ValueError):
+        first.union(BloomFilter(1000))
@@ -0,0 +1,25 @@
+import pytest
+
+from src.utils.capture_policy import CAPTURE_POLICIES, CapturePolicy
+
+
+def test_memory_storage_is_bounded():
+    options = CAPTURE_POLICIES["bounded"].seleniumwire_options()
+    assert options["request_storage"] == "memory"
+    assert options["request_storage_max_size"] == 500
+
+
+def test_disk_storage_options():
+    assert CAPTURE_POLICIES["disk"].seleniumwire_options() == {}
+    policy = CapturePolicy(name="tmp", storage="disk", storage_dir="/tmp/capture")
+    assert policy.seleniumwire_options() == {"request_storage_base_dir": "/tmp/capture"}
+
+
+def test_cdp_buffers_follow_body_limit():
+    params = CapturePolicy(name="small", max_body_bytes=1000).cdp_network_params()
+    assert params == {"maxResourceBufferSize": 1000, "maxTotalBufferSize": 4000}
+
+
+def test_unknown_storage():
+    with pytest.raises(ValueError):
+        CapturePolicy(name="broken", storage="cloud")
@@ -0,0 +1,112 @@
+import base64
+import json
+
+from selenium.common.exceptions import WebDriverException
+
+from src.utils.cdp_capture import CdpCapture
+from src.utils.response_mailbox import ResponseMailbox
+
+FRAGMENTS = ("product-detail", "product-cards")
+
+
+class FakeCdpDriver:
+    """Serves performance log entries and response bodies like chromedriver does."""
+
+    def __init__(self):
+        self.log = []
+        self.bodies = {}
+        self.commands = []
+
+    def event(self, method: str, **params):
+        message = {"message": {"method": method, "params": params}}
+        self.log.append({"message": json.dumps(message)})
+
+    def response(self, request_id, url, status=200, headers=None, type="XHR"):
+        self.event(
+            "Network.responseReceived",
+            requestId=request_id,
+            type=type,
+            response={"url": url, "status": status, "headers": headers or {}},
+        )
+
+    def get_log(self, name: str) -> list:
+        entries, self.log = self.log, []
+        return entries
+
+    def execute_cdp_cmd(self, cmd: str, params: dict) -> dict:
+        self.commands.append(cmd)
+        if cmd == "Network.getResponseBody":
+            if params["requestId"] not in self.bodies:
+                raise WebDriverException("No resource with given identifier found")
+            return self.bodies[params["requestId"]]
+        return {}
+
+
+def make_capture():
+    driver = FakeCdpDriver()
+    mailbox = ResponseMailbox(FRAGMENTS)
+    capture = CdpCapture(driver, mailbox)
+    capture.install()
+    return driver, mailbox, capture
+
+
+def test_finished_response_is_delivered():
+    """Test that a watched response is filed with its body once loading finished."""
+    driver, mailbox, _ = make_capture()
+    driver.response(
+        "1", "https://x/product-detail?migrosIds=1", headers={"content-encoding": "br"}
+    )
+    driver.bodies["1"] = {"body": "[1]", "base64Encoded": False}
+    assert mailbox.wait_for("product-detail", timeout=0) is None
+
+    driver.event("Network.loadingFinished", requestId="1")
+    captured = mailbox.wait_for("product-detail", timeout=1)
+    assert captured.body == b"[1]"
+    # Chrome already decompressed the body.
+    assert "Content-Encoding" not in captured.headers
+    assert captured.json(lambda body, encoding: body) == [1]
+
+
+def test_base64_body_and_unwatched_urls():
+    driver, mailbox, capture = make_capture()
+    driver.response("1", "https://x/product-cards")
+    driver.response("2", "https://x/logo.png")
+    driver.bodies["1"] = {
+        "body": base64.b64encode(b"[]").decode(),
+        "base64Encoded": True,
+    }
+    driver.event("Network.loadingFinished", requestId="1")
+    driver.event("Network.loadingFinished", requestId="2")
+    assert capture.poll() == 1
+    assert mailbox.wait_for("product-cards", timeout=0).body == b"[]"
+    assert driver.commands.count("Network.getResponseBody") == 1
+
+
+def test_document_response_and_failed_requests():
+    """Test that the page document is filed without fetching its body."""
+    driver, mailbox, capture = make_capture()
+    mailbox.reset("https://x/en/product/1")
+    driver.response(
+        "doc",
+        "https://x/en/product/1",
+        status=429,
+        headers={"Retry-After": "5"},
+        type="Document",
+    )
+    driver.response("2", "https://x/product-detail?migrosIds=1")
+    driver.event("Network.loadingFinished", requestId="doc")
+    driver.event("Network.loadingFailed", requestId="2")
+    driver.event("Network.loadingFinished", requestId="2")
+    [page] = mailbox.page_responses()
+    assert page.status_code == 429
+    assert page.headers.get("retry-after") == "5"
+    assert "Network.getResponseBody" not in driver.commands
+    assert mailbox.wait_for("product-detail", timeout=0) is None
+
+
+def test_clear_drops_earlier_events():
+    driver, mailbox, capture = make_capture()
+    driver.response("1", "https://x/product-detail")
+    capture.clear()
+    driver.event("Network.loadingFinished", requestId="1")
+    assert capture.poll() == 0
@@ -0,0 +1,114 @@
+import pytest
+
+from src.services.crawl_frontier import CrawlFrontier
+from src.services.mongo_service import MongoService
+from src.utils.yeeter import Yeeter
+
+
+@pytest.fixture(scope="function")
+def frontier():
+    """
+    Pytest fixture that provides a CrawlFrontier on the test database.
+    Clears the frontier before each test.
+
+    Yields:
+        CrawlFrontier: A frontier with max_attempts=2.
+    """
+    mongo_service = MongoService(
+        uri="mongodb://test_mongo:27017", db_name="testdb", yeeter=Yeeter()
+    )
+    frontier = CrawlFrontier(mongo_service, max_attempts=2)
+    frontier.clear()
+
+    yield frontier
+
+    frontier.clear()
+    mongo_service.close()
+
+
+def test_push_ignores_duplicates(frontier: CrawlFrontier):
+    """Test that an item is only added once per kind and key."""
+    assert frontier.push(CrawlFrontier.PRODUCT, "100") is True
+    assert frontier.push(CrawlFrontier.PRODUCT, "100") is False
+    assert frontier.push(CrawlFrontier.CATEGORY, "100") is True
+    assert frontier.pending_count() == 2
+
+
+def test_pop_returns_highest_priority_first(frontier: CrawlFrontier):
+    """Test that pop orders by priority, then by insertion time."""
+    frontier.push(CrawlFrontier.CATEGORY, "category/a", payload={"depth": 0})
+    frontier.push(CrawlFrontier.PRODUCT, "1", priority=1)
+    frontier.push(CrawlFrontier.CATEGORY, "category/b")
+
+    keys = [frontier.pop()["key"] for _ in range(3)]
+
+    assert keys == ["1", "category/a", "category/b"]
+    assert frontier.pop() is None
+
+
+def test_pop_marks_item_in_progress(frontier: CrawlFrontier):
+    """Test that a popped item is no longer pending and counts an attempt."""
+    frontier.push(CrawlFrontier.PRODUCT, "1", payload={"source": "card"})
+
+    item = frontier.pop()
+
+    assert item["status"] == "in_progress"
+    assert item["attempts"] == 1
+    assert item["payload"] == {"source": "card"}
+    assert frontier.pending_count() == 0
+
+
+def test_complete_marks_item_done(frontier: CrawlFrontier):
+    frontier.push(CrawlFrontier.PRODUCT, "1")
+    item = frontier.pop()
+
+    frontier.complete(item)
+
+    assert frontier.collection.find_one({"_id": item["_id"]})["status"] == "done"
+    assert frontier.pop() is None
+
+
+def test_done_items_expire(frontier: CrawlFrontier):
+    """Test that done items are removed by a TTL index on finishedAt."""
+    indexes = frontier.collection.index_information()
+    [ttl] = [index for index in indexes.values() if "expireAfterSeconds" in index]
+
+    assert ttl["key"] == [("finishedAt", 1)]
+    assert ttl["expireAfterSeconds"] == 7 * 86400
+
+
+def test_fail_retries_until_max_attempts(frontier: CrawlFrontier):
+    """Test that a failed item is retried and marked failed after max_attempts."""
+    frontier.push(CrawlFrontier.PRODUCT, "1")
+
+    frontier.fail(frontier.pop(), "timeout")
+    assert frontier.pending_count() == 1
+
+    item = frontier.pop()
+    frontier.fail(item, "timeout again")
+
+    stored = frontier.collection.find_one({"_id": item["_id"]})
+    assert stored["status"] == "failed"
+    assert stored["lastError"] == "timeout again"
+    assert frontier.pop() is None
+
+
+def test_resume_requeues_interrupted_items(frontier: CrawlFrontier):
+    """Test that items left in progress by a killed run are pending again."""
+    frontier.push(CrawlFrontier.PRODUCT, "1")
+    frontier.push(CrawlFrontier.PRODUCT, "2")
+    frontier.pop()
+
+    assert frontier.resume() == 2
+    assert {frontier.pop()["key"], frontier.pop()["key"]} == {"1", "2"}
+
+
+def test_resume_gives_up_on_items_interrupted_too_often(frontier: CrawlFrontier):
+    """Test that an item that was in progress in every killed run is not retried forever."""
+    frontier.push(CrawlFrontier.PRODUCT, "1")
+    frontier.pop()
+    frontier.resume()
+    item = frontier.pop()
+
+    assert frontier.resume() == 0
+    assert frontier.collection.find_one({"_id": item["_id"]})["status"] == "failed"
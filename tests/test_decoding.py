@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import zlib
+
+import brotli
+import pytest
+
+from src.utils import decoding
+from src.utils.decoding import DecodingError
+
+with open(
+    os.path.join(os.path.dirname(__file__), "data", "100035819.json"), "rb"
+) as file:
+    PAYLOAD = file.read()
+
+
+def raw_deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+@pytest.mark.parametrize(
+    "encoding, body",
+    [
+        ("", PAYLOAD),
+        ("identity", PAYLOAD),
+        ("gzip", gzip.compress(PAYLOAD)),
+        ("GZIP", gzip.compress(PAYLOAD)),
+        ("deflate", zlib.compress(PAYLOAD)),
+        ("deflate", raw_deflate(PAYLOAD)),
+        ("br", brotli.compress(PAYLOAD)),
+        ("gzip, br", brotli.compress(gzip.compress(PAYLOAD))),
+    ],
+)
+def test_decompress(encoding: str, body: bytes):
+    """Test that every supported Content-Encoding gives back the original body."""
+    assert decoding.decompress(body, encoding) == PAYLOAD
+
+
+def test_decompress_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    body = zstandard.ZstdCompressor().compress(PAYLOAD)
+    assert decoding.decompress(body, "zstd") == PAYLOAD
+
+
+@pytest.mark.parametrize(
+    "encoding, compress",
+    [("gzip", gzip.compress), ("br", brotli.compress), ("deflate", raw_deflate)],
+)
+def test_decompress_chunks(encoding: str, compress):
+    """Test that a body fed in small pieces decodes like the complete body."""
+    body = compress(PAYLOAD)
+    chunks = [body[i : i + 100] for i in range(0, len(body), 100)]
+    assert decoding.decompress_chunks(chunks, encoding) == PAYLOAD
+
+
+def test_decompress_corrupt_body():
+    with pytest.raises(DecodingError):
+        decoding.decompress(b"not gzip at all", "gzip")
+
+
+def test_decompress_unknown_encoding_returns_the_body():
+    assert decoding.decompress(PAYLOAD, "compress") == PAYLOAD
+    assert decoding.decode_json(PAYLOAD, "x-unknown") == json.loads(PAYLOAD)
+
+
+def test_decode_json():
+    assert decoding.decode_json(gzip.compress(PAYLOAD), "gzip") == json.loads(PAYLOAD)
+
+
+def test_loads_without_orjson(monkeypatch):
+    """Test that the stdlib fallback parses bytes to the same result."""
+    expected = decoding.loads(PAYLOAD)
+    monkeypatch.setattr(decoding, "orjson", None)
+    assert decoding.loads(PAYLOAD) == expected
+
+
+def test_loads_invalid_json():
+    with pytest.raises(json.JSONDecodeError):
+        decoding.loads(b"{not json")
@@ -0,0 +1,171 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.services.job_queue import JobQueue
+from src.services.mongo_service import MongoService
+from src.utils.yeeter import Yeeter
+
+
+@pytest.fixture(scope="function")
+def mongo_service():
+    """
+    Pytest fixture that provides a MongoService on the test database.
+    Clears the job collections before and after each test.
+
+    Yields:
+        MongoService: An instance of the MongoService class.
+    """
+    mongo_service = MongoService(
+        uri="mongodb://test_mongo:27017", db_name="testdb", yeeter=Yeeter()
+    )
+    mongo_service.db.jobs.delete_many({})
+    mongo_service.db.dead_jobs.delete_many({})
+
+    yield mongo_service
+
+    mongo_service.db.jobs.delete_many({})
+    mongo_service.db.dead_jobs.delete_many({})
+    mongo_service.close()
+
+
+def make_queue(mongo_service: MongoService, worker_id: str, **kwargs) -> JobQueue:
+    return JobQueue(
+        mongo_service, "refresh", worker_id=worker_id, retry_delay=0, **kwargs
+    )
+
+
+def expire_leases(mongo_service: MongoService) -> None:
+    mongo_service.db.jobs.update_many(
+        {"status": JobQueue.LEASED},
+        {"$set": {"leaseExpiresAt": datetime.now(timezone.utc) - timedelta(seconds=1)}},
+    )
+
+
+def test_enqueue_ignores_open_jobs(mongo_service: MongoService):
+    """Test that a key is only queued once while it is pending or leased."""
+    queue = make_queue(mongo_service, "a")
+
+    assert queue.enqueue_many(["1", "2", "1"]) == 2
+    assert queue.enqueue("1") is False
+    assert queue.counts() == {"pending": 2, "leased": 0, "done": 0, "dead": 0}
+
+
+def test_claim_is_exclusive(mongo_service: MongoService):
+    """Test that two workers never claim the same job."""
+    first, second = make_queue(mongo_service, "a"), make_queue(mongo_service, "b")
+    first.enqueue_many(["1", "2"])
+
+    claimed = [first.claim(), second.claim()]
+
+    assert {job["key"] for job in claimed} == {"1", "2"}
+    assert {job["leaseOwner"] for job in claimed} == {"a", "b"}
+    assert first.claim() is None
+
+
+def test_claim_orders_by_priority(mongo_service: MongoService):
+    """Test that jobs with a higher priority are claimed first."""
+    queue = make_queue(mongo_service, "a")
+    queue.enqueue("1")
+    queue.enqueue("2", priority=5)
+
+    assert queue.claim()["key"] == "2"
+
+
+def test_complete_and_reopen(mongo_service: MongoService):
+    """Test that a done job is reopened by the next enqueue."""
+    queue = make_queue(mongo_service, "a")
+    queue.enqueue("1")
+
+    assert queue.complete(queue.claim()) is True
+    assert queue.counts()["done"] == 1
+    assert queue.enqueue("1") is True
+    assert queue.claim()["attempts"] == 1
+
+
+def test_expired_lease_is_reclaimed(mongo_service: MongoService):
+    """Test that the job of a dead worker goes to another worker after its lease expires."""
+    first, second = make_queue(mongo_service, "a"), make_queue(mongo_service, "b")
+    first.enqueue("1")
+    job = first.claim()
+    assert second.claim() is None
+
+    expire_leases(mongo_service)
+    reclaimed = second.claim()
+
+    assert reclaimed["leaseOwner"] == "b"
+    assert reclaimed["attempts"] == 2
+    assert first.heartbeat(job) is False
+    assert first.complete(job) is False
+    assert second.heartbeat(reclaimed) is True
+
+
+def test_failed_jobs_are_retried_then_dead_lettered(mongo_service: MongoService):
+    """Test that a job is retried until max_attempts and then moved to dead_jobs."""
+    queue = make_queue(mongo_service, "a", max_attempts=2)
+    queue.enqueue("1")
+
+    queue.fail(queue.claim(), "timeout")
+    job = queue.claim()
+    assert job["lastError"] == "timeout"
+    queue.fail(job, "timeout again")
+
+    assert queue.claim() is None
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 0, "dead": 1}
+    dead = mongo_service.db.dead_jobs.find_one({"key": "1"})
+    assert dead["lastError"] == "timeout again"
+
+    assert queue.requeue_dead() == 1
+    assert queue.counts()["pending"] == 1
+
+
+def test_retry_waits_for_the_backoff(mongo_service: MongoService):
+    """Test that a failed job is not claimable before its retry delay passed."""
+    queue = JobQueue(mongo_service, "refresh", retry_delay=60)
+    queue.enqueue("1")
+
+    queue.fail(queue.claim(), "timeout")
+
+    assert queue.claim() is None
+
+
+def test_lease_expiring_on_the_last_attempt_dead_letters(mongo_service: MongoService):
+    """Test that a job whose worker keeps dying is not handed out forever."""
+    queue = make_queue(mongo_service, "a", max_attempts=1)
+    queue.enqueue("1")
+    queue.claim()
+
+    expire_leases(mongo_service)
+
+    assert queue.claim() is None
+    assert queue.counts()["dead"] == 1
+
+
+def test_process(mongo_service: MongoService):
+    """Test that process runs every job and fails those whose handler raises."""
+    queue = make_queue(mongo_service, "a", max_attempts=1)
+    queue.enqueue_many(["1", "2", "3"])
+    handled = []
+
+    def handler(key):
+        handled.append(key)
+        if key == "2":
+            raise ValueError("broken product")
+
+    assert queue.process(handler) == 2
+    assert sorted(handled) == ["1", "2", "3"]
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 2, "dead": 1}
+
+
+def test_keep_alive_renews_the_lease(mongo_service: MongoService):
+    """Test that the lease is extended while a job runs."""
+    queue = make_queue(mongo_service, "a", lease_seconds=0.3)
+    queue.enqueue("1")
+    job = queue.claim()
+
+    with queue.keep_alive(job):
+        time.sleep(0.5)
+        assert make_queue(mongo_service, "b").claim() is None
+
+    assert queue.complete(job) is True
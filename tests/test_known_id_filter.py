@@ -0,0 +1,42 @@
+import pytest
+
+from src.services.mongo_service import MongoService
+from src.utils.bloom_filter import BloomFilter
+from src.utils.known_id_filter import KnownIdFilter
+from src.utils.yeeter import Yeeter
+
+
+@pytest.fixture(scope="function")
+def mongo_service():
+    mongo_service = MongoService(
+        uri="mongodb://test_mongo:27017", db_name="testdb", yeeter=Yeeter()
+    )
+    mongo_service.db.known_ids.delete_many({})
+    mongo_service.db.known_id_filter.delete_many({})
+    mongo_service.db.migrations.delete_many({})
+    yield mongo_service
+    mongo_service.close()
+
+
+def test_known_confirms_filter_hits(mongo_service: MongoService):
+    mongo_service.add_known_id("100")
+    bloom = BloomFilter(1000)
+    # "200" is in the filter but not in MongoDB, like a false positive.
+    bloom.update(["100", "200"])
+    known_ids = KnownIdFilter(bloom, mongo_service)
+
+    assert known_ids.known(["100", "200", "300"]) == {"100"}
+    assert known_ids.confirmations == 2
+    assert known_ids.false_positives == 1
+    assert "100" in known_ids
+    assert "300" not in known_ids
+
+
+def test_claim_is_shared_between_filters(mongo_service: MongoService):
+    first = KnownIdFilter(BloomFilter(1000), mongo_service)
+    second = KnownIdFilter(BloomFilter(1000), mongo_service)
+
+    assert first.claim("100") is True
+    assert second.claim("100") is False
+    assert "100" in first.bloom and "100" in second.bloom
+    assert first.known(["100"]) == {"100"}
@@ -0,0 +1,41 @@
+from src.utils.known_id_set import KnownIdSet
+
+
+def test_contains_numeric_ids():
+    known_ids = KnownIdSet(["100200300", "42", "100200300"])
+
+    assert len(known_ids) == 2
+    assert "42" in known_ids
+    assert "100200300" in known_ids
+    assert "43" not in known_ids
+
+
+def test_non_numeric_ids_are_kept_as_strings():
+    known_ids = KnownIdSet(["042", "abc", "42"])
+
+    assert len(known_ids) == 3
+    assert "042" in known_ids
+    assert "abc" in known_ids
+    assert "42" in known_ids
+    assert "0042" not in known_ids
+    assert None not in known_ids
+
+
+def test_add_merges_into_sorted_array():
+    known_ids = KnownIdSet(["5", "1"], merge_threshold=2)
+
+    known_ids.add("3")
+    assert "3" in known_ids
+    known_ids.add("3")
+    known_ids.add("4")
+
+    assert len(known_ids) == 4
+    assert sorted(known_ids, key=int) == ["1", "3", "4", "5"]
+    assert known_ids.nbytes == 4 * 8
+
+
+def test_update():
+    known_ids = KnownIdSet()
+    known_ids.update(["7", "x", "7"])
+
+    assert set(known_ids) == {"7", "x"}
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from src.utils.memory import process_tree_rss_bytes, rss_bytes
+
+
+def test_rss_of_current_process():
+    assert rss_bytes() > 1024 * 1024
+    assert rss_bytes(os.getpid()) > 0
+
+
+def test_rss_of_missing_process():
+    assert rss_bytes(2**22 + 1) == 0
+
+
+def test_process_tree_includes_children():
+    """Test that the RSS of a child process is added to the tree total."""
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        own = rss_bytes()
+        assert process_tree_rss_bytes() > own
+    finally:
+        child.kill()
+        child.wait()
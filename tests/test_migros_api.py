@@ -0,0 +1,150 @@
+import pytest
+
+from src.services.migros_api import MigrosApiClient, MigrosApiError
+from src.services.response_archive import ResponseArchive
+from src.utils.yeeter import Yeeter
+from tests.data.oliveoil import oliveoil
+
+
+def test_request_without_token_is_rejected(api_client: MigrosApiClient):
+    """Test that the stand-in server rejects calls without a guest token."""
+    with pytest.raises(MigrosApiError) as error:
+        api_client.get_product_detail(oliveoil["migrosId"])
+    assert error.value.status_code == 401
+
+
+def test_refresh_guest_token(api_client: MigrosApiClient):
+    """Test that the guest token is fetched and attached to the session."""
+    assert not api_client.has_token
+    assert api_client.refresh_guest_token()
+    assert api_client.has_token
+
+
+def test_get_product_detail(api_client: MigrosApiClient):
+    """Test that product-detail is returned in the same shape as the browser response."""
+    api_client.refresh_guest_token()
+    product_data = api_client.get_product_detail(oliveoil["migrosId"])
+    assert isinstance(product_data, list)
+    assert product_data[0]["migrosId"] == oliveoil["migrosId"]
+    assert product_data[0]["offer"]["price"]["value"] == 10
+
+
+def test_get_product_detail_rate_limited(api_client: MigrosApiClient):
+    """Test that a 429 is surfaced together with its Retry-After value."""
+    api_client.refresh_guest_token()
+    with pytest.raises(MigrosApiError) as error:
+        api_client.get_product_detail("429")
+    assert error.value.status_code == 429
+    assert error.value.retry_after == 7
+
+
+def test_get_product_cards(api_client: MigrosApiClient):
+    """Test that product cards are fetched in bulk with a POST request."""
+    api_client.refresh_guest_token()
+    cards = api_client.get_product_cards([oliveoil["migrosId"], "000000000000"])
+    assert [card["migrosId"] for card in cards] == [oliveoil["migrosId"]]
+
+
+def test_get_storemap(api_client: MigrosApiClient):
+    """Test that the base categories are read from the storemap endpoint."""
+    api_client.refresh_guest_token()
+    storemap = api_client.get_storemap()
+    assert "fruits-vegetables" in [
+        category["slug"] for category in storemap["categories"]
+    ]
+
+
+def test_get_category(api_client: MigrosApiClient):
+    """Test that a category is returned with its descendants."""
+    api_client.refresh_guest_token()
+    category = api_client.get_category("meat-fish")
+    slugs = [subcategory["slug"] for subcategory in category["categories"]]
+    assert slugs[0] == "meat-fish"
+    assert "meat-poultry" in slugs
+
+
+def test_session_reuses_connection(api_client: MigrosApiClient, stand_in_server):
+    """Test that consecutive calls go over the same keep-alive connection."""
+    api_client.refresh_guest_token()
+    stand_in_server.connections.clear()
+    for _ in range(5):
+        api_client.get_product_detail(oliveoil["migrosId"])
+    assert len(stand_in_server.connections) == 1
+
+
+class ValidatorStore:
+    """In-memory stand-in for the response_validators methods of MongoService."""
+
+    def __init__(self):
+        self.validators = {}
+
+    def get_response_validator(self, url: str) -> dict:
+        return self.validators.get(url)
+
+    def save_response_validator(self, url, etag, last_modified, body_hash) -> None:
+        self.validators[url] = {
+            "etag": etag,
+            "lastModified": last_modified,
+            "bodyHash": body_hash,
+        }
+
+
+def test_get_product_detail_not_modified(api_client: MigrosApiClient):
+    """Test that a repeated fetch sends If-None-Match and returns None on a 304."""
+    api_client.refresh_guest_token()
+    api_client.validator_store = ValidatorStore()
+    first = api_client.get_product_detail(oliveoil["migrosId"])
+    assert first[0]["migrosId"] == oliveoil["migrosId"]
+    api_client.commit_product_detail(oliveoil["migrosId"])
+    [validator] = api_client.validator_store.validators.values()
+    assert validator["etag"]
+
+    assert api_client.get_product_detail(oliveoil["migrosId"]) is None
+
+
+def test_get_product_detail_identical_body(api_client: MigrosApiClient):
+    """Test that an unchanged body without ETag is recognised by its hash."""
+    api_client.refresh_guest_token()
+    api_client.validator_store = ValidatorStore()
+    assert (
+        api_client.get_product_detail("no-etag")[0]["migrosId"] == oliveoil["migrosId"]
+    )
+    api_client.commit_product_detail("no-etag")
+    assert api_client.get_product_detail("no-etag") is None
+
+
+def test_uncommitted_product_detail_is_fetched_again(api_client: MigrosApiClient):
+    """Test that a validator is only used once the caller committed it."""
+    api_client.refresh_guest_token()
+    api_client.validator_store = ValidatorStore()
+    api_client.get_product_detail(oliveoil["migrosId"])
+    assert api_client.validator_store.validators == {}
+    assert api_client.get_product_detail(oliveoil["migrosId"]) is not None
+
+
+def test_get_product_detail_changed_body(api_client: MigrosApiClient):
+    """Test that a body that differs from the stored hash is decoded again."""
+    api_client.refresh_guest_token()
+    api_client.validator_store = ValidatorStore()
+    api_client.get_product_detail("no-etag")
+    api_client.commit_product_detail("no-etag")
+    for validator in api_client.validator_store.validators.values():
+        validator["bodyHash"] = "outdated"
+    assert (
+        api_client.get_product_detail("no-etag")[0]["migrosId"] == oliveoil["migrosId"]
+    )
+
+
+def test_responses_are_archived(api_client: MigrosApiClient, tmp_path):
+    """Test that fetched bodies are appended to the response archive."""
+    api_client.refresh_guest_token()
+    api_client.archive = ResponseArchive(str(tmp_path))
+    api_client.get_product_detail(oliveoil["migrosId"])
+    api_client.get_product_cards([oliveoil["migrosId"]])
+    archived = list(api_client.archive.scan())
+    api_client.archive.close()
+    assert [(a.endpoint, a.migros_id) for a in archived] == [
+        ("product-detail", oliveoil["migrosId"]),
+        ("product-cards", ""),
+    ]
+    assert archived[0].body.startswith(b"[")
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -28,6 +30,10 @@ def scraper():
     mongo_service.db.categories.delete_many({})
     mongo_service.db.category_tracker.delete_many({})
     mongo_service.db.products.delete_many({})
+    mongo_service.db.latest_fingerprint.delete_many({})
+    mongo_service.db.known_ids.delete_many({})
+    mongo_service.db.known_id_filter.delete_many({})
+    mongo_service.db.migrations.delete_many({})
     mongo_service.db.unit_price_history.delete_many({})
     mongo_service.db.id_scraped_at.delete_many({})
     mongo_service.db.request_counts.delete_many({})
@@ -127,3 +133,15 @@ def test_handle_unexpected_error(scraper):
         scraper.make_request_and_validate(invalid_url)
     except SystemExit as e:
         assert "Scraper stopped" in str(e), "Unexpected error was not handled properly."
+
+
+def test_prepare_profile_dir(tmp_path):
+    """
+    Test that a restored profile loses its stale lock files and counts as warm.
+    """
+    profile_dir = tmp_path / "profile"
+    assert MigrosScraper._prepare_profile_dir(str(profile_dir)) is False
+    (profile_dir / "Default").mkdir()
+    os.symlink("other-host-1234", profile_dir / "SingletonLock")
+    assert MigrosScraper._prepare_profile_dir(str(profile_dir)) is True
+    assert not os.path.lexists(profile_dir / "SingletonLock")
@@ -1,15 +1,19 @@
+import copy
 from datetime import datetime, timedelta, timezone
 
 import pytest
 from pymongo import MongoClient
 
+from src.models.product_detail import ProductDetail
 from src.services.mongo_service import MongoService
+from src.utils.sharding import Shard
 from src.utils.yeeter import Yeeter
 from tests.data.base_categories import base_categories
 from tests.data.higher_level_categories import higher_level_categories
 from tests.data.koriander import koriander
 from tests.data.oliveoil import oliveoil
 from tests.data.oliveoil_offer_missing import oliveoil_offer_missing
+from tests.data.oliveoil_product_card import oliveoil_product_card
 from tests.data.oliveoil_price_change import oliveoil_price_change
 from tests.data.oliveoil_price_change_2 import oliveoil_price_change_2
 from tests.data.penne import penne
@@ -41,6 +45,10 @@ def mongo_service():
     mongo_service.db.categories.delete_many({})
     mongo_service.db.category_tracker.delete_many({})
     mongo_service.db.products.delete_many({})
+    mongo_service.db.latest_fingerprint.delete_many({})
+    mongo_service.db.known_ids.delete_many({})
+    mongo_service.db.known_id_filter.delete_many({})
+    mongo_service.db.migrations.delete_many({})
     mongo_service.db.unit_price_history.delete_many({})
     mongo_service.db.id_scraped_at.delete_many({})
     mongo_service.db.request_counts.delete_many({})
@@ -418,6 +426,54 @@ def test_get_oldest_scraped_category_mixed_unscraped(mongo_service: MongoService
     )  # This category has "2024-09-26"
     assert oldest_category["last_scraped"] == None
 
+
+def test_save_category_checkpoint_stores_children(mongo_service: MongoService):
+    """
+    Test case to verify that a checkpoint records the URL, children and scrape day of a node.
+    """
+    category_id = base_categories[0]["id"]
+    children = [{"id": 7494, "slug": "pasta"}, {"id": 7495, "slug": "rice"}]
+    mongo_service.save_category_checkpoint(
+        category_id, "https://www.migros.ch/en/category/food", children, "2024-09-29"
+    )
+    checkpoint = mongo_service.get_category_checkpoint(category_id)
+    assert checkpoint["url"] == "https://www.migros.ch/en/category/food"
+    assert checkpoint["children"] == children
+    assert checkpoint["last_scraped"] == "2024-09-29"
+
+
+def test_save_category_checkpoint_updates_tracked_category(
+    mongo_service: MongoService,
+):
+    """
+    Test case to verify that a checkpoint updates an existing category_tracker entry
+    instead of inserting a second one.
+    """
+    mongo_service.insert_new_base_categories([dict(base_categories[0])])
+    category_id = base_categories[0]["id"]
+    mongo_service.save_category_checkpoint(category_id, "url", [], "2024-09-29")
+    assert mongo_service.db.category_tracker.count_documents({"id": category_id}) == 1
+    assert mongo_service.get_unscraped_categories() == []
+
+
+def test_get_category_checkpoint_unknown_category(mongo_service: MongoService):
+    assert mongo_service.get_category_checkpoint(-1) is None
+
+
+def test_category_checkpoints_are_kept_per_shard(mongo_service: MongoService):
+    """Test that a shard does not see the checkpoint another shard or an unsharded run saved."""
+    category_id = base_categories[0]["id"]
+    children = [{"id": 1, "slug": "child"}]
+    mongo_service.save_category_checkpoint(
+        category_id, "url", children, "2024-09-29", shard=(0, 2)
+    )
+
+    assert mongo_service.get_category_checkpoint(category_id, (0, 2))["children"] == (
+        children
+    )
+    assert mongo_service.get_category_checkpoint(category_id, (1, 2)) is None
+    assert "children" not in mongo_service.get_category_checkpoint(category_id)
+
     # ----------------------------------------------
     #       products
     # ----------------------------------------------
@@ -479,7 +535,7 @@ def test_insert_product_with_same_price(mongo_service: MongoService, caplog):
     assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 1
     assert "New unit price detected" not in caplog.text
     assert (
-        f"Product with migrosId {migros_id} already exists with the same unitPrice"
+        f"Product with migrosId {migros_id} already exists with the same content"
         in caplog.text
     )
 
@@ -516,6 +572,171 @@ def test_insert_product_missing_offer(mongo_service: MongoService, caplog):
     assert "does not have an offer, skipping insertion." in caplog.text
 
 
+def test_insert_product_with_other_change(mongo_service: MongoService, caplog):
+    """Test case to verify that a changed name is stored as a new version without a price change entry."""
+    caplog.clear()
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    renamed = copy.deepcopy(oliveoil)
+    renamed.pop("_id", None)  # other tests insert the shared oliveoil dict
+    renamed["name"] = "Renamed olive oil"
+    mongo_service.insert_product(renamed)
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 2
+    assert mongo_service.db.unit_price_history.count_documents({}) == 0
+    latest = mongo_service.get_latest_product_entry_by_migros_id(migros_id)
+    assert latest["name"] == "Renamed olive oil"
+    assert "New unit price detected" not in caplog.text
+
+
+def test_insert_product_ignores_key_order(mongo_service: MongoService):
+    """Test case to verify that the fingerprint does not depend on the order of keys."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    reordered = dict(reversed(list(copy.deepcopy(oliveoil).items())))
+    mongo_service.insert_product(reordered)
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 1
+
+
+def test_insert_product_ignores_volatile_fields(mongo_service: MongoService):
+    """Test case to verify that stock and order limit changes do not create a new version."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    restocked = copy.deepcopy(oliveoil)
+    restocked.pop("_id", None)
+    restocked["productAvailability"] = "INSTORE"
+    restocked["offer"]["maxOrderableQuantityV2"] = 3
+    restocked["offer"]["isNewOffer"] = True
+    mongo_service.insert_product(restocked)
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 1
+
+
+def test_insert_product_sees_versions_of_other_processes(
+    mongo_service: MongoService,
+):
+    """Test case to verify that the comparison uses the version another scraper stored last."""
+    migros_id = oliveoil["migrosId"]
+    other = MongoService(
+        uri="mongodb://test_mongo:27017", db_name="testdb", yeeter=Yeeter()
+    )
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    other.insert_product(copy.deepcopy(oliveoil_price_change))
+    mongo_service.insert_product(copy.deepcopy(oliveoil_price_change))
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 2
+
+
+def test_insert_product_stores_latest_fingerprint(mongo_service: MongoService):
+    """Test case to verify that each version carries its fingerprint and the lookup points to the latest one."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    mongo_service.insert_product(copy.deepcopy(oliveoil_price_change))
+    latest = mongo_service.get_latest_product_entry_by_migros_id(migros_id)
+    lookup = mongo_service.db.latest_fingerprint.find_one({"migrosId": migros_id})
+    assert lookup["fingerprint"] == latest["fingerprint"]
+    assert mongo_service.db.latest_fingerprint.count_documents({}) == 1
+
+
+def test_insert_product_backfills_latest_fingerprint(mongo_service: MongoService):
+    """Test case to verify that products stored before the lookup existed are compared correctly."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.db.products.insert_one(copy.deepcopy(oliveoil))
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 1
+    assert mongo_service.db.latest_fingerprint.count_documents({}) == 1
+
+
+def test_refresh_prices_from_product_cards_price_change(mongo_service: MongoService):
+    """Test that a changed price on a product card creates a new version and logs the change."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    mongo_service.save_scraped_product_id(migros_id)
+    card = {"migrosId": migros_id, "offer": oliveoil_price_change["offer"]}
+
+    changes = mongo_service.refresh_prices_from_product_cards([card])
+
+    assert changes == 1
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 2
+    latest = mongo_service.get_latest_product_entry_by_migros_id(migros_id)
+    assert latest["offer"]["price"]["value"] == 12
+    assert latest["name"] == oliveoil["name"]
+    history = mongo_service.db.unit_price_history.find_one({"migrosId": migros_id})
+    assert history["newPrice"]["value"] == 12
+    scraped = mongo_service.db.id_scraped_at.find_one({"migrosId": migros_id})
+    assert scraped["priceCheckedAt"] >= scraped["lastScraped"]
+
+
+def test_refresh_prices_from_product_cards_keeps_last_scraped(
+    mongo_service: MongoService,
+):
+    """Test that a price check from product cards does not count as a full scrape."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    past = datetime.now(timezone.utc) - timedelta(days=10)
+    mongo_service.db.id_scraped_at.insert_one(
+        {"migrosId": migros_id, "lastScraped": past}
+    )
+    card = {"migrosId": migros_id, "offer": oliveoil["offer"]}
+
+    mongo_service.refresh_prices_from_product_cards([card])
+
+    scraped = mongo_service.db.id_scraped_at.find_one({"migrosId": migros_id})
+    assert "priceCheckedAt" in scraped
+    assert not mongo_service.is_product_scraped_last_24_hours(migros_id)
+
+
+def test_refresh_prices_from_product_cards_same_price(mongo_service: MongoService):
+    """Test that an unchanged price on a product card does not create a new version."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    card = {"migrosId": migros_id, "offer": oliveoil["offer"]}
+
+    assert mongo_service.refresh_prices_from_product_cards([card]) == 0
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 1
+    assert mongo_service.db.unit_price_history.count_documents({}) == 0
+
+
+def test_refresh_prices_from_unchanged_product_card(mongo_service: MongoService):
+    """Test that a product card of an unchanged product matches its product-detail version."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+
+    changes = mongo_service.refresh_prices_from_product_cards(
+        [copy.deepcopy(oliveoil_product_card)]
+    )
+
+    assert changes == 0
+    assert mongo_service.db.products.count_documents({"migrosId": migros_id}) == 1
+    assert mongo_service.db.unit_price_history.count_documents({}) == 0
+
+
+def test_refresh_prices_from_product_cards_copies_only_prices(
+    mongo_service: MongoService,
+):
+    """Test that a price change from a product card keeps the stored offer's other fields."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.insert_product(copy.deepcopy(oliveoil))
+    card = copy.deepcopy(oliveoil_product_card)
+    card["offer"]["price"]["effectiveValue"] = 12
+    card["offer"]["price"]["advertisedValue"] = 12
+
+    assert mongo_service.refresh_prices_from_product_cards([card]) == 1
+
+    latest = mongo_service.get_latest_product_entry_by_migros_id(migros_id)
+    assert latest["offer"]["price"] == card["offer"]["price"]
+    assert latest["offer"]["quantity"] == oliveoil["offer"]["quantity"]
+    assert latest["offer"]["channel"] == oliveoil["offer"]["channel"]
+    assert "badges" not in latest["offer"]
+
+
+def test_refresh_prices_from_product_cards_ignores_unknown(mongo_service: MongoService):
+    """Test that cards of unknown products or without offer are ignored."""
+    cards = [
+        {"migrosId": penne["migrosId"], "offer": penne["offer"]},
+        {"migrosId": oliveoil["migrosId"]},
+    ]
+    assert mongo_service.refresh_prices_from_product_cards(cards) == 0
+    assert mongo_service.db.products.count_documents({}) == 0
+
+
 import time
 
 
@@ -599,6 +820,149 @@ def test_get_all_known_migros_ids_multiple_instances_of_same_product(
     assert mongo_service.get_all_known_migros_ids() == [oliveoil["migrosId"]]
 
 
+def test_get_all_known_migros_ids_backfills_from_products(
+    mongo_service: MongoService,
+):
+    """Test that known migrosIds are backfilled from products stored before 'known_ids' existed."""
+    mongo_service.insert_product(oliveoil)
+    mongo_service.insert_product(oliveoil_price_change)
+    mongo_service.insert_product(penne)
+    mongo_service.db.known_ids.delete_many({})
+    mongo_service.db.known_id_filter.delete_many({})
+    mongo_service.db.migrations.delete_many({})
+
+    assert set(mongo_service.get_all_known_migros_ids()) == {
+        oliveoil["migrosId"],
+        penne["migrosId"],
+    }
+    assert mongo_service.db.known_ids.count_documents({}) == 2
+
+
+def test_backfill_known_ids_is_idempotent(mongo_service: MongoService):
+    """Test that a second backfill adds nothing."""
+    mongo_service.insert_product(oliveoil)
+    mongo_service.insert_product(penne)
+    mongo_service.db.known_ids.delete_many({})
+    mongo_service.db.known_id_filter.delete_many({})
+    mongo_service.db.migrations.delete_many({})
+
+    assert mongo_service.backfill_known_ids(batch_size=1) == 2
+    assert mongo_service.backfill_known_ids() == 0
+    assert mongo_service.db.known_ids.count_documents({}) == 2
+
+
+def test_backfill_is_not_skipped_by_early_claims(mongo_service: MongoService):
+    """Test that a claim made before the first load does not stop the backfill."""
+    mongo_service.insert_product(oliveoil)
+    mongo_service.db.known_ids.delete_many({})
+    mongo_service.db.migrations.delete_many({})
+    assert mongo_service.claim_known_id(penne["migrosId"]) is True
+
+    known_ids = mongo_service.load_known_id_set()
+
+    assert oliveoil["migrosId"] in known_ids
+    # An unfinished claim is not a stored product.
+    assert penne["migrosId"] not in known_ids
+    assert mongo_service.get_all_known_migros_ids() == [oliveoil["migrosId"]]
+
+
+def test_backfill_runs_once(mongo_service: MongoService):
+    """Test that the backfill is recorded and not repeated on every load."""
+    mongo_service.insert_product(oliveoil)
+    mongo_service.load_known_id_set()
+    mongo_service.db.known_ids.delete_many({})
+
+    assert len(mongo_service.load_known_id_set()) == 0
+
+
+def test_load_known_id_set(mongo_service: MongoService):
+    """Test that load_known_id_set returns every known migrosId."""
+    mongo_service.insert_product(oliveoil)
+    mongo_service.insert_product(koriander)
+
+    known_ids = mongo_service.load_known_id_set()
+
+    assert len(known_ids) == 2
+    assert oliveoil["migrosId"] in known_ids
+    assert koriander["migrosId"] in known_ids
+    assert penne["migrosId"] not in known_ids
+
+
+def test_claim_known_id(mongo_service: MongoService):
+    """Test that only the first claim of a new migrosId succeeds."""
+    mongo_service.insert_product(oliveoil)
+
+    assert mongo_service.claim_known_id(penne["migrosId"]) is True
+    assert mongo_service.claim_known_id(penne["migrosId"]) is False
+    assert mongo_service.claim_known_id(oliveoil["migrosId"]) is False
+
+
+def test_claim_known_id_takes_over_expired_claims(mongo_service: MongoService):
+    """Test that a claim whose product was never stored expires."""
+    mongo_service.db.known_ids.insert_one(
+        {
+            "_id": penne["migrosId"],
+            "claimedAt": datetime.now(timezone.utc) - timedelta(days=2),
+        }
+    )
+
+    assert mongo_service.find_known_ids([penne["migrosId"]]) == set()
+    assert mongo_service.claim_known_id(penne["migrosId"]) is True
+    assert mongo_service.find_known_ids([penne["migrosId"]]) == {penne["migrosId"]}
+
+
+def test_insert_product_completes_a_claim(mongo_service: MongoService):
+    """Test that storing a claimed product records when it was first seen."""
+    mongo_service.claim_known_id(oliveoil["migrosId"])
+    mongo_service.insert_product(oliveoil)
+
+    known = mongo_service.db.known_ids.find_one({"_id": oliveoil["migrosId"]})
+    assert isinstance(known["firstSeen"], datetime)
+
+
+def test_find_known_ids(mongo_service: MongoService):
+    """Test that find_known_ids returns only the known ids."""
+    mongo_service.insert_product(oliveoil)
+    mongo_service.insert_product(koriander)
+
+    assert mongo_service.find_known_ids([oliveoil["migrosId"], penne["migrosId"]]) == {
+        oliveoil["migrosId"]
+    }
+
+
+def test_load_known_id_filter_builds_a_snapshot(mongo_service: MongoService):
+    """Test that the known id filter is built from 'known_ids' and stored."""
+    mongo_service.insert_product(oliveoil)
+    mongo_service.insert_product(penne)
+
+    bloom = mongo_service.load_known_id_filter(min_capacity=1000)
+
+    assert oliveoil["migrosId"] in bloom
+    assert penne["migrosId"] in bloom
+    assert len(bloom) == 2
+    assert mongo_service.db.known_id_filter.count_documents({}) == 1
+    assert len(mongo_service.load_known_id_filter(min_capacity=1000)) == 2
+
+
+def test_save_known_id_filter_merges_concurrent_snapshots(
+    mongo_service: MongoService,
+):
+    """Test that filters saved by two processes are merged."""
+    first = mongo_service.load_known_id_filter(min_capacity=1000)
+    second = mongo_service.load_known_id_filter(min_capacity=1000)
+    first.add(oliveoil["migrosId"])
+    second.add(penne["migrosId"])
+
+    assert mongo_service.save_known_id_filter(first) is True
+    assert mongo_service.save_known_id_filter(second) is True
+
+    merged = mongo_service.load_known_id_filter(min_capacity=1000)
+    assert oliveoil["migrosId"] in merged
+    assert penne["migrosId"] in merged
+    snapshot = mongo_service.db.known_id_filter.find_one()
+    assert snapshot["version"] == 2
+
+
 def test_get_products_not_scraped_in_days_all_sraped_recently(
     mongo_service: MongoService,
 ):
@@ -655,6 +1019,34 @@ def test_get_products_not_scraped_in_days_mixed(mongo_service: MongoService):
     assert result == [migros_id_2]
 
 
+def test_get_products_not_scraped_in_days_by_shard(mongo_service: MongoService):
+    """Test that the shards split the products not scraped recently between them."""
+    past_date = datetime.now(timezone.utc) - timedelta(days=10)
+    ids = [str(100000000 + i) for i in range(20)]
+    for migros_id in ids[:10]:
+        mongo_service.save_scraped_product_id(migros_id)
+    mongo_service.db.id_scraped_at.update_many({}, {"$set": {"lastScraped": past_date}})
+    # Entries saved before sharding have no shard key yet.
+    mongo_service.db.id_scraped_at.insert_many(
+        [{"migrosId": migros_id, "lastScraped": past_date} for migros_id in ids[10:]]
+    )
+
+    shards = [
+        mongo_service.get_products_not_scraped_in_days(
+            days=7, limit=100, only_edible=False, shard=(index, 3)
+        )
+        for index in range(3)
+    ]
+
+    assert sorted(sum(shards, [])) == ids
+    assert all(
+        Shard(index, 3).owns(migros_id)
+        for index, shard in enumerate(shards)
+        for migros_id in shard
+    )
+    assert mongo_service.backfill_shard_keys() == 0
+
+
 def test_get_products_not_scraped_in_days_with_limit(mongo_service: MongoService):
     """Test that the limit parameter works correctly."""
     days = 7
@@ -764,6 +1156,19 @@ def test_is_product_scraped_last_24_h_scraped_different_day(
     assert not mongo_service.is_product_scraped_last_24_hours(migros_id)
 
 
+def test_is_product_scraped_within_hours(mongo_service: MongoService):
+    """Test that is_product_scraped_within_hours honours a window shorter than a day."""
+    migros_id = oliveoil["migrosId"]
+    mongo_service.db.id_scraped_at.insert_one(
+        {
+            "migrosId": migros_id,
+            "lastScraped": datetime.now(timezone.utc) - timedelta(hours=13),
+        }
+    )
+    assert mongo_service.is_product_scraped_last_24_hours(migros_id)
+    assert not mongo_service.is_product_scraped_within_hours(migros_id, 12)
+
+
 def test_retrieve_id_scraped_at_last_24_hours_no_entries(mongo_service: MongoService):
     """Test that retrieve_id_scraped_at_last_24_hours returns an empty list when there are no entries for the current date."""
     assert mongo_service.retrieve_id_scraped_at_last_24_hours() == []
@@ -852,3 +1257,50 @@ def test_increment_request_count_default_increment_no_entry(
     mongo_service.increment_request_count(current_date)
     result = mongo_service.get_request_count(current_date)
     assert result == 2
+
+    # ----------------------------------------------
+    #       rate_limiter_state
+    # ----------------------------------------------
+
+
+def test_get_rate_limiter_state_no_entry(mongo_service: MongoService):
+    """Test that None is returned for a rate limiter that was never saved."""
+    mongo_service.db.rate_limiter_state.delete_many({})
+    assert mongo_service.get_rate_limiter_state("migros") is None
+
+
+def test_save_rate_limiter_state_overwrites(mongo_service: MongoService):
+    """Test that saving twice keeps a single, updated state per limiter."""
+    mongo_service.db.rate_limiter_state.delete_many({})
+    mongo_service.save_rate_limiter_state("migros", {"rate": 0.5})
+    mongo_service.save_rate_limiter_state("migros", {"rate": 0.25})
+    state = mongo_service.get_rate_limiter_state("migros")
+    assert state["rate"] == 0.25
+    assert mongo_service.db.rate_limiter_state.count_documents({}) == 1
+
+
+def test_save_and_get_response_validator(mongo_service: MongoService):
+    """
+    Test that the validators of a response are stored per URL and overwritten on the next save.
+    """
+    url = "https://www.migros.ch/product-display/public/v2/product-detail?migrosIds=1"
+    mongo_service.db.response_validators.delete_many({})
+    assert mongo_service.get_response_validator(url) is None
+
+    mongo_service.save_response_validator(url, '"abc"', None, "hash-1")
+    mongo_service.save_response_validator(url, '"def"', "Mon, 30 Sep 2024", "hash-2")
+
+    validator = mongo_service.get_response_validator(url)
+    assert validator["etag"] == '"def"'
+    assert validator["lastModified"] == "Mon, 30 Sep 2024"
+    assert validator["bodyHash"] == "hash-2"
+    assert mongo_service.db.response_validators.count_documents({"url": url}) == 1
+
+
+def test_insert_product_from_product_detail(mongo_service: MongoService):
+    """Test that a decoded ProductDetail is stored as its original payload."""
+    detail = ProductDetail.from_json(copy.deepcopy(oliveoil), keep_raw=True)
+    mongo_service.insert_product(detail)
+    stored = mongo_service.get_latest_product_entry_by_migros_id(oliveoil["migrosId"])
+    assert stored["offer"] == oliveoil["offer"]
+    assert stored["productInformation"] == oliveoil["productInformation"]
@@ -0,0 +1,86 @@
+import copy
+
+import pytest
+
+from src.models.product_detail import ProductDetail, ProductDetailError
+from tests.data.koriander import koriander
+from tests.data.oliveoil import oliveoil
+
+
+def test_from_json_extracts_used_fields():
+    """Test that the struct holds the fields the SQL sync needs."""
+    detail = ProductDetail.from_json(oliveoil)
+    assert detail.migros_id == oliveoil["migrosId"]
+    assert detail.name == oliveoil["name"]
+    assert detail.offer.price.value == oliveoil["offer"]["price"]["value"]
+    assert detail.offer.quantity_price == oliveoil["offer"].get("quantityPrice")
+    assert detail.gtins == tuple(oliveoil["gtins"])
+
+
+def test_from_json_nutrients_table():
+    detail = ProductDetail.from_json(koriander)
+    table = koriander["productInformation"]["nutrientsInformation"]["nutrientsTable"]
+    assert detail.nutrients_table.headers == tuple(table["headers"])
+    assert detail.nutrients_table.rows[0] == (
+        table["rows"][0]["label"],
+        tuple(table["rows"][0]["values"]),
+    )
+
+
+def test_from_json_keeps_raw_payload_on_request():
+    assert ProductDetail.from_json(oliveoil).raw is None
+    assert ProductDetail.from_json(oliveoil, keep_raw=True).raw is oliveoil
+
+
+def test_product_detail_is_slotted():
+    """Test that the struct has no per-instance __dict__."""
+    detail = ProductDetail.from_json(oliveoil)
+    assert not hasattr(detail, "__dict__")
+    assert not hasattr(detail.offer, "__dict__")
+
+
+def test_from_json_without_offer_or_nutrients():
+    product = {"migrosId": "100000000000", "name": "Plain"}
+    detail = ProductDetail.from_json(product)
+    assert detail.offer is None
+    assert detail.nutrients_table is None
+    assert detail.gtins == ()
+
+
+def test_from_json_missing_migros_id():
+    product = copy.deepcopy(oliveoil)
+    del product["migrosId"]
+    with pytest.raises(ProductDetailError):
+        ProductDetail.from_json(product)
+
+
+@pytest.mark.parametrize(
+    "path, value, attribute",
+    [
+        (("offer",), "not an offer", lambda detail: detail.offer),
+        (("offer", "price", "value"), "12.–", lambda detail: detail.offer.price.value),
+        (("name",), 42, lambda detail: detail.name),
+        (
+            ("productInformation", "mainInformation"),
+            [],
+            lambda detail: detail.ingredients,
+        ),
+    ],
+)
+def test_from_json_reads_wrong_optional_types_as_none(path: tuple, value, attribute):
+    """Test that an optional field with an unexpected type does not reject the product."""
+    product = copy.deepcopy(oliveoil)
+    target = product
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    target[path[-1]] = value
+    detail = ProductDetail.from_json(product)
+    assert detail.migros_id == oliveoil["migrosId"]
+    assert attribute(detail) is None
+
+
+def test_from_json_rejects_wrong_migros_id_type():
+    product = copy.deepcopy(oliveoil)
+    product["migrosId"] = 103302600000
+    with pytest.raises(ProductDetailError):
+        ProductDetail.from_json(product)
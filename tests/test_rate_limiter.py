@@ -0,0 +1,87 @@
+import pytest
+
+from src.utils.rate_limiter import AdaptiveRateLimiter
+
+
+class FakeClock:
+    """Clock and sleep replacement that only advances when slept on."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_limiter(clock: FakeClock, **kwargs) -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_acquire_spaces_requests_by_rate(clock):
+    """Test that after the burst is used up, requests are spaced by 1 / rate."""
+    limiter = make_limiter(clock, rate=0.5)
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(2.0)
+    assert limiter.acquire() == pytest.approx(2.0)
+    assert clock.now == pytest.approx(4.0)
+
+
+def test_success_increases_rate_additively(clock):
+    """Test that healthy responses raise the rate up to max_rate."""
+    limiter = make_limiter(clock, rate=0.5, max_rate=0.53, additive_increase=0.01)
+    for _ in range(5):
+        limiter.record_success(latency=1.0)
+    assert limiter.rate == pytest.approx(0.53)
+
+
+def test_throttle_decreases_rate_and_honours_retry_after(clock):
+    """Test that a 429 halves the rate and blocks until Retry-After has passed."""
+    limiter = make_limiter(clock, rate=1.0)
+    limiter.acquire()
+    limiter.record_throttle(retry_after=30)
+    assert limiter.rate == pytest.approx(0.5)
+    waited = limiter.acquire()
+    assert waited >= 30
+    assert clock.now >= 30
+
+
+def test_slow_response_decreases_rate(clock):
+    """Test that a response far above the latency baseline backs off."""
+    limiter = make_limiter(clock, rate=1.0, additive_increase=0.0)
+    limiter.record_success(latency=1.0)
+    limiter.record_success(latency=10.0)
+    assert limiter.rate == pytest.approx(0.5)
+
+
+def test_rate_stays_within_bounds(clock):
+    """Test that repeated throttling never drops below min_rate."""
+    limiter = make_limiter(clock, rate=1.0, min_rate=0.2)
+    for _ in range(10):
+        limiter.record_throttle()
+    assert limiter.rate == pytest.approx(0.2)
+
+
+def test_state_round_trip(clock):
+    """Test that a restored limiter continues at the saved rate."""
+    limiter = make_limiter(clock, rate=1.0)
+    limiter.record_throttle()
+    limiter.record_success(latency=2.0)
+    restored = make_limiter(clock, rate=1.0)
+    restored.restore(limiter.state())
+    assert restored.rate == pytest.approx(limiter.rate)
+    assert restored.latency_baseline == pytest.approx(2.0)
+
+
+def test_unlimited_never_waits():
+    """Test that the unlimited limiter never blocks."""
+    limiter = AdaptiveRateLimiter.unlimited()
+    assert limiter.is_unlimited
+    assert all(limiter.acquire() == 0.0 for _ in range(100))
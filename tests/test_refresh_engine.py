@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+from src.refresh_engine import AsyncRefreshEngine
+from src.services.migros_api import MigrosApiClient
+from src.services.mongo_service import MongoService
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.yeeter import Yeeter
+from tests.data.oliveoil import oliveoil
+
+
+@pytest.fixture(scope="function")
+def mongo_service():
+    """Provides a MongoService connected to the test database with empty collections."""
+    mongo_service = MongoService("mongodb://test_mongo:27017", "testdb", Yeeter())
+    mongo_service.db.products.delete_many({})
+    mongo_service.db.latest_fingerprint.delete_many({})
+    mongo_service.db.known_ids.delete_many({})
+    mongo_service.db.known_id_filter.delete_many({})
+    mongo_service.db.migrations.delete_many({})
+    mongo_service.db.id_scraped_at.delete_many({})
+    mongo_service.db.request_counts.delete_many({})
+    yield mongo_service
+    mongo_service.close()
+
+
+def test_refresh_bounds_products_in_flight(
+    mongo_service: MongoService, api_client: MigrosApiClient, monkeypatch
+):
+    """Test that no more than `concurrency` products are fetched at a time."""
+    in_flight = 0
+    most_in_flight = 0
+    lock = threading.Lock()
+
+    def slow_get_product_detail(migros_id: str):
+        nonlocal in_flight, most_in_flight
+        with lock:
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return None
+
+    monkeypatch.setattr(api_client, "get_product_detail", slow_get_product_detail)
+    engine = AsyncRefreshEngine(
+        mongo_service, Yeeter(), api_client=api_client, concurrency=2
+    )
+    engine.rate_limiter = AdaptiveRateLimiter.unlimited()
+    ids = [str(100000000000 + i) for i in range(10)]
+
+    results = engine.refresh(ids)
+
+    assert [result.migros_id for result in results] == ids
+    assert all(result.status == "unchanged" for result in results)
+    assert most_in_flight == 2
+
+
+def test_refresh_throttle_slows_the_shared_limiter(
+    mongo_service: MongoService, api_client: MigrosApiClient
+):
+    """Test that a 429 cuts the rate of the limiter and honours Retry-After."""
+    now = 0.0
+
+    def sleep(seconds: float) -> None:
+        nonlocal now
+        now += seconds
+
+    rate_limiter = AdaptiveRateLimiter(
+        rate=100, max_rate=100, clock=lambda: now, sleep=sleep
+    )
+    engine = AsyncRefreshEngine(
+        mongo_service,
+        Yeeter(),
+        api_client=api_client,
+        max_attempts=2,
+        rate_limiter=rate_limiter,
+    )
+
+    [result] = engine.refresh(["429"])
+
+    assert result.status == "failed"
+    assert result.attempts == 2
+    assert rate_limiter.rate == pytest.approx(25)
+    # The second attempt waited for the Retry-After of the first.
+    assert now >= 7
+
+
+def test_refresh_reports_every_id(
+    mongo_service: MongoService, api_client: MigrosApiClient
+):
+    """Test that the engine refreshes products concurrently and reports each id."""
+    engine = AsyncRefreshEngine(
+        mongo_service,
+        Yeeter(),
+        api_client=api_client,
+        concurrency=3,
+        requests_per_second=100,
+    )
+    results = engine.refresh([oliveoil["migrosId"], "000000000000"])
+
+    assert [result.migros_id for result in results] == [
+        oliveoil["migrosId"],
+        "000000000000",
+    ]
+    assert results[0].status == "refreshed"
+    assert results[1].status == "failed"
+    assert (
+        mongo_service.db.products.count_documents({"migrosId": oliveoil["migrosId"]})
+        == 1
+    )
+
+    again = engine.refresh([oliveoil["migrosId"]])
+    assert again[0].status == "skipped"
+
+
+def test_refresh_reports_unchanged_products(
+    mongo_service: MongoService, api_client: MigrosApiClient
+):
+    """Test that a product answered with 304 is reported and not stored again."""
+    mongo_service.db.response_validators.delete_many({})
+    api_client.validator_store = mongo_service
+    engine = AsyncRefreshEngine(
+        mongo_service, Yeeter(), api_client=api_client, requests_per_second=100
+    )
+    assert engine.refresh([oliveoil["migrosId"]])[0].status == "refreshed"
+
+    mongo_service.db.id_scraped_at.delete_many({})
+    assert engine.refresh([oliveoil["migrosId"]])[0].status == "unchanged"
+    assert (
+        mongo_service.db.products.count_documents({"migrosId": oliveoil["migrosId"]})
+        == 1
+    )
+
+
+def test_refresh_after_failed_insert_fetches_again(
+    mongo_service: MongoService, api_client: MigrosApiClient, monkeypatch
+):
+    """Test that a product whose insert failed is not reported unchanged afterwards."""
+    mongo_service.db.response_validators.delete_many({})
+    api_client.validator_store = mongo_service
+    engine = AsyncRefreshEngine(
+        mongo_service, Yeeter(), api_client=api_client, requests_per_second=100
+    )
+    insert_product = mongo_service.insert_product
+
+    def failing_insert_product(product) -> None:
+        raise ValueError("write failed")
+
+    monkeypatch.setattr(mongo_service, "insert_product", failing_insert_product)
+    [failed] = engine.refresh([oliveoil["migrosId"]])
+    assert failed.status == "failed"
+    assert not mongo_service.is_product_scraped_last_24_hours(oliveoil["migrosId"])
+
+    monkeypatch.setattr(mongo_service, "insert_product", insert_product)
+    [refreshed] = engine.refresh([oliveoil["migrosId"]])
+    assert refreshed.status == "refreshed"
+    assert (
+        mongo_service.db.products.count_documents({"migrosId": oliveoil["migrosId"]})
+        == 1
+    )
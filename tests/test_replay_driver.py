@@ -0,0 +1,331 @@
+import functools
+import gzip
+import json
+import time
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from src.migros_scraper import MigrosScraper
+from src.models.product_detail import ProductDetail
+from src.services.crawl_frontier import CrawlFrontier
+from src.services.job_queue import JobQueue
+from src.services.migros_api import MigrosApiClient
+from src.services.mongo_service import MongoService
+from src.services.response_archive import ResponseArchive
+from src.utils.capture_policy import CapturePolicy
+from src.utils.replay_driver import ReplayCorpus, ReplayDriver
+from src.utils.response_mailbox import ResponseMailbox
+from src.utils.sharding import Shard
+from src.utils.yeeter import Yeeter
+from tests.data.base_categories import base_categories
+from tests.data.higher_level_categories import higher_level_categories
+from tests.data.koriander import koriander
+from tests.data.oliveoil import oliveoil
+from tests.data.penne import penne
+
+DB_NAME = "replaydb"
+
+
+def make_corpus(**kwargs) -> ReplayCorpus:
+    return ReplayCorpus(
+        base_categories,
+        higher_level_categories,
+        [oliveoil, koriander, penne],
+        **kwargs,
+    )
+
+
+@pytest.fixture(scope="function")
+def mongo_service():
+    """Yields a MongoService on an empty database for the replayed crawl."""
+    MongoService("mongodb://test_mongo:27017", DB_NAME, Yeeter()).client.drop_database(
+        DB_NAME
+    )
+    mongo_service = MongoService("mongodb://test_mongo:27017", DB_NAME, Yeeter())
+    yield mongo_service
+    mongo_service.client.drop_database(DB_NAME)
+    mongo_service.close()
+
+
+def test_page_load_delivers_api_responses():
+    """Test that a product page files product-detail and product-cards responses."""
+    driver = ReplayDriver(make_corpus())
+    mailbox = ResponseMailbox(MigrosScraper.CAPTURED_FRAGMENTS)
+    driver.response_interceptor = mailbox.interceptor
+    driver.get(MigrosScraper.BASE_URL + "product/" + oliveoil["migrosId"])
+
+    detail = mailbox.wait_for("product-detail", timeout=0)
+    assert detail.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(detail.body))[0]["migrosId"] == (
+        oliveoil["migrosId"]
+    )
+    assert mailbox.wait_for("product-cards", timeout=0) is not None
+    assert len(driver.requests) == 3
+    del driver.requests
+    assert driver.requests == []
+
+
+def test_category_response_contains_descendants():
+    corpus = make_corpus()
+    slugs = [
+        category["slug"] for category in corpus.category("meat-fish")["categories"]
+    ]
+    assert slugs[0] == "meat-fish"
+    assert "meat-poultry" in slugs and "beef" in slugs
+    assert corpus.category("unknown") == {"categories": []}
+
+
+def test_synthetic_products_and_cards():
+    """Test that synthetic ids are served and cards are the same per URL."""
+    corpus = make_corpus(synthetic_products=10, cards_per_page=5)
+    assert len(corpus.product_ids) == 13
+    [product] = corpus.product_detail("900000000004")
+    assert product["migrosId"] == "900000000004"
+    assert corpus.product_detail("900000000010") == []
+    assert corpus.product_cards("a") == corpus.product_cards("a")
+    assert len(corpus.product_cards("a")) == 5
+
+
+def test_corpus_from_archive(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    archive.append(
+        "storemap",
+        "",
+        json.dumps({"categories": base_categories}, default=str).encode(),
+    )
+    archive.append(
+        "product-detail",
+        oliveoil["migrosId"],
+        json.dumps([oliveoil], default=str).encode(),
+    )
+    corpus = ReplayCorpus.from_archive(archive)
+    archive.close()
+    assert [category["slug"] for category in corpus.base_categories] == [
+        category["slug"] for category in base_categories
+    ]
+    assert corpus.product_ids == [oliveoil["migrosId"]]
+
+
+def test_corpus_from_api_archive(api_client: MigrosApiClient, tmp_path):
+    """Test that responses archived by the API client are replayed."""
+    api_client.refresh_guest_token()
+    api_client.archive = ResponseArchive(str(tmp_path))
+    api_client.get_storemap()
+    api_client.get_category("meat-fish")
+    api_client.get_product_detail(oliveoil["migrosId"])
+    corpus = ReplayCorpus.from_archive(api_client.archive)
+    api_client.archive.close()
+
+    assert len(corpus.base_categories) == len(base_categories)
+    slugs = [
+        category["slug"] for category in corpus.category("meat-fish")["categories"]
+    ]
+    assert "meat-poultry" in slugs
+    assert corpus.product_ids == [oliveoil["migrosId"]]
+
+
+@pytest.mark.parametrize("known_id_filter", [False, True])
+def test_replayed_crawl_stores_products(
+    mongo_service: MongoService, known_id_filter: bool
+):
+    """Test the full crawl (categories, discovery, MongoDB writes) against a replay."""
+    driver = ReplayDriver(make_corpus(synthetic_products=20, cards_per_page=10))
+    frontier = CrawlFrontier(mongo_service)
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=0,
+        frontier=frontier,
+        driver=driver,
+        known_id_filter=known_id_filter,
+    )
+    scraper.get_and_store_base_categories()
+    scraper.seed_frontier_with_base_categories()
+    scraper.run_frontier()
+    scraper.close()
+    assert 0 < scraper.first_request_seconds < 60
+
+    stored = set(mongo_service.db.products.distinct("migrosId"))
+    assert stored == set(driver.corpus.product_ids)
+    assert mongo_service.db.categories.count_documents({}) >= len(base_categories)
+    assert frontier.pending_count() == 0
+    # The main page, every category once and every product once.
+    categories = len(base_categories) + len(higher_level_categories) - 1
+    assert driver.page_loads == 1 + categories + len(driver.corpus.product_ids)
+    if known_id_filter:
+        assert stored <= set(mongo_service.db.known_ids.distinct("_id"))
+        bloom = mongo_service.load_known_id_filter()
+        assert all(migros_id in bloom for migros_id in stored)
+
+
+def test_replayed_crawl_discovers_only_its_shard(mongo_service: MongoService):
+    """Test that a sharded scraper only fetches the products its shard owns."""
+    driver = ReplayDriver(make_corpus(synthetic_products=20, cards_per_page=10))
+    shard = Shard(0, 2)
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=0,
+        frontier=CrawlFrontier(mongo_service),
+        driver=driver,
+        shard=(0, 2),
+    )
+    scraper.get_and_store_base_categories()
+    scraper.seed_frontier_with_base_categories()
+    scraper.run_frontier()
+    scraper.close()
+
+    stored = set(mongo_service.db.products.distinct("migrosId"))
+    assert stored
+    assert all(shard.owns(migros_id) for migros_id in stored)
+
+
+def test_shards_share_the_request_rate(mongo_service: MongoService):
+    """Test that each shard paces at its share of the rate and saves its own state."""
+    mongo_service.db.rate_limiter_state.delete_many({})
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=2.0,
+        driver=ReplayDriver(make_corpus()),
+        shard=(1, 2),
+    )
+    scraper.close()
+
+    assert scraper.rate_limiter.rate == pytest.approx(0.25)
+    assert mongo_service.get_rate_limiter_state("migros") is None
+    assert mongo_service.get_rate_limiter_state("migros_shard_1_of_2")
+
+
+def test_replayed_walk_without_frontier(mongo_service: MongoService):
+    """Test that scraping discoveries in between does not lose category responses."""
+    driver = ReplayDriver(make_corpus(synthetic_products=5, cards_per_page=4))
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=0,
+        driver=driver,
+    )
+    scraper.get_and_store_base_categories()
+    visited = scraper.walk_category_tree(scraper.base_category_nodes())
+    assert scraper.report_memory() > 0
+    scraper.close()
+
+    assert visited == len(base_categories) + len(higher_level_categories) - 1
+    assert set(mongo_service.db.products.distinct("migrosId")) == set(
+        driver.corpus.product_ids
+    )
+
+
+def test_api_mode_walks_categories_without_page_loads(
+    mongo_service: MongoService, api_client: MigrosApiClient
+):
+    """Test that the API fetch mode reads the storemap and categories from the API."""
+    driver = ReplayDriver(make_corpus())
+    api_client.refresh_guest_token()
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=0,
+        fetch_mode="api",
+        api_client=api_client,
+        driver=driver,
+    )
+    scraper.get_and_store_base_categories()
+    visited = scraper.walk_category_tree(scraper.base_category_nodes())
+    scraper.close()
+
+    assert driver.page_loads == 0
+    assert visited == len(base_categories) + len(higher_level_categories) - 1
+    assert mongo_service.db.categories.count_documents({"slug": "meat-poultry"}) == 1
+
+
+def test_oversized_response_is_not_waited_for(mongo_service: MongoService):
+    """Test that a response over the body limit is given up on without a timeout."""
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=0,
+        capture_policy=CapturePolicy("tiny", max_body_bytes=16),
+        driver=ReplayDriver(make_corpus()),
+    )
+    scraper.make_request_and_validate(
+        MigrosScraper.BASE_URL + "product/" + oliveoil["migrosId"]
+    )
+
+    start = time.monotonic()
+    assert scraper._get_specific_response("product-detail") == {}
+    assert time.monotonic() - start < 1
+    assert scraper.response_mailbox.oversized_count >= 1
+    scraper.close()
+
+
+def test_job_queue_retries_failed_products(mongo_service: MongoService, monkeypatch):
+    """Test that products failing in scrape_product_by_id are retried, then dead-lettered."""
+    driver = ReplayDriver(make_corpus())
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=0,
+        disable_check_for_product_cards=True,
+        driver=driver,
+    )
+    insert_product = mongo_service.insert_product
+    failures = {oliveoil["migrosId"]: 1, penne["migrosId"]: 99}
+
+    def flaky_insert_product(product: ProductDetail) -> None:
+        if failures.get(product.migros_id, 0) > 0:
+            failures[product.migros_id] -= 1
+            raise PyMongoError("write failed")
+        insert_product(product)
+
+    monkeypatch.setattr(mongo_service, "insert_product", flaky_insert_product)
+    queue = JobQueue(mongo_service, "refresh", max_attempts=2, retry_delay=0)
+    queue.enqueue_many(driver.corpus.product_ids)
+
+    completed = queue.process(
+        functools.partial(scraper.scrape_product_by_id, raise_errors=True)
+    )
+    scraper.close()
+
+    assert completed == 2
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 2, "dead": 1}
+    assert set(mongo_service.db.products.distinct("migrosId")) == {
+        oliveoil["migrosId"],
+        koriander["migrosId"],
+    }
+    assert not mongo_service.is_product_scraped_last_24_hours(penne["migrosId"])
+
+
+def test_frontier_retries_failed_categories(mongo_service: MongoService, monkeypatch):
+    """Test that a category whose scrape raised is retried instead of marked done."""
+    driver = ReplayDriver(make_corpus())
+    frontier = CrawlFrontier(mongo_service)
+    scraper = MigrosScraper(
+        mongo_service=mongo_service,
+        yeeter=mongo_service.yeeter,
+        average_request_sleep_time=0,
+        frontier=frontier,
+        driver=driver,
+    )
+    insert_category = mongo_service.insert_category
+    failures = {"meat-fish": 1}
+
+    def flaky_insert_category(category: dict) -> None:
+        if failures.get(category["slug"], 0) > 0:
+            failures[category["slug"]] -= 1
+            raise PyMongoError("write failed")
+        insert_category(category)
+
+    scraper.get_and_store_base_categories()
+    monkeypatch.setattr(mongo_service, "insert_category", flaky_insert_category)
+    scraper.seed_frontier_with_base_categories()
+    scraper.run_frontier()
+    scraper.close()
+
+    item = frontier.collection.find_one({"payload.slug": "meat-fish"})
+    assert item["status"] == "done"
+    assert item["attempts"] == 2
+    assert frontier.collection.count_documents({"status": {"$ne": "done"}}) == 0
+    assert mongo_service.db.categories.find_one({"slug": "meat-poultry"})
@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from src.services.response_archive import ResponseArchive
+from tests.data.oliveoil import oliveoil
+
+BODY = json.dumps([oliveoil], default=str).encode()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ResponseArchive(str(tmp_path / "archive"), initial_index_slots=8)
+    yield archive
+    archive.close()
+
+
+def test_append_and_get(archive: ResponseArchive):
+    """Test that a response is found again by endpoint, migrosId and timestamp."""
+    timestamp = archive.append("product-detail", oliveoil["migrosId"], BODY)
+    assert archive.get("product-detail", oliveoil["migrosId"], timestamp) == BODY
+    assert archive.get("product-detail", oliveoil["migrosId"], timestamp + 1) is None
+    assert archive.get("product-cards", oliveoil["migrosId"], timestamp) is None
+
+
+def test_index_grows(archive: ResponseArchive):
+    """Test that lookups still work after the index outgrew its initial size."""
+    for i in range(100):
+        archive.append("product-detail", str(i), b"%d" % i, timestamp=i)
+    assert len(archive) == 100
+    assert archive.index_slots > 8
+    assert all(
+        archive.get("product-detail", str(i), i) == b"%d" % i for i in range(100)
+    )
+
+
+def test_scan_is_in_append_order(tmp_path):
+    """Test that a scan returns every response in order across rolled segments."""
+    archive = ResponseArchive(str(tmp_path), max_segment_bytes=256)
+    for i in range(20):
+        archive.append("product-detail" if i % 2 else "product-cards", "", BODY, i)
+    assert len(archive.segments) > 1
+    assert [response.timestamp for response in archive.scan()] == list(range(20))
+    assert [response.timestamp for response in archive.scan("product-cards")] == [
+        i for i in range(20) if i % 2 == 0
+    ]
+    assert all(response.body == BODY for response in archive.scan())
+    archive.close()
+
+
+def test_reopen_and_rebuild_index(tmp_path):
+    """Test that the archive survives a restart and a deleted index."""
+    archive = ResponseArchive(str(tmp_path))
+    archive.append("product-detail", "1", b"one", timestamp=1)
+    archive.close()
+
+    archive = ResponseArchive(str(tmp_path))
+    assert archive.get("product-detail", "1", 1) == b"one"
+    archive.append("product-detail", "2", b"two", timestamp=2)
+    archive.close()
+
+    os.remove(os.path.join(tmp_path, "index.bin"))
+    archive = ResponseArchive(str(tmp_path))
+    assert len(archive) == 2
+    assert archive.get("product-detail", "2", 2) == b"two"
+    archive.close()
+
+
+def test_torn_record_is_truncated(tmp_path):
+    """Test that a half-written record at the end of a segment is dropped on open."""
+    archive = ResponseArchive(str(tmp_path))
+    archive.append("product-detail", "1", b"one", timestamp=1)
+    archive.close()
+    segment = os.path.join(tmp_path, "segment-000001.log")
+    size = os.path.getsize(segment)
+    with open(segment, "ab") as file:
+        file.write(b"\x00" * 7)
+
+    archive = ResponseArchive(str(tmp_path))
+    assert os.path.getsize(segment) == size
+    archive.append("product-detail", "2", b"two", timestamp=2)
+    assert [response.migros_id for response in archive.scan()] == ["1", "2"]
+    archive.close()
@@ -0,0 +1,133 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from src.utils.response_mailbox import ResponseMailbox
+
+FRAGMENTS = ("product-detail", "product-cards")
+
+
+def make_exchange(url: str, body: bytes = b"[]"):
+    """Builds request/response stand-ins with the attributes selenium-wire provides."""
+    request = SimpleNamespace(url=url)
+    response = SimpleNamespace(status_code=200, headers={}, body=body)
+    return request, response
+
+
+def test_wait_for_returns_captured_response():
+    """Test that a response for a watched fragment is handed out."""
+    mailbox = ResponseMailbox(FRAGMENTS)
+    mailbox.interceptor(*make_exchange("https://x/product-detail?id=1", b"[1]"))
+    captured = mailbox.wait_for("product-detail", timeout=0)
+    assert captured.body == b"[1]"
+    assert captured.status_code == 200
+
+
+def test_unwatched_responses_are_ignored():
+    """Test that responses for other URLs are not stored."""
+    mailbox = ResponseMailbox(FRAGMENTS)
+    mailbox.interceptor(*make_exchange("https://x/images/logo.png"))
+    assert mailbox.wait_for("product-detail", timeout=0) is None
+
+
+def test_wait_for_wakes_when_response_arrives():
+    """Test that a waiting caller wakes up as soon as the interceptor delivers."""
+    mailbox = ResponseMailbox(FRAGMENTS)
+    timer = threading.Timer(
+        0.1, mailbox.interceptor, make_exchange("https://x/product-cards")
+    )
+    start = time.monotonic()
+    timer.start()
+    captured = mailbox.wait_for("product-cards", timeout=5)
+    elapsed = time.monotonic() - start
+    assert captured is not None
+    assert elapsed < 1
+
+
+def test_wait_for_times_out():
+    """Test that None is returned if nothing arrives in time."""
+    mailbox = ResponseMailbox(FRAGMENTS)
+    start = time.monotonic()
+    assert mailbox.wait_for("product-detail", timeout=0.1) is None
+    assert time.monotonic() - start >= 0.1
+
+
+def test_wait_for_index_and_reset():
+    """Test that later matches are reachable by index and reset clears the box."""
+    mailbox = ResponseMailbox(FRAGMENTS)
+    mailbox.interceptor(*make_exchange("https://x/product-cards", b"first"))
+    mailbox.interceptor(*make_exchange("https://x/product-cards", b"second"))
+    assert mailbox.wait_for("product-cards", timeout=0, index=1).body == b"second"
+    mailbox.reset()
+    assert mailbox.wait_for("product-cards", timeout=0) is None
+
+
+def test_page_responses_follow_reset_url():
+    """Test that the document response of the current page is indexed under the page key."""
+    mailbox = ResponseMailbox(FRAGMENTS)
+    mailbox.reset("https://x/en/product/1")
+    mailbox.interceptor(*make_exchange("https://x/en/product/1"))
+    mailbox.interceptor(*make_exchange("https://x/en/product/2"))
+    assert [response.url for response in mailbox.page_responses()] == [
+        "https://x/en/product/1"
+    ]
+    mailbox.reset("https://x/en/product/2")
+    assert mailbox.page_responses() == []
+
+
+def test_json_is_decoded_once():
+    """Test that the parsed body is cached on the captured response."""
+    calls = []
+
+    def decompress(body: bytes, encoding: str) -> bytes:
+        calls.append(encoding)
+        return body
+
+    mailbox = ResponseMailbox(FRAGMENTS)
+    mailbox.interceptor(
+        *make_exchange("https://x/product-cards", b'[{"migrosId": "1"}]')
+    )
+    captured = mailbox.wait_for("product-cards", timeout=0)
+    assert captured.json(decompress) == [{"migrosId": "1"}]
+    assert captured.json(decompress) is captured.json(decompress)
+    assert calls == [""]
+
+
+def test_listener_gets_fragment_responses():
+    """Test that the listener sees each watched response, but not page documents."""
+    seen = []
+    mailbox = ResponseMailbox(
+        FRAGMENTS, listener=lambda key, captured: seen.append((key, captured.url))
+    )
+    mailbox.reset("https://x/en/product/1")
+    mailbox.interceptor(*make_exchange("https://x/en/product/1"))
+    mailbox.interceptor(*make_exchange("https://x/product-detail?migrosIds=1"))
+    assert seen == [("product-detail", "https://x/product-detail?migrosIds=1")]
+
+
+def test_wait_for_calls_pump():
+    """Test that a waiting caller pulls responses in through the pump."""
+    mailbox = ResponseMailbox(FRAGMENTS)
+    calls = []
+
+    def pump():
+        calls.append(1)
+        if len(calls) == 3:
+            mailbox.interceptor(*make_exchange("https://x/product-cards"))
+
+    mailbox.pump = pump
+    mailbox.pump_interval = 0.01
+    assert mailbox.wait_for("product-cards", timeout=5) is not None
+    assert len(calls) == 3
+
+
+def test_oversized_bodies_are_dropped():
+    """Test that a body over the limit is filed empty and counted."""
+    mailbox = ResponseMailbox(FRAGMENTS, max_body_bytes=4)
+    mailbox.interceptor(*make_exchange("https://x/product-detail", b"[1, 2, 3]"))
+    mailbox.interceptor(*make_exchange("https://x/product-cards", b"[1]"))
+    oversized = mailbox.wait_for("product-detail", timeout=0)
+    assert oversized.body == b"" and oversized.truncated
+    kept = mailbox.wait_for("product-cards", timeout=0)
+    assert kept.body == b"[1]" and not kept.truncated
+    assert mailbox.oversized_count == 1
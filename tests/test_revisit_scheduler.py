@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.services.mongo_service import MongoService
+from src.services.revisit_scheduler import RevisitPolicy, RevisitScheduler
+from src.utils.sharding import Shard
+from src.utils.yeeter import Yeeter
+
+
+@pytest.fixture(scope="function")
+def mongo_service():
+    """
+    Pytest fixture that provides a MongoService on the test database.
+    Clears the collections the scheduler reads before and after each test.
+
+    Yields:
+        MongoService: An instance of the MongoService class.
+    """
+    mongo_service = MongoService(
+        uri="mongodb://test_mongo:27017", db_name="testdb", yeeter=Yeeter()
+    )
+    collections = ("id_scraped_at", "unit_price_history", "known_ids", "products")
+    for collection in collections:
+        mongo_service.db[collection].delete_many({})
+
+    yield mongo_service
+
+    for collection in collections:
+        mongo_service.db[collection].delete_many({})
+    mongo_service.close()
+
+
+def add_product(
+    mongo_service: MongoService,
+    migros_id: str,
+    days_observed: float,
+    days_since_scrape: float,
+    changes: int = 0,
+):
+    """Stores a product observed for days_observed days with the given number of price changes."""
+    now = datetime.now(timezone.utc)
+    first_seen = now - timedelta(days=days_since_scrape + days_observed)
+    mongo_service.add_known_id(migros_id, first_seen)
+    mongo_service.db.id_scraped_at.insert_one(
+        {"migrosId": migros_id, "lastScraped": now - timedelta(days=days_since_scrape)}
+    )
+    for index in range(changes):
+        mongo_service.db.unit_price_history.insert_one(
+            {"migrosId": migros_id, "newPrice": {}, "dateChanged": str(index)}
+        )
+
+
+def test_policy_rates_and_intervals():
+    policy = RevisitPolicy(prior_changes=1, prior_days=30)
+
+    assert policy.change_rate(0, 0) == pytest.approx(1 / 30)
+    assert policy.change_rate(9, 70) == pytest.approx(0.1)
+    assert policy.interval_days(0.1) == pytest.approx(6.93, rel=1e-3)
+    assert policy.interval_days(100) == policy.min_interval_days
+    assert policy.interval_days(0.0001) == policy.max_interval_days
+    with pytest.raises(ValueError):
+        RevisitPolicy(target_probability=1)
+
+
+def test_update_schedules_volatile_products_sooner(mongo_service: MongoService):
+    """Test that a product with many price changes gets a higher rate and an earlier due time."""
+    add_product(mongo_service, "1", days_observed=60, days_since_scrape=1, changes=20)
+    add_product(mongo_service, "2", days_observed=60, days_since_scrape=1)
+    scheduler = RevisitScheduler(mongo_service)
+
+    assert scheduler.update() == 2
+    assert scheduler.update() == 0
+
+    entries = {
+        entry["migrosId"]: entry for entry in mongo_service.db.id_scraped_at.find()
+    }
+    assert entries["1"]["changeRate"] > 5 * entries["2"]["changeRate"]
+    assert entries["1"]["nextDue"] < entries["2"]["nextDue"]
+
+
+def test_update_only_reschedules_scraped_products(mongo_service: MongoService):
+    """Test that update only reads products scraped since the last update."""
+    add_product(mongo_service, "1", days_observed=60, days_since_scrape=5)
+    add_product(mongo_service, "2", days_observed=60, days_since_scrape=5)
+    scheduler = RevisitScheduler(mongo_service)
+    scheduler.update()
+    before = mongo_service.db.id_scraped_at.find_one({"migrosId": "2"})["nextDue"]
+
+    mongo_service.save_scraped_product_id("2")
+
+    assert scheduler.update() == 1
+    assert (
+        mongo_service.db.id_scraped_at.find_one({"migrosId": "2"})["nextDue"] > before
+    )
+    assert scheduler.update(full=True) == 2
+
+
+def test_update_by_shard(mongo_service: MongoService):
+    """Test that update only schedules the products of the given shard."""
+    ids = [str(100000000 + i) for i in range(12)]
+    for migros_id in ids:
+        add_product(mongo_service, migros_id, days_observed=30, days_since_scrape=40)
+    scheduler = RevisitScheduler(mongo_service)
+
+    updated = scheduler.update(shard=(0, 2))
+
+    scheduled = [
+        entry["migrosId"]
+        for entry in mongo_service.db.id_scraped_at.find({"nextDue": {"$exists": True}})
+    ]
+    assert updated == len(scheduled) > 0
+    assert all(Shard(0, 2).owns(migros_id) for migros_id in scheduled)
+
+
+def test_due_products_are_ordered_by_expected_changes(mongo_service: MongoService):
+    """Test that only due products are returned, the most likely changed first."""
+    add_product(mongo_service, "1", days_observed=60, days_since_scrape=2, changes=1)
+    add_product(mongo_service, "2", days_observed=60, days_since_scrape=3, changes=30)
+    add_product(mongo_service, "3", days_observed=60, days_since_scrape=40)
+    add_product(mongo_service, "4", days_observed=60, days_since_scrape=0, changes=30)
+    scheduler = RevisitScheduler(mongo_service)
+    scheduler.update()
+
+    assert scheduler.due_products(only_edible=False) == ["2", "3"]
+    assert scheduler.due_products(limit=1, only_edible=False) == ["2"]
+
+
+def test_unscheduled_products_are_due(mongo_service: MongoService):
+    """Test that products the scheduler has not seen yet are due."""
+    add_product(mongo_service, "1", days_observed=1, days_since_scrape=1)
+
+    assert RevisitScheduler(mongo_service).due_products(only_edible=False) == ["1"]
+
+
+def test_due_products_by_shard(mongo_service: MongoService):
+    """Test that due products are split between the shards."""
+    ids = [str(100000000 + i) for i in range(12)]
+    for migros_id in ids:
+        add_product(mongo_service, migros_id, days_observed=30, days_since_scrape=40)
+    scheduler = RevisitScheduler(mongo_service)
+    scheduler.update()
+
+    shards = [
+        scheduler.due_products(only_edible=False, shard=(index, 2))
+        for index in range(2)
+    ]
+
+    assert sorted(sum(shards, [])) == ids
+    assert all(Shard(1, 2).owns(migros_id) for migros_id in shards[1])
+
+
+def test_fill_adds_products_that_are_not_due(mongo_service: MongoService):
+    """Test that fill uses the whole limit, due products first."""
+    add_product(mongo_service, "1", days_observed=60, days_since_scrape=2, changes=1)
+    add_product(mongo_service, "2", days_observed=60, days_since_scrape=40)
+    add_product(mongo_service, "3", days_observed=60, days_since_scrape=1, changes=30)
+    scheduler = RevisitScheduler(mongo_service)
+    scheduler.update()
+
+    assert scheduler.due_products(only_edible=False) == ["2"]
+    assert scheduler.due_products(limit=2, only_edible=False, fill=True) == ["2", "3"]
@@ -0,0 +1,32 @@
+import pytest
+
+from src.utils.sharding import Shard, shard_key
+
+
+def test_shard_key_is_stable():
+    assert shard_key("100035819") == 1690550506
+    assert shard_key("100035819") == shard_key(100035819)
+
+
+def test_shards_partition_the_ids():
+    ids = [str(100000000 + i) for i in range(3000)]
+    shards = [Shard(index, 3) for index in range(3)]
+
+    owners = [[shard for shard in shards if shard.owns(migros_id)] for migros_id in ids]
+
+    assert all(len(owner) == 1 for owner in owners)
+    sizes = [sum(shard.owns(migros_id) for migros_id in ids) for shard in shards]
+    assert min(sizes) > 800
+
+
+def test_of():
+    assert Shard.of(None) is None
+    assert Shard.of((1, 4)) == Shard(1, 4)
+    assert str(Shard.of(Shard(0, 2))) == "0/2"
+    assert Shard(1, 4).mongo_filter() == {"shardKey": {"$mod": [4, 1]}}
+
+
+@pytest.mark.parametrize("index, count", [(2, 2), (-1, 2), (0, 0)])
+def test_invalid_shards(index, count):
+    with pytest.raises(ValueError):
+        Shard(index, count)
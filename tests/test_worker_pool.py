@@ -0,0 +1,180 @@
+import multiprocessing
+import time
+
+import pytest
+
+from src.services.mongo_service import MongoService
+from src.utils.known_id_set import KnownIdSet
+from src.utils.replay_driver import ReplayCorpus, ReplayDriver
+from src.utils.shared_id_set import IdSetManager, SharedIdSet
+from src.utils.yeeter import Yeeter
+from src.worker_pool import PoolManager, ScraperWorkerPool, WorkerConfig
+from tests.data.base_categories import base_categories
+from tests.data.higher_level_categories import higher_level_categories
+from tests.data.oliveoil import oliveoil
+
+MONGO_URI = "mongodb://test_mongo:27017"
+DB_NAME = "workerpooldb"
+
+
+class SlowReplayDriver(ReplayDriver):
+    """A ReplayDriver that takes `delay` seconds per page, like a real browser."""
+
+    def __init__(self, corpus: ReplayCorpus, delay: float = 0.0, fail_on: str = None):
+        super().__init__(corpus)
+        self.delay = delay
+        self.fail_on = fail_on
+
+    def get(self, url: str) -> None:
+        if self.fail_on and url.endswith(self.fail_on):
+            raise RuntimeError("browser crashed")
+        time.sleep(self.delay)
+        super().get(url)
+
+
+def _claim_all(shared_ids: SharedIdSet, ids: list[str], results):
+    results.put([migros_id for migros_id in ids if shared_ids.claim(migros_id)])
+
+
+def _throttle(rate_limiter):
+    rate_limiter.record_throttle()
+
+
+@pytest.fixture
+def manager():
+    with IdSetManager() as manager:
+        yield manager
+
+
+@pytest.fixture
+def corpus():
+    return ReplayCorpus(
+        base_categories, higher_level_categories, [oliveoil], synthetic_products=24
+    )
+
+
+@pytest.fixture
+def config():
+    MongoService(MONGO_URI, DB_NAME, Yeeter()).client.drop_database(DB_NAME)
+    yield WorkerConfig(mongo_uri=MONGO_URI, mongo_db_name=DB_NAME, idle_timeout=5)
+    MongoService(MONGO_URI, DB_NAME, Yeeter()).client.drop_database(DB_NAME)
+
+
+def test_shared_id_set_membership(manager):
+    """Test that preloaded and added ids are visible through the shared set."""
+    shared_ids = SharedIdSet(manager, ["100100300000"])
+    shared_ids.add("103302600000")
+    assert "100100300000" in shared_ids
+    assert "103302600000" in shared_ids
+    assert "000000000000" not in shared_ids
+    assert len(shared_ids) == 2
+
+
+def test_shared_id_set_from_known_id_set(manager):
+    """Test that a KnownIdSet is shared as is, including ids added to it later."""
+    known_ids = KnownIdSet(["100100300000", "0123"], merge_threshold=2)
+    shared_ids = SharedIdSet(manager, known_ids)
+    assert "100100300000" in shared_ids
+    assert "0123" in shared_ids
+    assert shared_ids.claim("103302600000")
+    assert shared_ids.claim("103302700000")
+    assert not shared_ids.claim("103302600000")
+    assert len(shared_ids) == 4
+    # The manager holds a copy, the scraper's own set is left alone.
+    assert len(known_ids) == 2
+
+
+def test_shared_id_set_known_checks_a_page_at_once(manager):
+    """Test that known returns the known ids among many in one call."""
+    shared_ids = SharedIdSet(manager, ["100100300000", "103302600000"])
+    assert shared_ids.known(["100100300000", "000000000000", "103302600000"]) == {
+        "100100300000",
+        "103302600000",
+    }
+    assert shared_ids.known([]) == set()
+
+
+def test_shared_id_set_claim_only_once(manager):
+    """Test that a known id cannot be claimed and a new id only once."""
+    shared_ids = SharedIdSet(manager, ["100100300000"])
+    assert not shared_ids.claim("100100300000")
+    assert shared_ids.claim("103302600000")
+    assert not shared_ids.claim("103302600000")
+
+
+def test_shared_id_set_claims_are_disjoint_across_processes(manager):
+    """Test that concurrent workers never claim the same id twice."""
+    shared_ids = SharedIdSet(manager)
+    ids = [str(100000000000 + i) for i in range(200)]
+    results = manager.Queue()
+    processes = [
+        multiprocessing.Process(target=_claim_all, args=(shared_ids, ids, results))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    claimed = []
+    for _ in processes:
+        claimed.extend(results.get())
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_workers_share_one_rate_limiter():
+    """Test that a throttle recorded by one process slows down the limiter of all."""
+    with PoolManager() as manager:
+        rate_limiter = manager.AdaptiveRateLimiter(rate=0.5, max_rate=1.0)
+        assert not rate_limiter.is_unlimited
+        process = multiprocessing.Process(target=_throttle, args=(rate_limiter,))
+        process.start()
+        process.join()
+        assert rate_limiter.rate == pytest.approx(0.25)
+        assert rate_limiter.state()["rate"] == pytest.approx(0.25)
+
+
+def test_pool_distributes_and_drains_products(config: WorkerConfig, corpus):
+    """Test that every queued product is scraped once and every worker gets some."""
+    config.scraper_options = {
+        "average_request_sleep_time": 0,
+        "disable_check_for_product_cards": True,
+        "driver": SlowReplayDriver(corpus, delay=0.2),
+    }
+    pool = ScraperWorkerPool(config, Yeeter(), workers=3)
+
+    processed = pool.run(known_ids=[], product_ids=corpus.product_ids)
+
+    assert sorted(processed) == [0, 1, 2]
+    assert sum(processed.values()) == len(corpus.product_ids)
+    assert all(count > 0 for count in processed.values())
+
+
+def test_pool_finishes_when_a_worker_stops(config: WorkerConfig, corpus):
+    """Test that the other workers drain the queue after one worker stopped."""
+    failing_id = corpus.product_ids[0]
+    config.scraper_options = {
+        "average_request_sleep_time": 0,
+        "disable_check_for_product_cards": True,
+        "driver": SlowReplayDriver(corpus, delay=0.05, fail_on=failing_id),
+    }
+    pool = ScraperWorkerPool(config, Yeeter(), workers=2)
+
+    processed = pool.run(known_ids=[], product_ids=corpus.product_ids)
+
+    # Every worker reported back, and all products but the failing one were scraped.
+    assert sorted(processed) == [0, 1]
+    assert sum(processed.values()) == len(corpus.product_ids) - 1
+
+
+def test_pool_without_work_terminates(config: WorkerConfig, corpus):
+    """Test that idle workers exit when neither the queue nor the frontier has work."""
+    config.scraper_options = {
+        "average_request_sleep_time": 0,
+        "driver": SlowReplayDriver(corpus),
+    }
+    pool = ScraperWorkerPool(config, Yeeter(), workers=2)
+
+    start = time.monotonic()
+    assert pool.run(known_ids=None) == {0: 0, 1: 0}
+    assert time.monotonic() - start < config.idle_timeout + 30